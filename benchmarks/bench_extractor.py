@@ -0,0 +1,236 @@
+# coding=utf-8
+"""
+Times the training and the prediction on the sites of tests/samples, with their peak memory
+
+Run from the root of the repository:
+    python -m benchmarks.bench_extractor --output results.json
+    python -m benchmarks.bench_extractor --compare results.json
+
+The results are written as JSON (seconds and bytes by site and stage) to compare them across commits.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import timeit
+import tracemalloc
+from swi.extractor import SupervisedWrapperExtractor
+from swi.best_match import find_best_matches
+from swi.css_selectors import find_selector, clean_selector, simplify_fragmented_selector, SelectorIndex
+from swi.regex import get_regex
+from .sites import SITES
+
+RESULTS_VERSION = 1
+STAGES = ["add_train_page", "get_best_wrappers", "predict", "find_best_matches", "get_regex",
+          "simplify_fragmented_selector"]
+
+
+def read_sample(sample):
+    with open("tests/samples/{}.html".format(sample), 'r') as f:
+        return f.read()
+
+
+def train(train_pages, scorer="fuzzywuzzy"):
+    """
+
+    :param train_pages: the pages and their train sets
+    :param scorer: the name of the scorer used to train
+    :type train_pages: [(str, {str:[str]/str})]
+    :type scorer: str
+
+    :return: an extractor trained on the pages, its best wrappers are not chosen yet
+    :rtype: SupervisedWrapperExtractor
+    """
+    extractor = SupervisedWrapperExtractor(scorer=scorer)
+    for page, train_set in train_pages:
+        extractor.add_train_page(page, train_set)
+    return extractor
+
+
+def get_best_wrappers(extractor):
+    """
+    Chooses the best wrappers of the train pages of extractor with a fresh extractor,
+    which scores all the wrappers as for pages just added
+    """
+    fresh = SupervisedWrapperExtractor(scorer=extractor.scorer.name)
+    fresh.extracted_pages = list(extractor.extracted_pages)
+    fresh.retrain_best_wrappers = True
+    return fresh.get_best_wrappers()
+
+
+def get_matches(extractor):
+    """
+
+    :param extractor: a trained extractor
+    :type extractor: SupervisedWrapperExtractor
+
+    :return: the best css match of each value of the train sets, with its page and value
+    :rtype: [(PageExtractor, str, Match)]
+    """
+    matches = []
+    for page in extractor.extracted_pages:
+        for value in get_values(page.train_set):
+            for match in find_matches(page, value):
+                if match.is_css:
+                    matches.append((page, value, match))
+                    break
+    return matches
+
+
+def get_values(train_set):
+    values = []
+    for value in train_set.values():
+        values.extend(value if isinstance(value, list) else [value])
+    return values
+
+
+def find_matches(page, value):
+    return find_best_matches(page.soup, page.data_schemaorg, value, text_index=page.text_index,
+                             meta_index=page.meta_index, scorer=page.scorer)
+
+
+def get_raw(match):
+    if match.attr == "getText()":
+        return match.soup.getText()
+    return match.soup.get(match.attr)
+
+
+def get_stages(train_pages, predict_pages, scorer="fuzzywuzzy"):
+    """
+
+    :param train_pages: the pages and their train sets
+    :param predict_pages: the pages to predict
+    :param scorer: the name of the scorer used to train
+    :type train_pages: [(str, {str:[str]/str})]
+    :type predict_pages: [str]
+    :type scorer: str
+
+    :return: the function timed for each stage
+    :rtype: {str:function}
+    """
+    extractor = train(train_pages, scorer)
+    extractor.predict(predict_pages[0])  # chooses the best wrappers and compiles their plan
+    matches = get_matches(extractor)
+    regex_cases = [(value, get_raw(match)) for _, value, match in matches]
+    selector_cases = [(page, clean_selector(find_selector(child=match.soup), forbidden_keyword=value))
+                      for page, value, match in matches]
+
+    return {
+        "add_train_page": lambda: train(train_pages, scorer),
+        "get_best_wrappers": lambda: get_best_wrappers(extractor),
+        "predict": lambda: [extractor.predict(page) for page in predict_pages],
+        "find_best_matches": lambda: [find_matches(page, value) for page in extractor.extracted_pages
+                                      for value in get_values(page.train_set)],
+        "get_regex": lambda: [get_regex(formatted=formatted, raw=raw) for formatted, raw in regex_cases],
+        "simplify_fragmented_selector": lambda: simplify_selectors(selector_cases),
+    }
+
+
+def simplify_selectors(cases):
+    """
+    Simplifies the selectors with a new index per page as in training, an index keeps what it matched
+    """
+    indexes = {}
+    for page, fragmented_selector in cases:
+        if page.id_ not in indexes:
+            indexes[page.id_] = SelectorIndex(page.soup)
+        simplify_fragmented_selector(soup=page.soup, fragmented_selector=fragmented_selector,
+                                     selector_index=indexes[page.id_])
+
+
+def measure(function, number):
+    """
+
+    :param function: the function to measure
+    :param number: the number of times it is timed
+    :type number: int
+
+    :return: the shortest and the mean duration in seconds, and the peak of the memory allocated by a call in bytes
+    :rtype: {str:float/int}
+    """
+    durations = timeit.repeat(function, number=1, repeat=number)
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"min": min(durations), "mean": sum(durations) / len(durations), "peak_memory": peak}
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sites=None, number=5, scorer="fuzzywuzzy"):
+    """
+
+    :param sites: the names of the sites to measure, all by default
+    :param number: the number of times each stage is timed
+    :param scorer: the name of the scorer used to train
+    :type sites: [str]
+    :type number: int
+    :type scorer: str
+
+    :return: the results, by site and by stage
+    :rtype: dict
+    """
+    results = {}
+    for site, train_samples, predict_samples in SITES:
+        if sites and site not in sites:
+            continue
+        train_pages = [(read_sample(sample), train_set) for sample, train_set in train_samples]
+        predict_pages = [read_sample(sample) for sample in predict_samples]
+
+        stages = get_stages(train_pages, predict_pages, scorer)
+        results[site] = {stage: measure(stages[stage], number) for stage in STAGES}
+        for stage in STAGES:
+            print_result(site, stage, results[site][stage])
+
+    return {"version": RESULTS_VERSION, "commit": get_commit(), "python": platform.python_version(),
+            "number": number, "scorer": scorer, "results": results}
+
+
+def print_result(site, stage, result, previous=None):
+    line = "{:<14} {:<29} {:>9.4f}s {:>9.1f}KiB".format(site, stage, result["min"], result["peak_memory"] / 1024)
+    if previous is not None:
+        line += "  x{:.2f} time  x{:.2f} memory".format(result["min"] / previous["min"],
+                                                        result["peak_memory"] / max(previous["peak_memory"], 1))
+    print(line)
+
+
+def compare(results, previous):
+    """
+    Prints the ratios of the results to the previous results, above 1 is slower or bigger
+    """
+    if previous.get("version") != RESULTS_VERSION:
+        raise ValueError("Unsupported results version: {}".format(previous.get("version")))
+    print("compared to {}".format(previous.get("commit")))
+    for site, stages in results["results"].items():
+        for stage, result in stages.items():
+            print_result(site, stage, result, previous["results"].get(site, {}).get(stage))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the training and the prediction on tests/samples")
+    parser.add_argument("--number", type=int, default=5, help="the number of times each stage is timed")
+    parser.add_argument("--sites", nargs="*", help="the sites to measure, all by default")
+    parser.add_argument("--output", help="the JSON file where to write the results")
+    parser.add_argument("--compare", help="the JSON file of previous results to compare with")
+    parser.add_argument("--scorer", default="fuzzywuzzy", help="the scorer used to train, fuzzywuzzy or rapidfuzz")
+    args = parser.parse_args()
+
+    results = run(sites=args.sites, number=args.number, scorer=args.scorer)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
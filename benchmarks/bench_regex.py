@@ -0,0 +1,59 @@
+# coding=utf-8
+"""
+Times regex.get_regex on the descriptions of tests/samples
+
+Run from the root of the repository:
+    python -m benchmarks.bench_regex
+"""
+import timeit
+from bs4 import BeautifulSoup
+from swi.best_match import find_best_matches
+from swi.regex import get_regex
+
+DESCRIPTIONS = [
+    ("tunisimmo_1", "Studio composé d'un salon, cuisine à l'américaine, chambre à coucher, salle d'eau avec douche wc "
+                    "lavabo, un petit balcon séchoir, et branchement d'une machine à laver. Gaz de ville, climatiseur, "
+                    "connexion ADSL, parabole collective. Au 2ème étage d'un immeuble récent, ascenseur, interphone, "
+                    "accès avec une clé, parking gardé la nuit. L'immeuble Violettes 3 (banefsej 3) est situé derrière "
+                    "l'ENIT, et proche de Skanes kobba. NON meublé, location à l'année, garanties exigées. 290 DT par "
+                    "mois et caution de 2 mois de loyer."),
+    ("tunisimmo_3", "appartement s+3 avec place de parking . résidente gardé avec deux ascenseurs.salon + 3 chambre + "
+                    "salle d'eau + salle de bain . avec 4 climatisseurset 3 balcons.4 ieme etages"),
+    ("tunisimmo_4", "LE JASMIN immobilière met en location un joli bungalow S+1, surface de 80 m2, à Marina El "
+                    "Kantaoui. Se compose d’une chambre à coucher , sallon avec balcon vue magnifique sur piscine, une "
+                    "cuisine équipée et d'une salle de bain. Pour connaître plus d'information ou pour organiser un "
+                    "RDV, contacter nous par email ou téléphonez pendant les heures de bureau."),
+    ("escortfish_1", "25_38dd Italian Candy looking for someone to enjoy my short stay with. Not many open "
+                     "appointments left. Sexy clean discreet fun. Fetishes okay. Two girls available upon request. No "
+                     "law enforcement. Serious inquiries ONLY"),
+    ("tumblrgallery_1", "Art,fashion,design,technology etc from the atomic space age"),
+]
+
+
+def get_cases():
+    """
+
+    :return: the descriptions and the texts they are found in
+    :rtype: [(str, str, str)] (sample, formatted, raw)
+    """
+    cases = []
+    for sample, value in DESCRIPTIONS:
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        match = find_best_matches(soup, {}, value)[0]
+        if match.attr == "getText()":
+            raw = match.soup.getText()
+        else:
+            raw = match.soup.get(match.attr)
+        cases.append((sample, value, raw))
+    return cases
+
+
+def main(number=20):
+    for sample, formatted, raw in get_cases():
+        duration = timeit.timeit(lambda: get_regex(formatted=formatted, raw=raw), number=number) / number
+        print("{:<16} formatted={:<4} raw={:<5} {:.6f}s".format(sample, len(formatted), len(raw), duration))
+
+
+if __name__ == "__main__":
+    main()
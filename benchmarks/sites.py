@@ -0,0 +1,130 @@
+# coding=utf-8
+"""
+The sites of tests/samples with the train sets of tests/test_extractor.py
+"""
+
+# (site, [(train sample, train set)], [samples to predict])
+SITES = [
+    ("pypi", [
+        ("pypi_1", {
+            "name": "pip 19.2.1",
+            "w3": "http://ogp.me/ns#",
+            "maintainers": [
+                "cjerdonek",
+                "dstufft",
+            ],
+            "maintainers_profile_pictures": [
+                "https://warehouse-camo.cmh1.psfhosted.org/697af4520c5134f9d47c5647352f0a1a83bac949/68747470733a2f2f7365637572652e67726176617461722e636f6d2f6176617461722f39623531336565376363343030633962373337346634363937613165363961643f73697a653d3530",
+                "https://warehouse-camo.cmh1.psfhosted.org/6d0424bff7dd2ff3855b621bf1470d578040d430/68747470733a2f2f7365637572652e67726176617461722e636f6d2f6176617461722f65626631333233363262363232343233656435626163613239383839313162383f73697a653d3530",
+            ],
+        }),
+    ], ["pypi_1", "pypi_2"]),
+    ("tunisimmo", [
+        ("tunisimmo_1", {
+            "prix": "290DN",
+            "contact": "moncef",
+            "localisation": "Monastir",
+            "titre": "Coquet studio - 290DN",
+            "description": "Studio composé d'un salon, cuisine à l'américaine, chambre à coucher, salle d'eau avec douche wc lavabo, un petit balcon séchoir, et branchement d'une machine à laver. Gaz de ville, climatiseur, connexion ADSL, parabole collective. Au 2ème étage d'un immeuble récent, ascenseur, interphone, accès avec une clé, parking gardé la nuit. L'immeuble Violettes 3 (banefsej 3) est situé derrière l'ENIT, et proche de Skanes kobba. NON meublé, location à l'année, garanties exigées. 290 DT par mois et caution de 2 mois de loyer.",
+            "images": [
+                "https://www.tunisimmo.com/images/2018/11/15/5122/thumb_coquet-studio_1.jpg",
+                "https://www.tunisimmo.com/images/2018/11/15/5122/thumb_coquet-studio_3.jpg",
+            ],
+        }),
+        ("tunisimmo_3", {
+            "prix": "900DN",
+            "contact": "SAMI",
+            "localisation": "Ariana",
+            "titre": "Appartement S+3 avec place parking - 900DN",
+            "description": "appartement s+3 avec place de parking . résidente gardé avec deux ascenseurs.salon + 3 chambre + salle d'eau + salle de bain . avec 4 climatisseurset 3 balcons.4 ieme etages",
+            "images": [
+                "https://www.tunisimmo.com/images/2018/11/15/5193/thumb_appartement-s3-avec-place-parking_3.jpg",
+                "https://www.tunisimmo.com/images/2018/11/15/5193/appartement-s3-avec-place-parking_2.jpg",
+            ],
+        }),
+        ("tunisimmo_4", {
+            "prix": "1500DN",
+            "contact": "Le Jasmin Immobiliere",
+            "localisation": "Sousse",
+            "titre": "Coquet Bungalow Vue Piscine - 1500DN",
+            "description": "LE JASMIN immobilière met en location un joli bungalow S+1, surface de 80 m2, à Marina El Kantaoui. Se compose d’une chambre à coucher , sallon avec balcon vue magnifique sur piscine, une cuisine équipée et d'une salle de bain. Pour connaître plus d'information ou pour organiser un RDV, contacter nous par email ou téléphonez pendant les heures de bureau.",
+            "images": [
+                "https://www.tunisimmo.com/images/2018/11/15/5254/thumb_coquet-bungalow-vue-piscine_5.jpg",
+                "https://www.tunisimmo.com/images/2018/11/15/5254/thumb_coquet-bungalow-vue-piscine_2.jpg",
+            ],
+        }),
+    ], ["tunisimmo_2"]),
+    ("booking", [
+        ("booking_1", {
+            "title": "Edgar Suites Expo Paris Porte de Versailles",
+            "address": "1 Villa Thoreton, 15th arr., 75015 Paris, France",
+            "images": [
+                "https://s-ec.bstatic.com/images/hotel/max1024x768/140/140580527.jpg",
+                "https://t-ec.bstatic.com/images/hotel/max1024x768/139/139935427.jpg",
+            ],
+        }),
+    ], ["booking_1", "booking_2"]),
+    ("bookaflat", [
+        ("bookaflat_1", {
+            "surface": "178",
+            "address": "Rue Saint Marc, Paris 2nd",
+            "price": "13000 €",
+            "images": [
+                "../photo/paris/18150/dsc05491-hdr.jpg",
+                "../photo/paris/18150/salon.jpg",
+            ],
+        }),
+    ], ["bookaflat_1", "bookaflat_2"]),
+    ("lodgis", [
+        ("lodgis_1", {
+            "price": "€308,900",
+            "surface": "34.1",
+            "address": "Rue De Belleville, Paris 19°",
+            "images": [
+                "https://images.lodgis.com/photos/lpa/ap/19849/orange/carousel/g/apartment-paris-19-kitchen-P12.jpg?v=1562856328",
+                "https://images.lodgis.com/photos/lpa/ap/19849/orange/carousel/g/apartment-paris-19-bedroom--H12.jpg?v=1562856328",
+            ],
+        }),
+    ], ["lodgis_1", "lodgis_2"]),
+    ("escortfish", [
+        ("escortfish_1", {
+            "title": "Only in town for three days",
+            "location": "Cumberland Valley, MD",
+            "age": "25",
+            "description": "25_38dd Italian Candy looking for someone to enjoy my short stay with. Not many open appointments left. Sexy clean discreet fun. Fetishes okay. Two girls available upon request. No law enforcement. Serious inquiries ONLY",
+            "images": [
+                "https://cdn.escortfish.ch/images/7b0fbd_thumb_lg.jpg",
+                "https://cdn.escortfish.ch/images/z7oLbt.jpg",
+            ],
+        }),
+    ], ["escortfish_1", "escortfish_2"]),
+    ("escortsexe", [
+        ("escortsexe_1", {
+            "category": "Escort girls",
+            "location": "Montpellier - 34000",
+            "phone": "0659853862",
+            "images": [
+                "https://www.escortsexepic.net/classifieds/232404-classifieds-20190725_005216.jpg",
+                "https://www.escortsexepic.net/classifieds/232404-classifieds-20190723_150822.jpg",
+            ],
+        }),
+    ], ["escortsexe_1", "escortsexe_2"]),
+    ("tumblrgallery", [
+        ("tumblrgallery_1", {
+            "title": "The Vault Of The Atomic Space Age",
+            "description": "Art,fashion,design,technology etc from the atomic space age",
+            "images": [
+                "https://78.media.tumblr.com/416ea221cb7cf2d2b98ce6ca98a3c354/tumblr_oyn5z3ioJL1qm25fso3_1280.jpg",
+                "https://78.media.tumblr.com/6465f5b03b375b7c7213e4faaa9ec38a/tumblr_oyn5z3ioJL1qm25fso2_1280.jpg",
+            ],
+        }),
+    ], ["tumblrgallery_1", "tumblrgallery_2"]),
+    ("weheartit", [
+        ("weheartit_1", {
+            "username": "✧ ⨾ 𝗿𝗶𝗽𝗻𝗮𝟭𝟳",
+            "twitter": "@orochimaru_sannin",
+            "hearts": "33",
+            "image": "https://data.whicdn.com/images/333255393/large.jpg",
+        }),
+    ], ["weheartit_1", "weheartit_2"]),
+]
@@ -12,4 +12,8 @@ setuptools.setup(
               'lxml',
               'soupsieve'
     ],
+    extras_require={
+              'lxml': ['cssselect'],
+              'rapidfuzz': ['rapidfuzz>=3.0']
+    },
 )
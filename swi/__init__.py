@@ -1,2 +1,6 @@
 # coding=utf-8
 from .extractor import SupervisedWrapperExtractor as Extractor
+from .registry import ExtractorRegistry
+from .instrumentation import Instrumentation
+from .page import Page
+from .aio import AsyncExtractor
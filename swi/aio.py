@@ -0,0 +1,209 @@
+# coding=utf-8
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .extractor import SupervisedWrapperExtractor, _init_worker, _predict_pages, _predict_pages_in_worker
+
+
+class AsyncExtractor:
+    """
+    Predicts pages for an event loop: the extractions run in worker threads or processes, not in the loop
+
+    The best wrappers are trained when the workers start, pages added to the extractor later are not used.
+    The results are the same as the ones of extractor.predict. If a worker process dies, the pages it was
+    given get a BrokenProcessPool error and the next pages go to new workers.
+    """
+    def __init__(self, extractor, workers=None, processes=False, queue_size=None):
+        """
+
+        :param extractor: the extractor to predict with
+        :param workers: the number of workers (os.cpu_count() by default)
+        :param processes: whether the workers are processes, which extract in parallel, or threads
+        :param queue_size: the maximum number of pages being predicted by predict_many (2 per worker by default)
+        :type extractor: SupervisedWrapperExtractor
+        :type workers: int
+        :type processes: bool
+        :type queue_size: int
+        """
+        self.extractor = extractor
+        self.workers = workers or os.cpu_count() or 1
+        self.processes = processes
+        self.queue_size = queue_size or 2 * self.workers
+        if self.queue_size < 1:
+            raise ValueError("queue_size should be at least 1")
+        self.executor = None
+        self.best_wrappers = None  # the best wrappers of the workers
+        self.predictor = None  # the extractor of the threads, with the best wrappers only
+
+    def start(self):
+        """
+        Trains the best wrappers if pages were added and starts the workers, done by the first prediction
+        """
+        if self.executor is not None:
+            return
+        self.best_wrappers = self.extractor.get_best_wrappers()
+        if self.processes:
+            self.executor = self.__start_processes()
+        else:
+            self.predictor = SupervisedWrapperExtractor(backend=self.extractor.backend.name,
+                                                        cache_size=self.extractor.extraction_cache.size,
+                                                        instrumentation=self.extractor.instrumentation)
+            self.predictor.best_wrappers = self.best_wrappers
+            self.predictor.get_best_wrappers()  # compiles the extraction plan before the threads use it
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def __start_processes(self):
+        """
+
+        :return: the worker processes, they get the best wrappers once
+        :rtype: ProcessPoolExecutor
+        """
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.best_wrappers, self.extractor.backend.name))
+
+    def close(self):
+        """
+        Stops the workers, the pages waiting to be predicted are dropped
+        """
+        if self.executor is not None:
+            try:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+            except TypeError:  # before python 3.9, only the futures of predict_many are cancelled
+                self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def predict(self, page):
+        """
+
+        :param page: the page content
+        :type page: str/bytes
+
+        :return: the extracted data from the page, the same as extractor.predict
+        :rtype: {str:[str]/str}
+        """
+        _, data, error = await self.__submit(0, page)
+        if error is not None:
+            raise error
+        return data
+
+    async def predict_many(self, pages, ordered=True):
+        """
+
+        :param pages: the pages contents
+        :param ordered: whether the results are yielded in the order of pages or as soon as they are ready
+        :type pages: iterable/async iterable of str/bytes
+        :type ordered: bool
+
+        :return: for each page, its index in pages, the extracted data and the error raised by predict,
+            like extractor.predict_many
+        :rtype: async iterator of (int, {str:[str]/str}, Exception)
+
+        Pages are read from pages while less than queue_size are being predicted. When the iteration stops
+        (the consumer is cancelled or closes the iterator), the pages not started yet are cancelled.
+        """
+        pending = deque() if ordered else set()
+        try:
+            async for index, page in _enumerate(pages):
+                future = self.__submit(index, page)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+                if len(pending) >= self.queue_size:
+                    yield await _pop_result(pending, ordered)
+            while pending:
+                yield await _pop_result(pending, ordered)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def __submit(self, index, page):
+        """
+
+        :param index: the index of the page
+        :param page: the page content
+        :type index: int
+        :type page: str/bytes
+
+        :return: the future of the index, the extracted data and the error of the page
+        :rtype: asyncio.Future
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        if self.processes:
+            try:
+                future = loop.run_in_executor(self.executor, _predict_pages_in_worker, [(index, page)])
+            except BrokenProcessPool:  # a worker died
+                self.executor.shutdown(wait=False)
+                self.executor = self.__start_processes()
+                future = loop.run_in_executor(self.executor, _predict_pages_in_worker, [(index, page)])
+        else:
+            future = loop.run_in_executor(self.executor, _predict_pages, self.predictor, [(index, page)])
+        return asyncio.ensure_future(_get_first(index, future))
+
+
+async def _get_first(index, future):
+    """
+
+    :param index: the index of the page
+    :param future: the future of the results of the page
+    :type index: int
+    :type future: asyncio.Future
+
+    :return: the index, the extracted data and the error of the page, a BrokenProcessPool error if a worker died
+    :rtype: (int, {str:[str]/str}, Exception)
+    """
+    try:
+        return (await future)[0]
+    except BrokenProcessPool as error:
+        return index, None, error
+
+
+async def _enumerate(pages):
+    """
+
+    :param pages: an iterable or an async iterable
+    :type pages: iterable/async iterable
+
+    :return: the items of pages with their index
+    :rtype: async iterator of (int, object)
+    """
+    index = 0
+    if hasattr(pages, "__aiter__"):
+        async for page in pages:
+            yield index, page
+            index += 1
+    else:
+        for page in pages:
+            yield index, page
+            index += 1
+
+
+async def _pop_result(pending, ordered):
+    """
+
+    :param pending: the futures of the pages being predicted
+    :param ordered: whether pending is a deque to pop in order or a set to pop the first completed
+    :type pending: deque/set
+    :type ordered: bool
+
+    :return: the result of the first page or of a page already predicted
+    :rtype: (int, {str:[str]/str}, Exception)
+    """
+    if ordered:
+        result = await pending[0]  # stays pending until done, to be cancelled with the others
+        pending.popleft()
+        return result
+    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    future = next(iter(done))
+    pending.remove(future)
+    return future.result()
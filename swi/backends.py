@@ -0,0 +1,468 @@
+# coding=utf-8
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from lxml import etree
+from .plan import SelectorResults
+
+CHUNK_SIZE = 512  # size of the chunks fed to the parser, as bs4 does
+STRING_CONTAINERS = {"rt", "rp", "style", "script", "template"}  # bs4 gives a specific type to the strings inside
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+ASCII_SPACES = " \n\t\x0c\r"
+INVALID_NAME_PREFIX = "swi-invalid-"  # names lxml does not accept are replaced by this prefix and their hex
+VALID_NAMES_CACHE_SIZE = 4096  # the names checked last, the names of all the pages seen are not kept
+CDATA_LIST_ATTRIBUTES = {  # attributes bs4 splits into lists
+    "*": {"class", "accesskey", "dropzone"},
+    "a": {"rel", "rev"},
+    "link": {"rel", "rev"},
+    "td": {"headers"},
+    "th": {"headers"},
+    "form": {"accept-charset"},
+    "object": {"archive"},
+    "area": {"rel"},
+    "icon": {"sizes"},
+    "iframe": {"sandbox"},
+    "output": {"for"},
+}
+
+
+def get_backend(name):
+    """
+
+    :param name: the name of the backend, "bs4" or "lxml"
+    :type name: str
+
+    :return: the backend used to parse and select the pages to predict
+    :rtype: Bs4Backend/LxmlBackend
+    """
+    if name == "bs4":
+        return Bs4Backend()
+    if name == "lxml":
+        return LxmlBackend()
+    raise ValueError("Unknown backend '{}', should be 'bs4' or 'lxml'".format(name))
+
+
+class Bs4Backend:
+    """
+    Parses the pages with BeautifulSoup and selects with soupsieve
+    """
+    name = "bs4"
+
+    def parse(self, page):
+        """
+
+        :param page: the page content
+        :type page: str/bytes
+
+        :return: the parsed page
+        :rtype: BeautifulSoup
+        """
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(page, "lxml")
+
+    def supports(self, plan):
+        """
+
+        :param plan: the extraction plan of the wrappers
+        :type plan: ExtractionPlan
+
+        :return: whether the backend can select the nodes of the plan
+        :rtype: bool
+        """
+        return True
+
+    def select(self, plan, document):
+        """
+
+        :param plan: the extraction plan of the wrappers
+        :param document: a page returned by parse
+        :type plan: ExtractionPlan
+        :type document: BeautifulSoup
+
+        :return: the nodes selected by the plan
+        :rtype: SelectorResults
+        """
+        return plan.select(document)
+
+
+class LxmlBackend:
+    """
+    Parses the pages with lxml and selects with the XPath translation of the css selectors (cssselect),
+    the nodes give the same texts and attributes as with bs4
+    """
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            from cssselect import HTMLTranslator, parse
+        except ImportError:
+            raise ImportError("The lxml backend needs cssselect: pip install cssselect")
+        self.translator = HTMLTranslator()
+        self.parse_selector = parse
+        self.xpaths = {}
+
+    def parse(self, page):
+        """
+
+        :param page: the page content
+        :type page: str/bytes
+
+        :return: the parsed page, built like bs4 builds its tree with lxml
+        :rtype: LxmlDocument
+        """
+        encoding = None
+        if isinstance(page, bytes):
+            from bs4.dammit import EncodingDetector
+            detector = EncodingDetector(page, is_html=True)
+            page = detector.markup
+            encoding = next(iter(detector.encodings), None)
+        elif page and page[0] == "\N{BYTE ORDER MARK}":
+            page = page[1:]
+
+        # bs4 builds its tree from the events of the parser, which include blank strings
+        # the tree built by lxml itself drops, so the tree is built from the same events
+        builder = _TreeBuilder()
+        parser = etree.HTMLParser(target=builder, recover=True, encoding=encoding)
+        for start in range(0, max(len(page), 1), CHUNK_SIZE):
+            parser.feed(page[start:start + CHUNK_SIZE])
+        try:
+            root = parser.close()
+        except etree.XMLSyntaxError:  # no element in the page
+            root = None
+        return LxmlDocument(root, self, builder.attributes)
+
+    def supports(self, plan):
+        """
+
+        :param plan: the extraction plan of the wrappers
+        :type plan: ExtractionPlan
+
+        :return: whether all the selectors of the plan can be translated to XPath
+            (cssselect does not know all the syntax of soupsieve, like the classes starting with "--")
+        :rtype: bool
+        """
+        from cssselect import SelectorError
+        try:
+            for selector in plan.selectors:
+                self.get_xpath(selector)
+        except (SelectorError, etree.XPathError):
+            return False
+        return True
+
+    def select(self, plan, document):
+        """
+
+        :param plan: the extraction plan of the wrappers, supported by the backend
+        :param document: a page returned by parse
+        :type plan: ExtractionPlan
+        :type document: LxmlDocument
+
+        :return: the nodes selected by the plan
+        :rtype: SelectorResults
+        """
+        results = {selector: document.get_positions(selector) for selector in plan.selectors}
+        return SelectorResults(document, document.nodes, document.ends, results)
+
+    def get_xpath(self, selector):
+        """
+
+        :param selector: a css selector
+        :type selector: str
+
+        :return: the compiled XPath matching the same elements as selector
+        :rtype: etree.XPath
+        """
+        if selector not in self.xpaths:
+            xpaths = []
+            for parsed_selector in self.parse_selector(selector):
+                _rename_selector(parsed_selector.parsed_tree)
+                xpaths.append(self.translator.selector_to_xpath(parsed_selector))
+            self.xpaths[selector] = etree.XPath(" | ".join(xpaths))
+        return self.xpaths[selector]
+
+
+class LxmlDocument:
+    """
+    A page parsed by LxmlBackend
+    """
+    def __init__(self, root, backend, attributes=None):
+        self.root = root
+        self.backend = backend
+        self.attributes = attributes if attributes is not None else {}  # element -> attributes, for the elements with invalid names
+        self.nodes = []
+        self.ends = []
+        self.positions = {}
+        if root is not None:
+            self.__index(root)
+
+    def select(self, selector):
+        """
+
+        :param selector: a css selector
+        :type selector: str
+
+        :return: the nodes matched by selector in document order, like soup.select
+        :rtype: [LxmlNode]
+        """
+        return [self.nodes[position] for position in self.get_positions(selector)]
+
+    def select_within(self, root, selector):
+        """
+
+        :param root: a node of the document
+        :param selector: a css selector
+        :type root: LxmlNode
+        :type selector: str
+
+        :return: the descendants of root matched by selector, like root.select for a soup
+        :rtype: [LxmlNode]
+        """
+        positions = self.get_positions(selector)
+        position = self.positions[root.element]
+        start = bisect_right(positions, position)
+        end = bisect_left(positions, self.ends[position], start)
+        return [self.nodes[i] for i in positions[start:end]]
+
+    def get_positions(self, selector):
+        """
+
+        :param selector: a css selector
+        :type selector: str
+
+        :return: the positions of the nodes matched by selector
+        :rtype: [int]
+        """
+        if self.root is None:
+            return []
+        xpath = self.backend.get_xpath(selector)
+        return sorted(self.positions[element] for element in xpath(self.root.getroottree())
+                      if element in self.positions)
+
+    def __index(self, root):
+        """
+
+        :param root: the root element of the document
+        :type root: etree._Element
+
+        fills the nodes in document order and the position following their last descendant
+        """
+        stack = []
+        for element in root.iter():
+            if not isinstance(element.tag, str):  # comments and processing instructions
+                continue
+            position = len(self.nodes)
+            parent = element.getparent()
+            while stack and self.nodes[stack[-1]].element is not parent:
+                self.ends[stack.pop()] = position
+            self.positions[element] = position
+            self.nodes.append(LxmlNode(element, self))
+            self.ends.append(None)
+            stack.append(position)
+        while stack:
+            self.ends[stack.pop()] = len(self.nodes)
+
+
+class LxmlNode:
+    """
+    An element of a LxmlDocument with the methods of a bs4 Tag used by the wrappers
+    """
+    __slots__ = ("element", "document")
+
+    def __init__(self, element, document):
+        self.element = element
+        self.document = document
+
+    @property
+    def name(self):
+        return _get_original_name(self.element.tag)
+
+    @property
+    def attrs(self):
+        """
+
+        :return: the attributes of the node, like Tag.attrs
+        :rtype: {str:str/[str]}
+        """
+        attributes = self.document.attributes.get(self.element)
+        if attributes is None:
+            attributes = self.element.attrib
+        name = self.name
+        return {attr: _split_value(name, attr, value) for attr, value in attributes.items()}
+
+    def get(self, attr, default=None):
+        """
+
+        :param attr: the name of an attribute
+        :type attr: str
+
+        :return: the value of the attribute, as a list for the attributes bs4 splits
+        :rtype: str/[str]
+        """
+        attributes = self.document.attributes.get(self.element)
+        if attributes is None:
+            attributes = self.element.attrib
+        value = attributes.get(attr)
+        if value is None:
+            return default
+        return _split_value(self.name, attr, value)
+
+    def select(self, selector):
+        return self.document.select_within(self, selector)
+
+    def getText(self):
+        """
+
+        :return: the same text as bs4 Tag.getText(): the strings of the subtree, except comments
+            and the content of script, style, template, rt and rp for the other tags
+        :rtype: str
+        """
+        element = self.element
+        container = None
+        preserve = False
+        for ancestor in element.iterancestors():
+            if container is None and ancestor.tag in STRING_CONTAINERS:
+                container = ancestor.tag
+            if ancestor.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve = True
+        text_type = element.tag if element.tag in STRING_CONTAINERS else None
+
+        strings = []
+        contexts = [(container, preserve)]
+        for event, node in etree.iterwalk(element, events=("start", "end", "comment", "pi")):
+            if event in ("comment", "pi"):  # not in the text, but their tail is
+                if node.tail:
+                    _add_string(strings, node.tail, contexts[-1], text_type)
+                continue
+
+            if event == "start":
+                container, preserve = contexts[-1]
+                if node.tag in STRING_CONTAINERS:
+                    container = node.tag
+                contexts.append((container, preserve or node.tag in PRESERVE_WHITESPACE_TAGS))
+                if node.text:
+                    _add_string(strings, node.text, contexts[-1], text_type)
+            else:
+                contexts.pop()
+                if node is not element and node.tail:
+                    _add_string(strings, node.tail, contexts[-1], text_type)
+        return "".join(strings)
+
+
+class _TreeBuilder(etree.TreeBuilder):
+    """
+    Builds the tree from the events of the parser, renaming the tags and attributes lxml does not accept
+    (like "fb:like" or "xmlns:og", bs4 keeps them)
+    """
+    def __init__(self):
+        super().__init__()
+        self.attributes = {}  # element -> its original attributes, when one of them was renamed
+
+    def start(self, tag, attrib, nsmap=None):
+        renamed = {_get_valid_name(attr): value for attr, value in attrib.items()}
+        element = super().start(_get_valid_name(tag), renamed)
+        if len(renamed) != len(attrib) or any(attr not in attrib for attr in renamed):
+            self.attributes[element] = dict(attrib)
+        return element
+
+    def end(self, tag):
+        return super().end(_get_valid_name(tag))
+
+    def comment(self, text):
+        # only the position of a comment matters (it separates the strings), its text may be invalid for lxml
+        return super().comment("")
+
+    def pi(self, target, data=None):
+        return super().pi("pi")
+
+
+@lru_cache(maxsize=VALID_NAMES_CACHE_SIZE)
+def _get_valid_name(name):
+    """
+
+    :param name: a tag or attribute name
+    :type name: str
+
+    :return: name if lxml accepts it, else a valid name standing for it
+    :rtype: str
+    """
+    try:
+        etree.Element(name, {name: ""})
+        return name
+    except ValueError:
+        return INVALID_NAME_PREFIX + name.encode("utf-8").hex()
+
+
+def _get_original_name(name):
+    """
+
+    :param name: a name returned by _get_valid_name
+    :type name: str
+
+    :return: the name it stands for
+    :rtype: str
+    """
+    if name.startswith(INVALID_NAME_PREFIX):
+        return bytes.fromhex(name[len(INVALID_NAME_PREFIX):]).decode("utf-8")
+    return name
+
+
+def _rename_selector(tree):
+    """
+
+    :param tree: a selector parsed by cssselect
+    :type tree: cssselect.parser.Tree
+
+    renames the tags and attributes of the selector the way they are renamed in the tree of the page
+    """
+    from cssselect.parser import Element, Attrib
+
+    if isinstance(tree, Element) and tree.element:
+        tree.element = _get_valid_name(tree.element.lower())
+    elif isinstance(tree, Attrib):
+        tree.attrib = _get_valid_name(tree.attrib.lower())
+    children = [getattr(tree, "selector", None), getattr(tree, "subselector", None)]
+    children.extend(getattr(tree, "selector_list", ()))
+    children.extend(argument[1] for argument in getattr(tree, "arguments", ()) if isinstance(argument, tuple))
+    for child in children:
+        if child is not None and not isinstance(child, str):
+            _rename_selector(getattr(child, "parsed_tree", child))
+
+
+def _split_value(tag, attr, value):
+    """
+
+    :param tag: the name of the tag
+    :param attr: the name of the attribute
+    :param value: the value of the attribute
+    :type tag: str
+    :type attr: str
+    :type value: str
+
+    :return: the value, split in a list for the attributes bs4 splits
+    :rtype: str/[str]
+    """
+    if attr in CDATA_LIST_ATTRIBUTES["*"] or attr in CDATA_LIST_ATTRIBUTES.get(tag, ()):
+        return value.split()
+    return value
+
+
+def _add_string(strings, string, context, text_type):
+    """
+
+    :param strings: the strings of the text
+    :param string: a string of the document
+    :param context: the innermost string container and whether whitespace is preserved
+    :param text_type: the string container whose strings are kept (None for the regular strings)
+    :type strings: [str]
+    :type string: str
+    :type context: (str, bool)
+    :type text_type: str
+
+    adds string to strings if it is of the right type, with whitespace collapsed like bs4 does
+    """
+    container, preserve = context
+    if container != text_type:
+        return
+    if not preserve and not string.strip(ASCII_SPACES):
+        string = "\n" if "\n" in string else " "
+    strings.append(string)
@@ -1,91 +1,282 @@
 # coding=utf-8
-from fuzzywuzzy import fuzz
+from collections import Counter
 from . import schemaorg
+from .scoring import DEFAULT_SCORER
+from .text_index import TextIndex
+
+
+PERFECT_RATIO = 0.995  # the partial ratios above score 100
+BOUND_MARGIN = 1e-6
 
 
 class Match:
-    def __init__(self, is_css=None, score=0, soup=None, selector=None, attr=None, length_value=0):
+    def __init__(self, is_css=None, score=0, soup=None, selector=None, attr=None, length_value=0, position=None):
         self.is_css = is_css
         self.score = score
         self.soup = soup
+        self.position = position  # the position of soup in the text index, in document order
         self.meta_selector = selector
         self.attr = attr
         self.length_value = length_value
 
 
-def find_best_matches(soup, data_schemaorg, value):
+def find_best_matches(soup, data_schemaorg, value, text_index=None, meta_index=None, scorer=DEFAULT_SCORER):
     """
 
     :param soup: a BeautifulSoup object
     :param data_schemaorg: the meta data of the page
     :param value: an element to find in the soup
+    :param text_index: the index of the soup, built from soup if not given
+    :param meta_index: the index of the meta data, built from data_schemaorg if not given
+    :param scorer: scores the texts of the soup and the meta data
     :type soup: BeautifulSoup
-    :type data_schemaorg: nested dict/list
+    :type data_schemaorg: nested dict/list/Metadata
     :type value: str
+    :type text_index: TextIndex
+    :type meta_index: MetaIndex
+    :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
 
 
     :return: a list containing all the probable matches
     :rtype: [Match]
+
+    The best matches are the ones with the best fuzzy score and then the shortest text.
+    As no score is above 100, once a text scoring 100 is found, every longer text can be skipped:
+    the texts containing value are scored first (shortest first) to find it quickly.
+    The other texts are skipped when the characters of value they contain bound their score below the best so far.
     """
-    matches = []
-    meta_matches = __get_meta_matches(value, data_schemaorg)
-    for child in soup.findChildren(recursive=True):
-        matches.extend(__get_matches(child, value))
+    if text_index is None:
+        text_index = TextIndex(soup)
+    if meta_index is None:
+        if isinstance(data_schemaorg, schemaorg.Metadata):
+            meta_index = data_schemaorg.get_index()
+        else:
+            meta_index = schemaorg.MetaIndex(data_schemaorg)
 
-    better_best_matches = []
-    matches.extend(meta_matches)
-    if matches:
-        best_matches = __get_best_items(matches)
+    meta_matches = __get_meta_matches(value, meta_index, scorer)
+    candidates = __get_candidates(text_index, len(value))
+    scores = [None] * len(candidates)
+    best = max([(match.score, -match.length_value) for match in meta_matches], default=None)
+    value_counts = Counter(value)
 
-        for best_match in best_matches:
-            best_match.score -= best_match.length_value
+    def is_out_of_reach(i):
+        return not __can_reach(best, 100, candidates[i][2])
 
-        better_best_matches = __get_best_items(best_matches)
+    def is_bounded(i):
+        position, attr, length_value = candidates[i]
+        if not __can_reach(best, 100, length_value):
+            return True
+        if best is None:
+            return False
+        text = text_index if attr == "getText()" else __get_text(text_index, position, attr)
+        if not isinstance(text, (str, TextIndex)):  # a list of values (bs4 subclasses list), scored as it is
+            return False
+        common = __count_common(value_counts, text, position)
+        return not __can_reach(best, __get_upper_bound(common, len(value)), length_value)
+
+    exact_candidates = __get_exact_candidates(text_index, candidates, value)
+    exact_candidates.sort(key=lambda i: candidates[i][2])
+    skipped = set()
+    texts = __get_texts(text_index, candidates, exact_candidates, is_out_of_reach, skipped)
+    for i, score in zip(exact_candidates, scorer.partial_ratios(value, texts)):
+        if i in skipped:  # and so are the longer ones
+            break
+        scores[i] = score, -candidates[i][2]
+        best = scores[i] if best is None else max(best, scores[i])
+
+    other_candidates = [i for i in range(len(candidates)) if scores[i] is None and i not in skipped]
+    texts = __get_texts(text_index, candidates, other_candidates, is_bounded, skipped)
+    for i, score in zip(other_candidates, scorer.partial_ratios(value, texts)):
+        if i not in skipped:
+            scores[i] = score, -candidates[i][2]
+            best = scores[i] if best is None else max(best, scores[i])
+
+    if best is None:
+        return []
+
+    better_best_matches = []
+    for i, (position, attr, length_value) in enumerate(candidates):
+        if scores[i] == best:
+            better_best_matches.append(Match(is_css=True, score=best[0], soup=text_index.nodes[position], attr=attr,
+                                             length_value=length_value, position=position))
+    better_best_matches.extend(match for match in meta_matches if (match.score, -match.length_value) == best)
+
+    for best_match in better_best_matches:
+        best_match.score -= best_match.length_value
 
     return better_best_matches
 
 
-def __get_matches(soup, value):
+def __get_candidates(text_index, lenValue):
     """
 
-    :param soup: a BeautifulSoup object
-    :param value: an element to find in the soup
-    :type soup: BeautifulSoup
+    :param text_index: the index of the soup
+    :param lenValue: the length of the value we search for
+    :type text_index: TextIndex
+    :type lenValue: int
+
+    :return: the texts and attributes that could contain the value, in document order
+    :rtype: [(int, str, int)] (position of the node, attribute, length of the text)
+    """
+    candidates = []
+    for position, node in enumerate(text_index.nodes):
+        lenText = text_index.get_text_length(position)
+        if lenText >= lenValue:
+            candidates.append((position, "getText()", lenText))
+
+        if node.name == "meta":  # meta tags are handled by extruct
+            continue
+        for attr, text in text_index.attributes[position]:
+            if type(text) is list:
+                continue
+            lenText = len(text)
+            if lenText >= lenValue:
+                candidates.append((position, attr, lenText))
+
+    return candidates
+
+
+def __get_exact_candidates(text_index, candidates, value):
+    """
+
+    :param text_index: the index of the soup
+    :param candidates: the candidates returned by __get_candidates
+    :param value: the value we search for
+    :type text_index: TextIndex
+    :type candidates: [(int, str, int)]
     :type value: str
 
+    :return: the indexes of the candidates containing value
+    :rtype: [int]
+    """
+    positions = text_index.find(value)
+    exact_candidates = []
+    for i, (position, attr, _) in enumerate(candidates):
+        if attr == "getText()":
+            if position in positions:
+                exact_candidates.append(i)
+        elif value in __get_text(text_index, position, attr):
+            exact_candidates.append(i)
+    return exact_candidates
 
-    :return: the probable matches based on similarity of value and what we can find in soup
-    :rtype: [Match]
+
+def __get_text(text_index, position, attr):
     """
-    lenValue = len(value)
-    matches = []
-    text = soup.getText()
-    lenText = len(text)
-    if lenText >= lenValue:
-        match = Match(is_css=True, score=fuzz.partial_ratio(value, text), soup=soup, attr="getText()",
-                      length_value=lenText)
-        matches.append(match)
 
-    for attr in soup.attrs.keys():
-        text = soup.get(attr)
-        if type(text) is list:
-            continue
-        lenText = len(text)
-        if lenText >= lenValue and soup.name != "meta":  # meta tags are handled by extruct
-            match = Match(is_css=True, score=fuzz.partial_ratio(value, text), soup=soup, attr=attr,
-                          length_value=lenText)
-            matches.append(match)
+    :param text_index: the index of the soup
+    :param position: the position of the node
+    :param attr: the attribute of the node or "getText()" for its text
+    :type text_index: TextIndex
+    :type position: int
+    :type attr: str
+
+    :return: the text of the candidate
+    :rtype: str
+    """
+    if attr == "getText()":
+        return text_index.get_text(position)
+    return text_index.nodes[position].get(attr)
 
-    return matches
 
+def __get_texts(text_index, candidates, indexes, is_skipped, skipped):
+    """
+
+    :param text_index: the index of the soup
+    :param candidates: the candidates returned by __get_candidates
+    :param indexes: the indexes of the candidates to score
+    :param is_skipped: tells if a candidate cannot be as good as the best one anymore
+    :param skipped: where the indexes of the candidates skipped are added
+    :type text_index: TextIndex
+    :type candidates: [(int, str, int)]
+    :type indexes: [int]
+    :type is_skipped: function
+    :type skipped: set
+
+    :return: the texts of the candidates, None for the ones skipped when their text is taken
+    :rtype: iterator of str
+
+    A scorer scoring the texts as they are iterated skips the candidates out of reach of the best score so far,
+    a batch scorer takes the texts of all the candidates at once.
+    """
+    for i in indexes:
+        if is_skipped(i):
+            skipped.add(i)
+            yield None
+        else:
+            position, attr, _ = candidates[i]
+            yield __get_text(text_index, position, attr)
+
+
+def __can_reach(best, score, length_value):
+    """
+
+    :param best: the best (score, -length) found so far
+    :param score: the highest score a candidate can have
+    :param length_value: the length of the candidate
+    :type best: (int, int)
+    :type score: int
+    :type length_value: int
+
+    :return: False if the candidate cannot be as good as best
+    :rtype: bool
+    """
+    return best is None or (score, -length_value) >= best
+
+
+def __count_common(value_counts, text, position=None):
+    """
+
+    :param value_counts: the number of occurrences of each character of the value
+    :param text: a text, or the text index to count in the text of the node at position
+    :param position: the position of the node
+    :type value_counts: Counter
+    :type text: str/TextIndex
+    :type position: int
+
+    :return: the number of characters of the value found in the text, as many times as they are in both
+    :rtype: int
+    """
+    if isinstance(text, TextIndex):
+        return sum(min(count, text.count(position, char)) for char, count in value_counts.items())
+    return sum(min(count, text.count(char)) for char, count in value_counts.items())
 
-def __get_meta_matches(value, data_schemaorg):
+
+def __get_upper_bound(common, lenValue, lenText=None):
+    """
+
+    :param common: the number of characters of the value found in the text, see __count_common
+    :param lenValue: the length of the value
+    :param lenText: the length of the text for a ratio, None for a partial ratio
+    :type common: int
+    :type lenValue: int
+    :type lenText: int
+
+    :return: the highest score the value and the text can have
+    :rtype: int
+
+    A ratio is 2 * M / (lenValue + lenText) where M, the length of the longest common subsequence,
+    is at most common. A partial ratio is the best ratio of the value with a part of the text, which has
+    at least M characters: it is at most 2 * common / (lenValue + common), and 100 above PERFECT_RATIO.
+    The bound is rounded up so the float errors cannot make it lower than the score.
+    """
+    if lenText is None:
+        ratio = 2 * common / (lenValue + common) if common else 0
+        if ratio > PERFECT_RATIO - BOUND_MARGIN:
+            return 100
+    else:
+        ratio = 2 * common / (lenValue + lenText)
+    return int(100 * ratio + 0.5 + BOUND_MARGIN)
+
+
+def __get_meta_matches(value, meta_index, scorer):
     """
 
     :param value: the string we want to find
-    :param data_schemaorg: the dictionary where we search the value
+    :param meta_index: the values of the meta data where we search the value
+    :param scorer: scores the values of the meta data
     :type value: str
-    :type data_schemaorg: {str:str/list/dict}
+    :type meta_index: MetaIndex
+    :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
 
     :return a list of matches
     :rtype: [match]
@@ -93,32 +284,29 @@ def __get_meta_matches(value, data_schemaorg):
     if not value:
         raise ValueError("Value is NULL/empty")
     lenValue = len(value)
+    items = [(path, text) for path, text in meta_index.values.items() if len(text) >= lenValue]
+    value_counts = Counter(value)
+    best = None
+    skipped = set()
     matches = []
 
-    for path in schemaorg.get_pathes(data_schemaorg):
-        text = schemaorg.get_value(data_schemaorg, path)
-        lenText = len(text)
-        if lenText >= lenValue:
-            match = Match(is_css=False, score=fuzz.ratio(value, text), selector=path, length_value=lenText)
-            matches.append(match)
+    def get_texts():
+        for i, (_, text) in enumerate(items):
+            lenText = len(text)
+            if not __can_reach(best, __get_upper_bound(lenValue, lenValue, lenText), lenText) or \
+                    not __can_reach(best, __get_upper_bound(__count_common(value_counts, text), lenValue, lenText),
+                                    lenText):
+                skipped.add(i)
+                yield None
+            else:
+                yield text
 
-    return matches
-
-
-def __get_best_items(matches):
-    """
-    Get all items with best fuzzy score
+    for i, score in enumerate(scorer.ratios(value, get_texts())):
+        if i in skipped:  # cannot be the best meta match, nor better than it
+            continue
+        path, text = items[i]
+        match = Match(is_css=False, score=score, selector=list(path), length_value=len(text))
+        matches.append(match)
+        best = (score, -len(text)) if best is None else max(best, (score, -len(text)))
 
-    :param matches: list of matches
-    :type matches: [Match]
-    :return:
-    """
-    best_matches = []
-    matches.sort(key=lambda match: match.score, reverse=True)
-    best_score = matches[0].score
-    i = 0
-    nbMatches = len(matches)
-    while i < nbMatches and matches[i].score == best_score:
-        best_matches.append(matches[i])
-        i += 1
-    return best_matches
+    return matches
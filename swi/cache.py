@@ -0,0 +1,58 @@
+# coding=utf-8
+from collections import OrderedDict
+from .wrapper import Wrappers
+
+CACHE_SIZE = 4096  # default number of extractions kept by an ExtractionCache
+
+
+class ExtractionCache:
+    """
+    The values extracted by wrappers on the train pages, kept for the wrappers that extract the same thing
+
+    Many candidate wrappers end up with the same selector, attribute and regex, they are only extracted once
+    per page. The least recently used extractions are dropped once there are more than size.
+    """
+    def __init__(self, size=CACHE_SIZE):
+        """
+
+        :param size: the maximum number of extractions kept
+        :type size: int
+        """
+        self.size = size
+        self.extractions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def extract(self, wrapper, page_key, soup, data_schemaorg):
+        """
+
+        :param wrapper: the wrapper to extract with
+        :param page_key: a key identifying the page
+        :param soup: the soup of the page
+        :param data_schemaorg: the meta data of the page
+        :type wrapper: Wrapper
+        :type page_key: hashable
+        :type soup: BeautifulSoup
+        :type data_schemaorg: {str:str/list/dict}
+
+        :return: the same as wrapper.extract(soup, data_schemaorg), the result should not be modified
+        :rtype: [str]/str
+        """
+        if isinstance(wrapper, Wrappers):  # its groups can be shared with other Wrappers
+            results = []
+            for child in wrapper.wrappers:
+                results.extend(self.extract(child, page_key, soup, data_schemaorg))
+            return results
+
+        key = (wrapper.get_key(), page_key)
+        if key in self.extractions:
+            self.hits += 1
+            self.extractions.move_to_end(key)
+            return self.extractions[key]
+
+        self.misses += 1
+        values = wrapper.extract(soup, data_schemaorg)
+        self.extractions[key] = values
+        if len(self.extractions) > self.size:
+            self.extractions.popitem(last=False)
+        return values
@@ -1,5 +1,206 @@
 # coding=utf-8
-from soupsieve import escape
+from .node_table import NodeTable
+
+
+class SelectorIndex:
+    """
+    The nodes of a soup indexed by tag name, class and attribute, built once per page
+    to find the nodes matched by the fragmented selectors without selecting in the whole soup
+
+    A set of nodes is an int where the bit i is set if the node at the position i is in the set.
+    """
+    def __init__(self, soup, node_table=None):
+        """
+
+        :param soup: a BeautifulSoup object
+        :param node_table: the table of soup, built here if not given
+        :type soup: BeautifulSoup
+        :type node_table: NodeTable
+        """
+        if node_table is None:
+            node_table = NodeTable(soup)
+        self.node_table = node_table
+        self.ends = node_table.ends  # the position following the last descendant of each node
+        self.nodes = node_table.nodes
+        self.tags = _get_positions_by_name(node_table.names, node_table.tags)
+        self.classes = _get_positions_by_name(node_table.classes, node_table.class_ids, node_table.class_starts)
+        self.attributes = _get_positions_by_name(node_table.attribute_names, node_table.attribute_ids,
+                                                 node_table.attribute_starts)
+        self.parts = {}  # a simple selector -> the nodes it matches
+
+    def select(self, fragmented_selector, prefixes=None):
+        """
+
+        :param fragmented_selector: a fragmented selector
+        :param prefixes: the nodes already found for some prefixes of the fragmented selector
+        :type fragmented_selector: [[str]]
+        :type prefixes: {tuple:int}
+
+        :return: the nodes matched by the selector, like soup.select
+        :rtype: int
+        """
+        if prefixes is None:
+            prefixes = {}
+        compounds = tuple(tuple(tag) for tag in fragmented_selector if tag)
+
+        # the nodes matched by the longest prefix already known
+        length = len(compounds)
+        while length and compounds[:length] not in prefixes:
+            length -= 1
+        nodes = prefixes[compounds[:length]] if length else None
+
+        for i in range(length, len(compounds)):
+            matched = self.__match_compound(compounds[i])
+            nodes = matched if nodes is None else self.__get_descendants(nodes) & matched
+            prefixes[compounds[:i + 1]] = nodes
+        return nodes or 0
+
+    def get_positions(self, nodes):
+        """
+
+        :param nodes: some nodes, as returned by select
+        :type nodes: int
+
+        :return: the positions of the nodes in document order
+        :rtype: [int]
+        """
+        bits = bin(nodes)[:1:-1]  # the bit i is the character i
+        positions = []
+        position = bits.find("1")
+        while position != -1:
+            positions.append(position)
+            position = bits.find("1", position + 1)
+        return positions
+
+    def get_nodes(self, nodes):
+        """
+
+        :param nodes: some nodes, as returned by select
+        :type nodes: int
+
+        :return: the nodes in document order
+        :rtype: [Tag]
+        """
+        return [self.nodes[position] for position in self.get_positions(nodes)]
+
+    def find_all(self, fragmented_selector, selector):
+        """
+
+        :param fragmented_selector: a fragmented selector
+        :param selector: the same selector as a string
+        :type fragmented_selector: [[str]]
+        :type selector: str
+
+        :return: the positions of the nodes matched by the selector in document order, like soup.select(selector)
+        :rtype: [int]
+        """
+        import soupsieve  # imports bs4, the selectors are only built to train
+
+        try:
+            if fragmented_selector_to_selector(fragmented_selector or []):
+                return self.get_positions(self.select(fragmented_selector))
+        except soupsieve.SelectorSyntaxError:  # a simple selector is not valid alone
+            pass
+        positions = self.node_table.positions
+        return [positions[id(node)] for node in self.node_table.soup.select(selector)]
+
+    def __match_compound(self, compound):
+        """
+
+        :param compound: the simple selectors of a tag
+        :type compound: (str)
+
+        :return: the nodes matched by all the simple selectors
+        :rtype: int
+        """
+        nodes = None
+        for part in compound:
+            if part not in self.parts:
+                self.parts[part] = self.__match_part(part)
+            nodes = self.parts[part] if nodes is None else nodes & self.parts[part]
+        return nodes
+
+    def __match_part(self, part):
+        """
+
+        :param part: a simple selector (tag name, class, id or attribute)
+        :type part: str
+
+        :return: the nodes matched by the selector
+        :rtype: int
+        """
+        import soupsieve
+
+        pattern = soupsieve.compile(part)
+        nodes = 0
+        for position in self.__get_candidates(pattern):
+            if pattern.match(self.nodes[position]):
+                nodes |= 1 << position
+        return nodes
+
+    def __get_candidates(self, pattern):
+        """
+
+        :param pattern: a compiled simple selector
+        :type pattern: SoupSieve
+
+        :return: the positions of the nodes the selector may match
+        :rtype: iterable of int
+        """
+        selectors = getattr(pattern, "selectors", None) or [None]
+        if len(selectors) == 1:
+            selector = selectors[0]
+            tag = getattr(selector, "tag", None)
+            if tag is not None and tag.name != "*" and not tag.prefix:
+                return self.tags.get(tag.name.lower(), [])
+            for cls in getattr(selector, "classes", ()):
+                return self.classes.get(cls.lower(), [])
+            for attribute in getattr(selector, "attributes", ()):
+                if not attribute.prefix and not attribute.inverse:
+                    return self.attributes.get(attribute.attribute.lower(), [])
+        return range(len(self.nodes))
+
+    def __get_descendants(self, nodes):
+        """
+
+        :param nodes: some nodes
+        :type nodes: int
+
+        :return: all the descendants of the nodes
+        :rtype: int
+        """
+        descendants = 0
+        while nodes:
+            position = (nodes & -nodes).bit_length() - 1
+            end = self.ends[position]
+            descendants |= ((1 << end) - 1) ^ ((1 << (position + 1)) - 1)
+            nodes = nodes >> end << end  # the nodes inside were already added
+        return descendants
+
+
+def _get_positions_by_name(names, ids, starts=None):
+    """
+
+    :param names: the interned names of a node table
+    :param ids: the id of the name of each node, or the ids of the names of all the nodes
+    :param starts: where the ids of each node start in ids, if a node has several names
+    :type names: [str]
+    :type ids: array
+    :type starts: array
+
+    :return: the positions of the nodes having each name, lowercased
+    :rtype: {str:[int]}
+    """
+    keys = [name.lower() for name in names]
+    positions = {}
+    if starts is None:
+        for position, i in enumerate(ids):
+            positions.setdefault(keys[i], []).append(position)
+    else:
+        for position in range(len(starts) - 1):
+            for i in ids[starts[position]:starts[position + 1]]:
+                positions.setdefault(keys[i], []).append(position)
+    return positions
 
 
 def find_selector(child):
@@ -12,6 +213,8 @@ def find_selector(child):
     :return: the selector list made of tags and attributes that child has
     :rtype: [[str]]
     """
+    from soupsieve import escape
+
     if not child:
         return []
 
@@ -81,13 +284,15 @@ def get_tags(fragmented_selector):
     return tags
 
 
-def simplify_fragmented_selector(soup, fragmented_selector):
+def simplify_fragmented_selector(soup, fragmented_selector, selector_index=None):
     """
 
     :param soup: a BeautifulSoup object
     :param fragmented_selector: a list of tags
+    :param selector_index: the index of soup, built here if not given
     :type soup: BeautifulSoup
     :type fragmented_selector: [[str]]
+    :type selector_index: SelectorIndex
 
     :return: the selector simplified
     :rtype: [[str]]
@@ -99,6 +304,16 @@ def simplify_fragmented_selector(soup, fragmented_selector):
     selector = fragmented_selector_to_selector(fragmented_selector)
     if not selector:
         return []
+
+    import soupsieve
+
+    if selector_index is None:
+        selector_index = SelectorIndex(soup)
+    try:
+        return __simplify_fragmented_selector_with_index(selector_index, fragmented_selector)
+    except soupsieve.SelectorSyntaxError:  # a simple selector is not valid alone, select the whole selectors
+        pass
+
     result = soup.select(selector)
     fragmented_selector = __simplify_fragmented_selector_attributes(soup, fragmented_selector, result)
 
@@ -152,6 +367,41 @@ def __simplify_fragmented_selector_attributes(soup, fragmented_selector, result)
     return fragmented_selector
 
 
+def __simplify_fragmented_selector_with_index(selector_index, fragmented_selector):
+    """
+    Removes the useless attributes like __simplify_fragmented_selector_attributes, finding the nodes with the index
+
+    Removing an attribute can only add nodes to the result, so the result is the same
+    as long as the selector matches the same nodes.
+
+    :param selector_index: the index of the soup
+    :param fragmented_selector: a list of tags
+    :type selector_index: SelectorIndex
+    :type fragmented_selector: [[str]]
+
+    :return: the selector with useless attributes removed
+    :rtype: [[str]]
+    """
+    prefixes = {}
+    result = selector_index.select(fragmented_selector, prefixes)
+
+    i = 0
+    while i < len(fragmented_selector):
+        tag = fragmented_selector[i]
+        j = 0
+        while j < len(tag):
+            prev = tag.pop(j)
+            if not fragmented_selector_to_selector(fragmented_selector) or \
+                    selector_index.select(fragmented_selector, prefixes) != result:
+                tag.insert(j, prev)
+                j += 1
+        if not tag:
+            fragmented_selector.pop(i)
+        else:
+            i += 1
+    return fragmented_selector
+
+
 def __are_results_equals(list1, list2):
     """
 
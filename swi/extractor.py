@@ -1,59 +1,290 @@
 # coding=utf-8
-from .page_extractor import PageExtractor
-from bs4 import BeautifulSoup
-from fuzzywuzzy import fuzz
-import extruct
+import asyncio
+import json
+import os
 import pickle
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from .wrapper import WrapperCss, WrapperMeta, WrapperGroup, Wrappers
+from .plan import ExtractionPlan
+from .backends import get_backend, Bs4Backend, LxmlBackend
+from .cache import ExtractionCache, CACHE_SIZE
+from .serialization import dump_wrappers, load_wrappers
+from .instrumentation import NO_INSTRUMENTATION
+from .page import get_page
+from .schemaorg import Metadata
+from .scoring import get_scorer
+from .stream import predict_stream, read_page
 
 
 class SupervisedWrapperExtractor:
-    def __init__(self):
+    def __init__(self, backend="bs4", cache_size=CACHE_SIZE, lean=False, instrumentation=None, train_workers=1,
+                 scorer="fuzzywuzzy"):
+        """
+
+        :param backend: the parser used to predict, "bs4" or "lxml" (faster, needs cssselect)
+        :param cache_size: the number of extractions on the train pages kept while training
+        :param lean: whether to keep the train pages compressed between the trainings instead of parsed,
+            training is slower (the pages are parsed again to score new wrappers) but takes less memory
+        :param instrumentation: records the time spent in the stages of the predictions and trainings,
+            nothing is recorded by default (the pages predicted by worker processes are not recorded)
+        :param train_workers: the number of processes building the wrappers of a train page and scoring
+            the wrappers on the train pages, the best wrappers are the same as with one
+        :param scorer: the fuzzy scorer used to train, "fuzzywuzzy" or "rapidfuzz" (faster, needs rapidfuzz,
+            its partial ratios are sometimes higher so the wrappers trained may differ)
+        :type backend: str
+        :type cache_size: int
+        :type lean: bool
+        :type instrumentation: Instrumentation
+        :type train_workers: int
+        :type scorer: str
+        """
         self.extracted_pages = []
         self.best_wrappers = dict()
         self.retrain_best_wrappers = False
+        self.efficiencies = {}  # (page, label, wrapper, page2) -> efficiency of the wrapper of page on page2
+        self.scored_pages = 0  # the number of pages whose efficiencies are computed
+        self.extraction_cache = ExtractionCache(cache_size)
+        self.extraction_plan = None
+        self.backend = get_backend(backend)
+        self.prediction_backend = None  # the backend if it supports the extraction plan, else bs4
+        self.stream_backend = None  # the lxml backend used by predict_stream
+        self.lean = lean
+        self.finalized = False
+        self.instrumentation = instrumentation if instrumentation is not None else NO_INSTRUMENTATION
+        self.train_workers = train_workers
+        self.scorer = get_scorer(scorer)
 
-    def add_train_page(self, content, train_set, page_id=None):
+    def add_train_page(self, content, train_set, page_id=None, metadata=None):
         """
 
-        :param content: the page content
+        :param content: the page content, the page already parsed with BeautifulSoup or a Page
         :param train_set: labels associated with the values we want to find on the page
         :param page_id: url of the page
-        :type content: str
+        :param metadata: the meta data of the page, as returned by extruct.extract
+        :type content: str/bytes/BeautifulSoup/Page
         :type train_set: {str:[str]}
         :type page_id: str
+        :type metadata: {str:list}
         """
-        if not content:
+        if content is None or (isinstance(content, (str, bytes)) and not content):
             raise ValueError("Content should not be empty")
+        if self.finalized:
+            raise ValueError("The extractor was finalized, it cannot be trained anymore")
+        from .page_extractor import PageExtractor  # imports bs4, only needed to train
 
-        page_extractor = PageExtractor(page_content=content, id_=page_id, train_set=train_set)
+        with self.instrumentation.operation("train_page"):
+            page_extractor = PageExtractor(page_content=get_page(content, metadata), id_=page_id, train_set=train_set,
+                                           lean=self.lean, instrumentation=self.instrumentation,
+                                           workers=self.train_workers, scorer=self.scorer)
         self.extracted_pages.append(page_extractor)
         self.retrain_best_wrappers = True
 
-    def predict(self, page):
+    def predict(self, page, metadata=None):
         """
 
-        :param page: the page content
-        :type page: str
+        :param page: the page content, the page already parsed (a BeautifulSoup or an lxml tree) or a Page
+        :param metadata: the meta data of the page, as returned by extruct.extract
+        :type page: str/bytes/BeautifulSoup/lxml.etree._Element/Page
+        :type metadata: {str:list}
 
         :return: the extracted data from the page
         :rtype: {str:[str]/str}
+
+        A Page predicted by several extractors is parsed once per backend and its meta data are extracted once.
         """
-        if not page:
-            raise ValueError("Given page is NULL/empty")
+        page = get_page(page, metadata)
 
-        if self.retrain_best_wrappers:
-            self.best_wrappers = self.__get_best_wrappers()
-            self.retrain_best_wrappers = False
+        instrumentation = self.instrumentation
+        with instrumentation.operation("predict"):
+            self.__update_best_wrappers()
 
-        soup = BeautifulSoup(page, "lxml")
-        data_schemaorg = extruct.extract(page)
-        results = {}
-        for label, wrapper in self.best_wrappers.items():
-            results[label] = wrapper.extract(soup, data_schemaorg)
+            with instrumentation.stage("parse"):
+                document = page.get_document(self.prediction_backend)
+            # only extracted for the syntaxes of the meta wrappers, before they extract (the "metadata" stage)
+            data_schemaorg = page.get_metadata(instrumentation)
+            if self.extraction_plan.syntaxes:
+                data_schemaorg.get(self.extraction_plan.syntaxes)
+            with instrumentation.stage("select"):
+                selector_results = self.prediction_backend.select(self.extraction_plan, document)
+            instrumentation.count("selects", len(self.extraction_plan.selectors))
+            instrumentation.count("nodes", len(selector_results.nodes))
+
+            results = {}
+            with instrumentation.stage("extract"):
+                for label, wrapper in self.best_wrappers.items():
+                    start = time.perf_counter()
+                    results[label] = wrapper.extract(document, data_schemaorg, selector_results=selector_results,
+                                                     instrumentation=instrumentation)
+                    instrumentation.add_label_time(label, time.perf_counter() - start)
 
         return results
 
+    def predict_stream(self, stream):
+        """
+
+        :param stream: the page content, a file object or an iterable of chunks
+        :type stream: file/iterable of str/bytes
+
+        :return: the extracted data from the page, the same as predict
+        :rtype: {str:[str]/str}
+
+        The page is parsed with lxml as it is read, and only the values of the nodes selected by
+        the wrappers are kept, so a page does not have to fit in memory with its whole tree.
+        Parsing a stream needs cssselect, and a plan lxml does not support is predicted from the whole page.
+        """
+        self.__update_best_wrappers()
+        if self.stream_backend is None:
+            self.stream_backend = self.backend if isinstance(self.backend, LxmlBackend) else LxmlBackend()
+
+        if not self.stream_backend.supports(self.extraction_plan):
+            return self.predict(read_page(stream))
+        with self.instrumentation.operation("predict_stream"):
+            return predict_stream(self.best_wrappers, self.extraction_plan, self.stream_backend, stream)
+
+    def get_best_wrappers(self):
+        """
+
+        :return: the best wrappers associated with labels, trained again if pages were added
+        :rtype: {str:Wrapper}
+        """
+        self.__update_best_wrappers()
+        return self.best_wrappers
+
+    async def apredict(self, page, executor=None):
+        """
+
+        :param page: the page content, the page already parsed or a Page, as for predict
+        :param executor: the executor of the thread running predict, the default executor of the loop if None
+        :type page: str/bytes/BeautifulSoup/lxml.etree._Element/Page
+        :type executor: concurrent.futures.Executor
+
+        :return: the extracted data from the page, predicted in a thread not to block the event loop
+        :rtype: {str:[str]/str}
+
+        The best wrappers are trained in the loop if pages were added. To predict in worker processes
+        or to predict many pages with backpressure, see swi.aio.AsyncExtractor.
+        """
+        self.__update_best_wrappers()
+        return await asyncio.get_running_loop().run_in_executor(executor, self.predict, page)
+
+    def finalize(self):
+        """
+        Trains the best wrappers if pages were added, then drops the train pages and the efficiencies
+        of their wrappers: the extractor still predicts but cannot be trained anymore
+        """
+        self.__update_best_wrappers()
+        self.extracted_pages = []
+        self.efficiencies = {}
+        self.scored_pages = 0
+        self.extraction_cache = ExtractionCache(self.extraction_cache.size)
+        self.finalized = True
+
+    def predict_many(self, pages, workers=None, chunksize=1, ordered=True):
+        """
+
+        :param pages: the pages contents
+        :param workers: the number of worker processes (os.cpu_count() by default), 1 to predict in this process
+        :param chunksize: the number of pages sent at once to a worker
+        :param ordered: whether the results are yielded in the order of pages or as soon as they are ready
+        :type pages: iterable of str
+        :type workers: int
+        :type chunksize: int
+        :type ordered: bool
+
+        :return: for each page, its index in pages, the extracted data and the error raised by predict.
+            Either the extracted data or the error is None, a failing page does not stop the others.
+        :rtype: iterator of (int, {str:[str]/str}, Exception)
+
+        The best wrappers are sent once to each worker, and at most two chunks per worker are
+        waiting to be processed so pages are read from the iterable as the results are consumed.
+        If a worker dies (out of memory, crash of the parser), the next chunks are sent to new workers
+        and each chunk being processed is predicted again, alone in a new worker: only the pages of
+        a chunk killing this worker too get a BrokenProcessPool error.
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize should be at least 1")
+
+        self.__update_best_wrappers()
+        chunks = _get_chunks(enumerate(pages), chunksize)
+
+        if workers == 1:
+            for chunk in chunks:
+                yield from _predict_pages(self, chunk)
+            return
+
+        workers = workers or os.cpu_count() or 1
+        executor = self.__start_predict_workers(workers)
+        try:
+            pending = deque() if ordered else {}  # the futures of the chunks being predicted, with their chunk
+            for chunk in chunks:
+                try:
+                    future = executor.submit(_predict_pages_in_worker, chunk)
+                except BrokenProcessPool:  # a worker died
+                    executor.shutdown(wait=False)
+                    executor = self.__start_predict_workers(workers)
+                    future = executor.submit(_predict_pages_in_worker, chunk)
+                if ordered:
+                    pending.append((future, chunk))
+                else:
+                    pending[future] = chunk
+                if len(pending) >= 2 * workers:
+                    yield from _pop_results(pending, ordered, self.__predict_in_new_worker)
+            while pending:
+                yield from _pop_results(pending, ordered, self.__predict_in_new_worker)
+        finally:
+            executor.shutdown()
+
+    def __predict_in_new_worker(self, chunk):
+        """
+
+        :param chunk: the pages of a chunk whose worker died, with their index
+        :type chunk: [(int, str)]
+
+        :return: the results of the chunk predicted alone in a new worker process,
+            a BrokenProcessPool error for each page if the chunk kills this worker too
+        :rtype: [(int, {str:[str]/str}, Exception)]
+        """
+        executor = self.__start_predict_workers(1)
+        try:
+            return executor.submit(_predict_pages_in_worker, chunk).result()
+        except BrokenProcessPool as error:
+            return [(index, None, error) for index, _ in chunk]
+        finally:
+            executor.shutdown()
+
+    def __start_predict_workers(self, workers):
+        """
+
+        :param workers: the number of worker processes
+        :type workers: int
+
+        :return: the worker processes of predict_many, they get the best wrappers once
+        :rtype: ProcessPoolExecutor
+        """
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.best_wrappers, self.backend.name))
+
+    def __update_best_wrappers(self):
+        """
+        Retrains the best wrappers if pages were added since the last training
+        and compiles their extraction plan
+        """
+        if self.retrain_best_wrappers:
+            with self.instrumentation.operation("train"):
+                self.best_wrappers = self.__get_best_wrappers()
+            self.retrain_best_wrappers = False
+            self.extraction_plan = None
+
+        if self.extraction_plan is None:
+            self.extraction_plan = ExtractionPlan(self.best_wrappers.values())
+            if self.backend.supports(self.extraction_plan):
+                self.prediction_backend = self.backend
+            else:
+                self.prediction_backend = Bs4Backend()
+
     def __get_best_wrappers(self):
         """
         :return: the best wrappers associated with labels
@@ -63,36 +294,20 @@ class SupervisedWrapperExtractor:
         best compared to each page and train_set.
         For the images we take all the wrappers, not only the bests.
         """
+        self.__score_new_pages()
+
         best_wrappers = dict()
-        for page in self.extracted_pages:
+        for i, page in enumerate(self.extracted_pages):
             for label, wrappers in page.wrappers_dict.items():
                 if label not in best_wrappers.keys():
                     best_wrappers[label] = [0, wrappers[0]]
 
-                for wrapper in wrappers:
+                for k, wrapper in enumerate(wrappers):
                     efficiency = 0
-                    for page2 in self.extracted_pages:
-                        train_set2 = page2.train_set
-
+                    for j, page2 in enumerate(self.extracted_pages):
                         # label was not trained for this page
-                        if not label in train_set2.keys():
-                            continue
-
-                        if not isinstance(train_set2[label], list):
-                            expected_values = [train_set2[label]]
-                        else:
-                            expected_values = train_set2[label]
-
-                        predicted_values = wrapper.extract(page2.soup, page2.data_schemaorg)
-                        if type(predicted_values) is not list:
-                            predicted_values = [predicted_values]
-                        for expected_value in expected_values:
-                            for predicted_value in predicted_values:
-                                if fuzz.partial_ratio(expected_value, predicted_value) == 100:
-                                    efficiency += 1
-                                    break
-                                else:
-                                    efficiency -= 0.5
+                        if label in page2.train_set.keys():
+                            efficiency += self.efficiencies[(i, label, k, j)]
 
                     if efficiency > best_wrappers[label][0]:
                         best_wrappers[label][0] = efficiency
@@ -100,6 +315,89 @@ class SupervisedWrapperExtractor:
 
         return {label: wrapper[1] for label, wrapper in best_wrappers.items()}
 
+    def __score_new_pages(self):
+        """
+        Fills the efficiencies of the wrappers of the new pages on all the pages,
+        and of the wrappers of the other pages on the new pages
+        """
+        new_pages = range(self.scored_pages, len(self.extracted_pages))
+        if not new_pages:
+            return
+
+        if self.train_workers > 1 and len(self.extracted_pages) > 1:
+            self.__score_pages_in_workers(new_pages)
+        else:
+            self.__score_pages(new_pages)
+        self.scored_pages = len(self.extracted_pages)
+
+    def __score_pages(self, new_pages):
+        """
+
+        :param new_pages: the positions of the pages added since the last scoring
+        :type new_pages: range
+        """
+        # page by page, so a lean page is only parsed once and released before the next one
+        for j, page2 in enumerate(self.extracted_pages):
+            if self.lean:
+                page2.restore()
+            with self.instrumentation.stage("score"):
+                for i, page in enumerate(self.extracted_pages):
+                    if i not in new_pages and j not in new_pages:
+                        continue
+                    for label, wrappers in page.wrappers_dict.items():
+                        if label in page2.train_set.keys():
+                            for k, wrapper in enumerate(wrappers):
+                                self.efficiencies[(i, label, k, j)] = self.__get_efficiency(wrapper, j, label)
+                                self.instrumentation.count("efficiencies")
+            if self.lean:
+                page2.release()
+
+    def __score_pages_in_workers(self, new_pages):
+        """
+
+        :param new_pages: the positions of the pages added since the last scoring
+        :type new_pages: range
+
+        Each worker process gets a train page with the wrappers to score on it, parses it again and extracts
+        its meta data, as a lean page is restored. The efficiencies are the same as the ones computed here.
+        """
+        tasks = []
+        for j, page2 in enumerate(self.extracted_pages):
+            wrappers = []
+            for i, page in enumerate(self.extracted_pages):
+                if i not in new_pages and j not in new_pages:
+                    continue
+                for label, wrappers_label in page.wrappers_dict.items():
+                    if label in page2.train_set.keys():
+                        for k, wrapper in enumerate(wrappers_label):
+                            wrappers.append(((i, label, k, j), wrapper))
+            if wrappers:
+                tasks.append((page2.get_content(), page2.train_set, wrappers, self.scorer.name))
+
+        with self.instrumentation.stage("score"):
+            with ProcessPoolExecutor(max_workers=min(self.train_workers, len(tasks))) as executor:
+                for efficiencies in executor.map(_score_page, tasks):
+                    self.efficiencies.update(efficiencies)
+                    self.instrumentation.count("efficiencies", len(efficiencies))
+
+    def __get_efficiency(self, wrapper, position, label):
+        """
+
+        :param wrapper: a wrapper trained for label
+        :param position: the position of a train page where label was trained
+        :param label: the label of the wrapper
+        :type wrapper: Wrapper
+        :type position: int
+        :type label: str
+
+        :return: how well the values extracted by the wrapper match the expected values of the page
+        :rtype: float
+        """
+        page = self.extracted_pages[position]
+        data_schemaorg = page.meta_index if page.meta_index is not None else page.data_schemaorg
+        predicted_values = self.extraction_cache.extract(wrapper, position, page.soup, data_schemaorg)
+        return _get_efficiency(predicted_values, page.train_set[label], self.scorer)
+
     def fill_best_wrappers_from_dictionary(self, dictionary):
         """
 
@@ -137,26 +435,31 @@ class SupervisedWrapperExtractor:
                         wrapper.wrappers.append(wrap)
                     wrappers.append(wrapper)
                 self.best_wrappers[label] = Wrappers(wrappers)
+        self.extraction_plan = None
 
     # load best_wrappers
     def load(self, path):
         """
 
-        :param path: the path of the wrappers to load
+        :param path: the path of the wrappers to load, saved by save
         :type path: str
+
+        The wrappers are ready to predict, bs4 is only imported by the first prediction.
         """
-        f = open(path, 'rb')
-        self.best_wrappers = pickle.load(f)
+        with open(path, 'r', encoding="utf-8") as f:
+            self.best_wrappers = load_wrappers(json.load(f))
+        self.extraction_plan = None
 
     # save best_wrappers
     def save(self, path):
         """
 
-        :param path: the file where to save the best wrappers
+        :param path: the file where to save the best wrappers, as versioned JSON
         :type path: str
         """
-        f = open(path, 'w')
-        pickle.dump(self.best_wrappers, f)
+        self.__update_best_wrappers()
+        with open(path, 'w', encoding="utf-8") as f:
+            json.dump(dump_wrappers(self.best_wrappers), f, separators=(",", ":"), ensure_ascii=False)
 
     def __str__(self):
         res = "Number of trained pages: {}\n".format(len(self.extracted_pages))
@@ -164,3 +467,157 @@ class SupervisedWrapperExtractor:
             res += "############### PAGE NUMBER {} ###############\n".format(i)
             res += str(self.extracted_pages[i]) + '\n'
         return res
+
+
+_worker_extractor = None
+
+
+def _init_worker(best_wrappers, backend):
+    """
+
+    :param best_wrappers: the wrappers used by the worker process
+    :param backend: the name of the backend used by the worker process
+    :type best_wrappers: {str:Wrapper}
+    :type backend: str
+    """
+    global _worker_extractor
+    _worker_extractor = SupervisedWrapperExtractor(backend=backend)
+    _worker_extractor.best_wrappers = best_wrappers
+
+
+def _predict_pages_in_worker(pages):
+    return _predict_pages(_worker_extractor, pages)
+
+
+def _predict_pages(extractor, pages):
+    """
+
+    :param extractor: the extractor to predict with
+    :param pages: the pages with their index
+    :type extractor: SupervisedWrapperExtractor
+    :type pages: [(int, str)]
+
+    :return: the index, the extracted data and the error for each page
+    :rtype: [(int, {str:[str]/str}, Exception)]
+    """
+    results = []
+    for index, page in pages:
+        try:
+            results.append((index, extractor.predict(page), None))
+        except Exception as error:
+            try:
+                pickle.dumps(error)
+            except Exception:  # the error has to go back to the main process
+                error = RuntimeError(repr(error))
+            results.append((index, None, error))
+    return results
+
+
+def _score_page(task):
+    """
+
+    :param task: the content of a train page, its train set, the wrappers to score with their key
+        in the efficiencies and the name of the scorer
+    :type task: (str/bytes, {str:[str]}, [((int, str, int, int), Wrapper)], str)
+
+    :return: the key and the efficiency of each wrapper on the page
+    :rtype: [((int, str, int, int), float)]
+    """
+    from bs4 import BeautifulSoup
+
+    page_content, train_set, wrappers, scorer = task
+    soup = BeautifulSoup(page_content, "lxml")
+    data_schemaorg = Metadata(page_content)
+    extraction_cache = ExtractionCache()
+    scorer = get_scorer(scorer)
+    return [(key, _get_efficiency(extraction_cache.extract(wrapper, 0, soup, data_schemaorg), train_set[key[1]],
+                                  scorer)) for key, wrapper in wrappers]
+
+
+def _get_efficiency(predicted_values, expected_values, scorer):
+    """
+
+    :param predicted_values: the values extracted by a wrapper on a train page
+    :param expected_values: the values of the label of the wrapper in the train set of the page
+    :param scorer: scores the predicted values
+    :type predicted_values: [str]/str
+    :type expected_values: [str]/str
+    :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
+
+    :return: how well the values extracted by the wrapper match the expected values of the page
+    :rtype: float
+    """
+    if not isinstance(expected_values, list):
+        expected_values = [expected_values]
+    if type(predicted_values) is not list:
+        predicted_values = [predicted_values]
+
+    efficiency = 0
+    for expected_value in expected_values:
+        for score in scorer.partial_ratios(expected_value, predicted_values, score_cutoff=100):
+            if score == 100:
+                efficiency += 1
+                break
+            else:
+                efficiency -= 0.5
+    return efficiency
+
+
+def _get_chunks(iterable, chunksize):
+    """
+
+    :param iterable: an iterable
+    :param chunksize: the size of the chunks
+    :type chunksize: int
+
+    :return: the items of iterable grouped by lists of chunksize items
+    :rtype: iterator of list
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _pop_results(pending, ordered, retry):
+    """
+
+    :param pending: the futures of the chunks being predicted with their chunk
+    :param ordered: whether pending is a deque to pop in order or a dict to pop as completed
+    :param retry: predicts again a chunk whose worker died
+    :type pending: deque/dict
+    :type ordered: bool
+    :type retry: function
+
+    :return: the results of the first chunk or of the chunks already completed
+    :rtype: iterator of (int, {str:[str]/str}, Exception)
+    """
+    if ordered:
+        yield from _get_results(*pending.popleft(), retry)
+    else:
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            yield from _get_results(future, pending.pop(future), retry)
+
+
+def _get_results(future, chunk, retry):
+    """
+
+    :param future: the future of a chunk predicted by a worker
+    :param chunk: the pages of the chunk with their index
+    :param retry: predicts again a chunk whose worker died
+    :type future: Future
+    :type chunk: [(int, str)]
+    :type retry: function
+
+    :return: the results of the chunk, predicted again by retry if a worker died
+    :rtype: [(int, {str:[str]/str}, Exception)]
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool:  # the chunk or another one being predicted killed a worker
+        return retry(chunk)
@@ -0,0 +1,215 @@
+# coding=utf-8
+import threading
+import time
+
+
+class Instrumentation:
+    """
+    The wall time of the stages of the operations of an extractor (predict, train_page, train),
+    with counters and the time spent on each label
+
+    Each operation gives a record, passed to callback when it ends and added to the totals returned by to_dict.
+    An operation called by another one (predict trains the wrappers first if pages were added) has its own record.
+    The time of a stage inside another one (regex inside extract) is only counted in the inner stage,
+    so the stages of an operation add up to at most its wall time.
+    The operations running are kept by thread: operations of several threads (apredict, AsyncExtractor) get their own
+    records, summed in the same totals.
+    """
+    def __init__(self, callback=None):
+        """
+
+        :param callback: called with the record of each operation when it ends
+        :type callback: function
+        """
+        self.callback = callback
+        self.totals = {}  # operation -> the sum of its records, with the number of calls
+        self.lock = threading.Lock()  # held to add a record to the totals
+        self.running = threading.local()  # the records and the stages running in each thread
+
+    @property
+    def records(self):
+        """
+        :return: the records of the operations running in this thread, the innermost last
+        :rtype: [dict]
+        """
+        if not hasattr(self.running, "records"):
+            self.running.records = []
+        return self.running.records
+
+    @property
+    def stages(self):
+        """
+        :return: the time of the stages inside each stage running in this thread, the innermost last
+        :rtype: [float]
+        """
+        if not hasattr(self.running, "stages"):
+            self.running.stages = []
+        return self.running.stages
+
+    def operation(self, name):
+        """
+
+        :param name: the name of the operation
+        :type name: str
+
+        :return: a context manager recording the operation
+        :rtype: _Operation
+        """
+        return _Operation(self, name)
+
+    def stage(self, name):
+        """
+
+        :param name: the name of the stage
+        :type name: str
+
+        :return: a context manager adding its wall time to the stage of the current operation
+        :rtype: _Stage
+        """
+        return _Stage(self, name)
+
+    def count(self, counter, number=1):
+        """
+
+        :param counter: the name of the counter
+        :param number: the number added to the counter of the current operation
+        :type counter: str
+        :type number: int
+        """
+        if self.records:
+            counters = self.records[-1]["counters"]
+            counters[counter] = counters.get(counter, 0) + number
+
+    def add_label_time(self, label, seconds):
+        """
+
+        :param label: a label of the train sets
+        :param seconds: the time spent on the label by the current operation
+        :type label: str
+        :type seconds: float
+        """
+        if self.records:
+            labels = self.records[-1]["labels"]
+            labels[label] = labels.get(label, 0) + seconds
+
+    def add_stage_time(self, stage, seconds):
+        if self.records:
+            stages = self.records[-1]["stages"]
+            stages[stage] = stages.get(stage, 0) + seconds
+
+    def start_stage(self):
+        self.stages.append(0)
+
+    def end_stage(self, stage, seconds):
+        """
+
+        :param stage: the name of the stage
+        :param seconds: the wall time of the stage
+        :type stage: str
+        :type seconds: float
+
+        adds the wall time of the stage without the stages inside it, which is added to the stage around it
+        """
+        inner = self.stages.pop()
+        if self.stages:
+            self.stages[-1] += seconds
+        self.add_stage_time(stage, seconds - inner)
+
+    def start(self, name):
+        self.records.append({"operation": name, "seconds": 0, "stages": {}, "counters": {}, "labels": {}})
+
+    def end(self, seconds):
+        record = self.records.pop()
+        record["seconds"] = seconds
+
+        with self.lock:
+            total = self.totals.setdefault(record["operation"], {"calls": 0, "seconds": 0, "stages": {},
+                                                                 "counters": {}, "labels": {}})
+            total["calls"] += 1
+            total["seconds"] += seconds
+            for key in ("stages", "counters", "labels"):
+                for name, value in record[key].items():
+                    total[key][name] = total[key].get(name, 0) + value
+
+        if self.callback is not None:
+            self.callback(record)
+
+    def to_dict(self):
+        """
+
+        :return: for each operation, the number of calls and the sums of their wall time, of the time of their stages
+            and labels (in seconds) and of their counters
+        :rtype: {str:dict}
+        """
+        with self.lock:
+            return {name: {"calls": total["calls"], "seconds": total["seconds"], "stages": dict(total["stages"]),
+                           "counters": dict(total["counters"]), "labels": dict(total["labels"])}
+                    for name, total in self.totals.items()}
+
+    def reset(self):
+        with self.lock:
+            self.totals = {}
+
+
+class NoInstrumentation:
+    """
+    The instrumentation of an extractor that is not instrumented, does nothing
+    """
+    def operation(self, name):
+        return _NOTHING
+
+    def stage(self, name):
+        return _NOTHING
+
+    def count(self, counter, number=1):
+        pass
+
+    def add_label_time(self, label, seconds):
+        pass
+
+    def to_dict(self):
+        return {}
+
+
+class _Operation:
+    __slots__ = ("instrumentation", "name", "start")
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.instrumentation.start(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.end(time.perf_counter() - self.start)
+
+
+class _Stage:
+    __slots__ = ("instrumentation", "name", "start")
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.instrumentation.start_stage()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.end_stage(self.name, time.perf_counter() - self.start)
+
+
+class _Nothing:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NOTHING = _Nothing()
+NO_INSTRUMENTATION = NoInstrumentation()
@@ -0,0 +1,222 @@
+# coding=utf-8
+from array import array
+
+
+class NodeTable:
+    """
+    The tags of a soup in flat arrays, built in one walk of the soup once per train page
+
+    The tags are numbered in document order (like soup.select), so the descendants of the tag at
+    position p are the positions from p + 1 to ends[p] - 1: ancestor and descendant checks are
+    interval tests. The parent of a child of the soup is -1. Tag names, classes and attribute names
+    are interned, each tag holds their ids.
+
+    Every string of the document is read once and appended to a concatenated document,
+    the text of a tag is then the slice [text_starts[p]:text_ends[p]] of its document.
+    bs4 only keeps some kinds of strings in getText() (see Tag.interesting_string_types: the
+    content of a script is ignored by its parent), so there is one concatenated document
+    for each of these kinds.
+    """
+    def __init__(self, soup):
+        self.soup = soup
+        self.nodes = []  # the tags in document order, like soup.findChildren(recursive=True)
+        self.positions = {}  # id(tag) -> position of the tag
+        self.parents = array("l")
+        self.ends = array("l")  # the position following the last descendant of each tag
+        self.tags = array("l")  # the id of the name of each tag
+        self.names = []
+        self.class_starts = array("l", [0])  # the classes of the tag p are class_ids[class_starts[p]:class_starts[p + 1]]
+        self.class_ids = array("l")
+        self.classes = []
+        self.attribute_starts = array("l", [0])  # the same for the names of the attributes
+        self.attribute_ids = array("l")
+        self.attribute_names = []
+        self.text_documents = array("l")  # the document of the text of each tag
+        self.text_starts = array("l")
+        self.text_ends = array("l")
+        self.documents = []
+        self.__build(soup)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def is_ancestor(self, ancestor, position):
+        """
+
+        :param ancestor: the position of a tag, -1 for the soup
+        :param position: the position of another tag
+        :type ancestor: int
+        :type position: int
+
+        :return: whether the tag at ancestor is a strict ancestor of the tag at position
+        :rtype: bool
+        """
+        if ancestor == -1:
+            return position != -1
+        return ancestor < position < self.ends[ancestor]
+
+    def get_descendants(self, position):
+        """
+
+        :param position: the position of a tag
+        :type position: int
+
+        :return: the positions of the tag and of its descendants, in document order
+        :rtype: range
+        """
+        return range(position, self.ends[position])
+
+    def get_name(self, position):
+        return self.names[self.tags[position]]
+
+    def get_classes(self, position):
+        """
+
+        :param position: the position of a tag
+        :type position: int
+
+        :return: the classes of the tag
+        :rtype: [str]
+        """
+        return [self.classes[i] for i in self.class_ids[self.class_starts[position]:self.class_starts[position + 1]]]
+
+    def get_attribute_names(self, position):
+        """
+
+        :param position: the position of a tag
+        :type position: int
+
+        :return: the names of the attributes of the tag, in the order of tag.attrs
+        :rtype: [str]
+        """
+        return [self.attribute_names[i]
+                for i in self.attribute_ids[self.attribute_starts[position]:self.attribute_starts[position + 1]]]
+
+    def get_text(self, position):
+        """
+
+        :param position: the position of the tag
+        :type position: int
+
+        :return: the text of the tag, same as tag.getText()
+        :rtype: str
+        """
+        return self.documents[self.text_documents[position]][self.text_starts[position]:self.text_ends[position]]
+
+    def get_text_length(self, position):
+        return self.text_ends[position] - self.text_starts[position]
+
+    def __build(self, soup):
+        """
+
+        :param soup: a BeautifulSoup object
+        :type soup: BeautifulSoup
+
+        walks the soup once, filling the arrays
+        """
+        from bs4.element import NavigableString, CData, Tag  # imported with bs4 by the training only
+
+        default_string_types = (NavigableString, CData)
+        name_ids = {}
+        class_ids = {}
+        attribute_ids = {}
+        keys = {}  # string types of a document -> index of the document
+        type_keys = {}  # id of the string types of a tag -> (the types, kept for their id, their key in keys)
+        documents = []
+        lengths = []
+        string_documents = {}  # type of a string -> indexes of the documents it belongs to
+        nodes, parents, ends, tags = self.nodes, self.parents, self.ends, self.tags
+        text_documents, text_starts, text_ends = self.text_documents, self.text_starts, self.text_ends
+
+        stack = [(-1, iter(soup.contents))]
+        while stack:
+            position, children = stack[-1]
+            for child in children:
+                if isinstance(child, Tag):
+                    types = _get_string_types(child, default_string_types)
+                    if id(types) not in type_keys:
+                        type_keys[id(types)] = (types, frozenset(types) if not isinstance(types, type) else types)
+                    key = type_keys[id(types)][1]
+                    if key not in keys:
+                        keys[key] = len(documents)
+                        documents.append([])
+                        lengths.append(0)
+                        string_documents = {}
+                    document = keys[key]
+
+                    child_position = len(nodes)
+                    nodes.append(child)
+                    self.positions[id(child)] = child_position
+                    parents.append(position)
+                    ends.append(0)
+                    name = child.name
+                    tags.append(name_ids[name] if name in name_ids else _intern(name_ids, self.names, name))
+                    attrs = child.attrs
+                    if attrs:
+                        classes = attrs.get("class", [])
+                        if isinstance(classes, str):
+                            classes = classes.split()
+                        for cls in classes:
+                            self.class_ids.append(_intern(class_ids, self.classes, cls))
+                        for attr in attrs:
+                            self.attribute_ids.append(_intern(attribute_ids, self.attribute_names, attr))
+                    self.class_starts.append(len(self.class_ids))
+                    self.attribute_starts.append(len(self.attribute_ids))
+                    text_documents.append(document)
+                    text_starts.append(lengths[document])
+                    text_ends.append(0)
+                    stack.append((child_position, iter(child.contents)))
+                    break
+
+                if isinstance(child, NavigableString):
+                    string_type = type(child)
+                    if string_type not in string_documents:
+                        string_documents[string_type] = [index for key, index in keys.items()
+                                                         if string_type is key or
+                                                         (not isinstance(key, type) and string_type in key)]
+                    for index in string_documents[string_type]:
+                        documents[index].append(child)
+                        lengths[index] += len(child)
+            else:
+                stack.pop()
+                if position != -1:
+                    ends[position] = len(nodes)
+                    text_ends[position] = lengths[text_documents[position]]
+
+        self.documents = ["".join(document) for document in documents]
+
+
+def _intern(ids, values, value):
+    """
+
+    :param ids: the id of each value already interned
+    :param values: the values interned, by id
+    :param value: the value to intern
+    :type ids: {str:int}
+    :type values: [str]
+    :type value: str
+
+    :return: the id of value
+    :rtype: int
+    """
+    if value not in ids:
+        ids[value] = len(values)
+        values.append(value)
+    return ids[value]
+
+
+def _get_string_types(tag, default):
+    """
+
+    :param tag: a tag
+    :param default: the string types of the versions of bs4 without them on the tags
+    :type tag: Tag
+    :type default: (type)
+
+    :return: the types of the strings taken into account by tag.getText()
+    :rtype: type/iterable of type
+    """
+    types = getattr(tag, "interesting_string_types", None)
+    if types is None:
+        types = getattr(tag, "MAIN_CONTENT_STRING_TYPES", None) or default
+    return types
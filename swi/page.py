@@ -0,0 +1,116 @@
+# coding=utf-8
+from lxml import etree
+from .backends import Bs4Backend, LxmlDocument
+from .instrumentation import NO_INSTRUMENTATION
+from .schemaorg import Metadata
+
+
+class Page:
+    """
+    A page given to the extractors as content, as a document already parsed or both, with its meta data if known
+
+    The page is parsed at most once per backend and its meta data extracted once, so the extractors predicting
+    the same Page (an A/B test of wrappers) share them. The content is only serialized from the document
+    when it is needed to parse the page for another backend or to extract its meta data.
+    """
+    def __init__(self, content=None, document=None, metadata=None):
+        """
+
+        :param content: the page content
+        :param document: the page already parsed, a BeautifulSoup or an lxml tree
+            (lxml.html drops the blank strings bs4 keeps, the texts extracted from it may differ in whitespace)
+        :param metadata: the meta data of the page, as returned by extruct.extract
+        :type content: str/bytes
+        :type document: BeautifulSoup/lxml.etree._Element/lxml.etree._ElementTree
+        :type metadata: {str:list}/Metadata
+        """
+        if content is None and document is None:
+            raise ValueError("A page needs a content or a document")
+        self.content = content
+        self.document = document
+        self.documents = {}  # the name of a backend -> the page parsed by the backend
+        self.metadata = metadata
+
+    def get_document(self, backend):
+        """
+
+        :param backend: the backend predicting the page
+        :type backend: Bs4Backend/LxmlBackend
+
+        :return: the page parsed by the backend, the document given if it was parsed with the same library
+        :rtype: BeautifulSoup/LxmlDocument
+        """
+        if backend.name not in self.documents:
+            if self.document is not None and backend.name == "bs4" and _is_soup(self.document):
+                document = self.document
+            elif self.document is not None and backend.name == "lxml" and not _is_soup(self.document):
+                root = self.document.getroot() if hasattr(self.document, "getroot") else self.document
+                document = LxmlDocument(root, backend)
+            else:
+                document = backend.parse(self.get_content())
+            self.documents[backend.name] = document
+        return self.documents[backend.name]
+
+    def get_soup(self):
+        """
+
+        :return: the page parsed with BeautifulSoup, as the train pages are
+        :rtype: BeautifulSoup
+        """
+        return self.get_document(Bs4Backend())
+
+    def get_metadata(self, instrumentation=NO_INSTRUMENTATION):
+        """
+
+        :param instrumentation: records the time spent extracting the meta data
+        :type instrumentation: Instrumentation
+
+        :return: the meta data of the page, extracted syntax by syntax when a wrapper needs them
+        :rtype: Metadata
+        """
+        if not isinstance(self.metadata, Metadata):
+            metadata = Metadata(self, instrumentation=instrumentation)
+            if self.metadata is not None:
+                metadata.data.update(self.metadata)
+            self.metadata = metadata
+        self.metadata.instrumentation = instrumentation
+        return self.metadata
+
+    def get_content(self):
+        """
+
+        :return: the page content, serialized from the document if it was not given
+        :rtype: str/bytes
+        """
+        if self.content is None:
+            if _is_soup(self.document):
+                self.content = str(self.document)
+            else:
+                self.content = etree.tostring(self.document, encoding="unicode", method="html")
+        return self.content
+
+
+def get_page(page, metadata=None):
+    """
+
+    :param page: the page content, the page already parsed or a Page
+    :param metadata: the meta data of the page, as returned by extruct.extract
+    :type page: str/bytes/BeautifulSoup/lxml.etree._Element/Page
+    :type metadata: {str:list}
+
+    :return: the page
+    :rtype: Page
+    """
+    if isinstance(page, Page):
+        if metadata is not None and page.metadata is None:
+            page.metadata = metadata
+        return page
+    if page is None or (isinstance(page, (str, bytes)) and not page):
+        raise ValueError("Given page is NULL/empty")
+    if isinstance(page, (str, bytes)):
+        return Page(content=page, metadata=metadata)
+    return Page(document=page, metadata=metadata)
+
+
+def _is_soup(document):
+    return hasattr(document, "select_one")
@@ -1,118 +1,301 @@
 # coding=utf-8
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
 from .best_match import find_best_matches
+from .text_index import TextIndex
+from .node_table import NodeTable
 from .wrapper import WrapperCss, WrapperMeta, Wrappers, WrapperGroup
-import extruct
+from .schemaorg import Metadata, MetaIndex
 from uuid import uuid4
-from .css_selectors import get_tags
+from .css_selectors import get_tags, SelectorIndex
+from .instrumentation import NO_INSTRUMENTATION
+from .page import Page
+from .scoring import DEFAULT_SCORER, get_scorer
 
 
 class PageExtractor:
-    def __init__(self, page_content, train_set, id_=None):
+    def __init__(self, page_content, train_set, id_=None, lean=False, instrumentation=NO_INSTRUMENTATION,
+                 workers=1, scorer=DEFAULT_SCORER):
+        """
+
+        :param page_content: the page content or a Page
+        :param train_set: labels associated with the values we want to find on the page
+        :param id_: url of the page
+        :param lean: whether to keep the page compressed instead of parsed once trained, see release
+        :param instrumentation: records the stages of the training of the page
+        :param workers: the number of processes building the css wrappers, the wrappers are the same as with one.
+            With more than one, the page content is kept to score the wrappers on it in worker processes
+        :param scorer: scores the texts of the page to find the values and build the wrappers
+        :type page_content: str/bytes/Page
+        :type train_set: {str:[str]}
+        :type id_: str
+        :type lean: bool
+        :type instrumentation: Instrumentation
+        :type workers: int
+        :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
+        """
         if not id_:
             id_ = str(uuid4())
         self.id_ = id_
+        self.instrumentation = instrumentation
+        self.workers = workers
+        self.scorer = scorer
 
-        self.soup = BeautifulSoup(page_content, "lxml")
-        self.data_schemaorg = extruct.extract(page_content)
+        if not isinstance(page_content, Page):
+            page_content = Page(content=page_content)
+        with instrumentation.stage("parse"):
+            self.soup = page_content.get_soup()
+        self.data_schemaorg = page_content.get_metadata(instrumentation).get()
+        with instrumentation.stage("index"):
+            node_table = NodeTable(self.soup)  # one walk of the soup for both indexes
+            self.text_index = TextIndex(self.soup, node_table=node_table)
+            self.meta_index = MetaIndex(self.data_schemaorg)
+            self.selector_index = SelectorIndex(self.soup, node_table=node_table)
+        instrumentation.count("nodes", len(node_table))
         self.train_set = train_set
         self.wrappers_dict = dict()
+        self.compressed_page = None
+        self.page_encoding = None  # the encoding of the compressed page if it was given as str
+        self.page_content = page_content.get_content() if workers > 1 else None  # sent to the worker processes
         self.train()
+        if lean:
+            page_content = page_content.get_content()
+            if isinstance(page_content, str):
+                self.page_encoding = "utf-8"
+                page_content = page_content.encode(self.page_encoding, "surrogatepass")
+            self.compressed_page = zlib.compress(page_content)
+            self.page_content = None
+            self.release()
 
     def train(self):
         """
 
         :return: a dictionary with the trained wrappers for the page
         :rtype: {str:Wrapper}
-        """
 
+        The matches of every label are found first, then the css wrappers of all the labels are built,
+        in worker processes if workers > 1, and last the wrappers of each label are grouped. The wrappers
+        are put back in the order of the matches, so they are the same whatever the number of workers.
+        """
+        label_times = dict()
+        labels = []  # (label, whether its wrappers are grouped, [(value, match)])
         for label, value in self.train_set.items():
+            start = time.perf_counter()
             if not (value and value[0]):  # check if not null and not empty list or string
                 raise ValueError("Values in train set should not be null or empty")
 
             if type(value) is list and len(value) > 1:  # group everything to get a final Wrapper (herited class Wrappers)
-                wrappers = self.__get_wrappers_from_values(values=value)
-                groups = []
-                for wrapper in wrappers:
-                    has_group = False
-                    for wrapper_group in groups:
-                        if wrapper_group.belongs_to_group(wrapper):
-                            wrapper_group.add_wrapper(wrapper)
-                            has_group = True
-                            break
-                    if not has_group:
-                        new_wrapper_group = WrapperGroup(get_tags(wrapper.fragmented_selector))
-                        new_wrapper_group.add_wrapper(wrapper)
-                        groups.append(new_wrapper_group)
-
-                wrapper = Wrappers([])
-                for group in groups:
-                    group.fill_common_parent(self.soup)
-                    wrapper.wrappers.append(group)
-                wrappers = [wrapper]
-
+                labels.append((label, True, self.__get_matches_from_values(values=value)))
             else:
                 if type(value) is list:  # and len(value) == 1 implicit with previous if
                     value = value[0]
+                labels.append((label, False, self.__get_matches_from_value(value=value)))
+            label_times[label] = time.perf_counter() - start
+
+        css_matches = [(value, match) for _, _, matches in labels for value, match in matches if match.is_css]
+        with self.instrumentation.stage("build"):
+            css_wrappers = iter(self.__build_css_wrappers(css_matches))
 
-                wrappers = self.__get_wrappers_from_value(value=value)
+        for label, grouped, matches in labels:
+            start = time.perf_counter()
+            wrappers = []
+            for value, match in matches:
+                if match.is_css:
+                    wrappers.append(next(css_wrappers))
+                else:  # match is a path in the schema.org data
+                    wrapper = WrapperMeta()
+                    with self.instrumentation.stage("build"):
+                        wrapper.build(data_schemaorg=self.data_schemaorg, value=value, selector=match.meta_selector)
+                    wrappers.append(wrapper)
+            if grouped:
+                wrappers = [self.__group_wrappers(wrappers)]
 
             self.wrappers_dict[label] = wrappers
+            self.instrumentation.add_label_time(label, label_times[label] + time.perf_counter() - start)
 
         return self.wrappers_dict
 
-    def __get_wrappers_from_value(self, value):
+    def release(self):
         """
+        Drops the soup, the meta data and the indexes of a lean page, restore parses it again to score wrappers on it
+        """
+        if self.compressed_page is None:
+            raise ValueError("Only a lean page can be released")
+        self.soup = None
+        self.data_schemaorg = None
+        self.text_index = None
+        self.meta_index = None
+        self.selector_index = None
 
-        :param value: value to be find in the soup
-        :type value: str
+    def restore(self):
+        """
+        Parses the page again if it was released, its meta data are only extracted for the syntaxes used
+        """
+        if self.soup is not None:
+            return
+        page_content = self.get_content()
+        with self.instrumentation.stage("parse"):
+            self.soup = BeautifulSoup(page_content, "lxml")
+        self.data_schemaorg = Metadata(page_content, instrumentation=self.instrumentation)
 
+    def get_content(self):
+        """
 
-        :return: a list containing one selector for each value
-        :rtype: [WrapperCss/WrapperMeta]
+        :return: the content of the page, to parse it again in a worker process
+        :rtype: str/bytes
         """
-        wrappers = []
-        matches = find_best_matches(self.soup, self.data_schemaorg, value)
-        for index, match in enumerate(matches):
+        if self.compressed_page is not None:
+            page_content = zlib.decompress(self.compressed_page)
+            if self.page_encoding is not None:
+                page_content = page_content.decode(self.page_encoding, "surrogatepass")
+            return page_content
+        if self.page_content is None:  # the page was trained without workers
+            self.page_content = str(self.soup)
+        return self.page_content
 
-            #  match is a path in the schema.org data
-            if not match.is_css:
-                wrapper = WrapperMeta()
-                selector = match.meta_selector
-                wrapper.build(data_schemaorg=self.data_schemaorg, value=value, selector=selector)
+    def __get_matches_from_value(self, value):
+        """
 
-            #  match is a css selector associated with its attribute
-            else:
-                wrapper = WrapperCss()
-                wrapper.build(soup=self.soup, value=value, best_match=match.soup, attr_best_match=match.attr)
-            wrappers.append(wrapper)
+        :param value: value to be find in the soup
+        :type value: str
 
-        return wrappers
 
-    def __get_wrappers_from_values(self, values):
+        :return: the best matches of the value, a wrapper is built for each of them
+        :rtype: [(str, Match)]
+        """
+        with self.instrumentation.stage("match"):
+            matches = find_best_matches(self.soup, self.data_schemaorg, value, text_index=self.text_index,
+                                        meta_index=self.meta_index, scorer=self.scorer)
+        return [(value, match) for match in matches]
+
+    def __get_matches_from_values(self, values):
         """
 
         :param values: a list containing values to find in the soup
         :type values: [str]
 
 
-        :return: a list containing one selector for each value
-        :rtype: [Wrapper]
+        :return: the best css match of each value, a wrapper is built for each of them
+        :rtype: [(str, Match)]
         """
-        wrappers = []
+        matches = []
         for value in values:
-            match = find_best_matches(self.soup, self.data_schemaorg, value)[0]
+            with self.instrumentation.stage("match"):
+                match = find_best_matches(self.soup, self.data_schemaorg, value, text_index=self.text_index,
+                                          meta_index=self.meta_index, scorer=self.scorer)[0]
 
             #  match is a css selector associated with its attribute
             if match.is_css:
-                wrapper = WrapperCss()
-                wrapper.build(soup=self.soup, value=value, best_match=match.soup, attr_best_match=match.attr)
-                wrappers.append(wrapper)
+                matches.append((value, match))
+
+        return matches
 
+    def __build_css_wrappers(self, matches):
+        """
+
+        :param matches: the css matches with the value they match
+        :type matches: [(str, Match)]
+
+        :return: the wrapper of each match, in the same order
+        :rtype: [WrapperCss]
+
+        The worker processes get the page content once and parse it again, the tasks only hold the
+        position of the matched node. If a worker does not find the same nodes (a page given parsed
+        may not be serialized back to the same tree), the wrappers are built here.
+        """
+        if self.workers > 1 and len(matches) > 1:
+            tasks = [(value, match.position, match.attr, match.soup.name) for value, match in matches]
+            try:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), initializer=_init_train_worker,
+                                         initargs=(self.page_content, len(self.text_index.nodes),
+                                                   self.scorer.name)) as executor:
+                    return list(executor.map(_build_wrapper_in_worker, tasks))
+            except _DifferentPageError:
+                pass
+
+        wrappers = []
+        for value, match in matches:
+            wrapper = WrapperCss()
+            wrapper.build(soup=self.soup, value=value, best_match=match.soup, attr_best_match=match.attr,
+                          selector_index=self.selector_index, scorer=self.scorer)
+            wrappers.append(wrapper)
         return wrappers
 
+    def __group_wrappers(self, wrappers):
+        """
+
+        :param wrappers: the css wrappers of the values of a label
+        :type wrappers: [WrapperCss]
+
+        :return: the wrappers grouped by the tags of their selector
+        :rtype: Wrappers
+        """
+        groups = []
+        for wrapper in wrappers:
+            has_group = False
+            for wrapper_group in groups:
+                if wrapper_group.belongs_to_group(wrapper):
+                    wrapper_group.add_wrapper(wrapper)
+                    has_group = True
+                    break
+            if not has_group:
+                new_wrapper_group = WrapperGroup(get_tags(wrapper.fragmented_selector))
+                new_wrapper_group.add_wrapper(wrapper)
+                groups.append(new_wrapper_group)
+
+        wrapper = Wrappers([])
+        with self.instrumentation.stage("group"):
+            for group in groups:
+                group.fill_common_parent(self.soup, selector_index=self.selector_index, scorer=self.scorer)
+                wrapper.wrappers.append(group)
+        return wrapper
+
     def __str__(self):
         res = "ID: {}".format(self.id_)
         res += "train_set: {}".format(self.train_set)
         res += "wrappers_dict: {}".format(self.wrappers_dict)
         return res
+
+
+class _DifferentPageError(Exception):
+    pass
+
+
+_train_page = None  # the soup, the selector index and the scorer of the page trained by the worker process
+
+
+def _init_train_worker(page_content, nodes, scorer):
+    """
+
+    :param page_content: the content of the page trained
+    :param nodes: the number of nodes of the page parsed by the main process
+    :param scorer: the name of the scorer
+    :type page_content: str/bytes
+    :type nodes: int
+    :type scorer: str
+    """
+    global _train_page
+    soup = BeautifulSoup(page_content, "lxml")
+    selector_index = SelectorIndex(soup)
+    _train_page = (soup, selector_index, get_scorer(scorer)) if len(selector_index.nodes) == nodes else None
+
+
+def _build_wrapper_in_worker(task):
+    """
+
+    :param task: the value, the position of the matched node in document order, its attribute and its tag
+    :type task: (str, int, str, str)
+
+    :return: the wrapper of the match
+    :rtype: WrapperCss
+    """
+    value, position, attr, name = task
+    if _train_page is None or _train_page[1].nodes[position].name != name:
+        raise _DifferentPageError("The page parsed by the worker is not the same")
+    soup, selector_index, scorer = _train_page
+    wrapper = WrapperCss()
+    wrapper.build(soup=soup, value=value, best_match=selector_index.nodes[position], attr_best_match=attr,
+                  selector_index=selector_index, scorer=scorer)
+    return wrapper
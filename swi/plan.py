@@ -0,0 +1,222 @@
+# coding=utf-8
+from bisect import bisect_left, bisect_right
+
+
+class ExtractionPlan:
+    """
+    The css selectors of some wrappers, compiled once to be matched in a single walk of a soup
+
+    Each selector is filed under a key of its last compound selector (tag name, class or attribute),
+    so while walking the soup a node is only matched against the selectors that can match it.
+    """
+    def __init__(self, wrappers):
+        """
+
+        :param wrappers: the wrappers to extract with the plan
+        :type wrappers: [Wrapper]
+        """
+        self.selectors = []
+        self.syntaxes = []  # the syntaxes of the meta data extracted by the meta wrappers
+        for wrapper in wrappers:
+            for selector in get_selectors(wrapper):
+                if selector not in self.selectors:
+                    self.selectors.append(selector)
+            for syntax in get_syntaxes(wrapper):
+                if syntax not in self.syntaxes:
+                    self.syntaxes.append(syntax)
+
+        import soupsieve  # imports bs4, only needed once the wrappers predict
+
+        self.patterns = [soupsieve.compile(selector) for selector in self.selectors]
+        self.tags = {}
+        self.classes = {}
+        self.attributes = {}
+        self.universal = []
+        for i, pattern in enumerate(self.patterns):
+            self.__file_pattern(i, pattern)
+
+    def select(self, soup):
+        """
+
+        :param soup: the soup object where to find the values
+        :type soup: BeautifulSoup
+
+        :return: the nodes selected by each selector of the plan
+        :rtype: SelectorResults
+        """
+        results = [[] for _ in self.selectors]
+        nodes = []
+        ends = []
+        for position, node, end in walk(soup):
+            nodes.append(node)
+            ends.append(end)
+            for i in self.__get_candidates(node):
+                if self.patterns[i].match(node):
+                    results[i].append(position)
+
+        return SelectorResults(soup, nodes, ends, dict(zip(self.selectors, results)))
+
+    def __get_candidates(self, node):
+        """
+
+        :param node: a node of the soup
+        :type node: Tag
+
+        :return: the indexes of the patterns that may match node
+        :rtype: set
+        """
+        candidates = set(self.universal)
+        candidates.update(self.tags.get(node.name.lower(), ()))
+        if self.classes:
+            classes = node.get("class", [])
+            if isinstance(classes, str):
+                classes = classes.split()
+            for cls in classes:
+                candidates.update(self.classes.get(cls.lower(), ()))
+        if self.attributes:
+            for attr in node.attrs.keys():
+                candidates.update(self.attributes.get(attr.lower(), ()))
+        return candidates
+
+    def __file_pattern(self, i, pattern):
+        """
+
+        :param i: the index of the pattern
+        :param pattern: a compiled selector
+        :type i: int
+        :type pattern: SoupSieve
+
+        files the pattern under the key of each of its selectors, or as universal if one has no key
+        """
+        keys = []
+        for selector in getattr(pattern, "selectors", None) or [None]:
+            key = self.__get_key(selector)
+            if key is None:
+                self.universal.append(i)
+                return
+            keys.append(key)
+
+        for bucket, name in keys:
+            bucket.setdefault(name, []).append(i)
+
+    def __get_key(self, selector):
+        """
+
+        :param selector: the parsed selector (soupsieve.css_types.Selector)
+        :type selector: Selector
+
+        :return: the bucket and the name a node must have to be matched by the selector, None if unknown
+        :rtype: (dict, str)
+        """
+        tag = getattr(selector, "tag", None)
+        if tag is not None and tag.name != "*" and not tag.prefix:
+            return self.tags, tag.name.lower()
+        for cls in getattr(selector, "classes", ()):
+            return self.classes, cls.lower()
+        for attribute in getattr(selector, "attributes", ()):
+            if not attribute.prefix and not attribute.inverse:
+                return self.attributes, attribute.attribute.lower()
+        return None
+
+
+class SelectorResults:
+    """
+    The nodes of a soup selected by an extraction plan
+    """
+    def __init__(self, soup, nodes, ends, results):
+        self.soup = soup
+        self.nodes = nodes
+        self.ends = ends
+        self.results = results
+        self.positions = {id(node): position for position, node in enumerate(nodes)}
+
+    def select(self, selector):
+        """
+
+        :param selector: a css selector
+        :type selector: str
+
+        :return: the same as soup.select(selector)
+        :rtype: [Tag]
+        """
+        if selector not in self.results:
+            return self.soup.select(selector)
+        return [self.nodes[position] for position in self.results[selector]]
+
+    def select_within(self, root, selector):
+        """
+
+        :param root: a node of the soup
+        :param selector: a css selector
+        :type root: Tag
+        :type selector: str
+
+        :return: the same as root.select(selector)
+        :rtype: [Tag]
+        """
+        position = self.positions.get(id(root))
+        if selector not in self.results or position is None:
+            return root.select(selector)
+        positions = self.results[selector]
+        start = bisect_right(positions, position)
+        end = bisect_left(positions, self.ends[position], start)
+        return [self.nodes[i] for i in positions[start:end]]
+
+
+def get_selectors(wrapper):
+    """
+
+    :param wrapper: a wrapper
+    :type wrapper: Wrapper
+
+    :return: all the css selectors used by the wrapper to extract
+    :rtype: [str]
+    """
+    selectors = []
+    selector = getattr(wrapper, "selector", None)
+    if selector and isinstance(selector, str):
+        selectors.append(selector)
+    for child in getattr(wrapper, "wrappers", []):
+        selectors.extend(get_selectors(child))
+    return selectors
+
+
+def get_syntaxes(wrapper):
+    """
+
+    :param wrapper: a wrapper
+    :type wrapper: Wrapper
+
+    :return: the syntaxes of the meta data used by the wrapper to extract (microdata, json-ld...)
+    :rtype: [str]
+    """
+    syntaxes = []
+    selector = getattr(wrapper, "selector", None)
+    if selector and isinstance(selector, list):
+        syntaxes.append(selector[0])
+    for child in getattr(wrapper, "wrappers", []):
+        syntaxes.extend(get_syntaxes(child))
+    return syntaxes
+
+
+def walk(soup):
+    """
+
+    :param soup: a BeautifulSoup object
+    :type soup: BeautifulSoup
+
+    :return: the tags of the soup in document order (like soup.select), with their position
+        and the position following their last descendant
+    :rtype: iterator of (int, Tag, int)
+    """
+    nodes = [node for node in soup.descendants if node.name is not None]  # the strings have no name
+
+    ends = [len(nodes)] * len(nodes)
+    stack = []
+    for position, node in enumerate(nodes):
+        while stack and nodes[stack[-1]] is not node.parent:
+            ends[stack.pop()] = position
+        stack.append(position)
+
+    for position, node in enumerate(nodes):
+        yield position, node, ends[position]
@@ -1,7 +1,10 @@
 # coding=utf-8
-import Levenshtein
 import re
 
+# the regex returned by get_regex: the characters between two offsets, without some characters (escaped)
+GENERATED_REGEX = re.compile(r"\(\?<=\.\{(\d+)\}\)\((?:\.\+|\[\^((?:\\[^0-9A-Za-z]|[^\\\]])+)\]\+)\)\(\?=\.\{(\d+)\}\)",
+                             re.DOTALL)
+
 
 def get_regex(formatted, raw):
     """
@@ -32,6 +35,48 @@ def get_regex(formatted, raw):
     return regex
 
 
+class CompiledRegex:
+    """
+    A regex compiled once, applied by slicing when it was returned by get_regex
+
+    Such a regex keeps the characters of a text (without newline) from an offset to another offset from the end,
+    except some characters: the same as a slice where these characters are removed.
+    """
+    def __init__(self, regex):
+        """
+
+        :param regex: a regular expression
+        :type regex: str
+        """
+        self.regex = regex
+        self.pattern = None
+        match = GENERATED_REGEX.fullmatch(regex)
+        removed = re.sub(r"\\(.)", r"\1", match.group(2) or "", flags=re.DOTALL) if match else None
+        # a class written by hand may hold ranges like a-z, it is only a set of characters if escaped like get_regex
+        if match and "".join(re.escape(c) for c in removed) == (match.group(2) or ""):
+            self.start = int(match.group(1))
+            self.end = int(match.group(3))
+            self.table = {ord(c): None for c in removed}
+        else:
+            self.pattern = re.compile(regex)
+
+    def find(self, text):
+        """
+
+        :param text: the text to apply the regex to, without newline
+        :type text: str
+
+        :return: the same as "".join(re.findall(regex, text))
+        :rtype: str
+        """
+        if self.pattern is not None:
+            return "".join(self.pattern.findall(text))
+        text = text[self.start:max(len(text) - self.end, 0)]
+        if self.table:
+            text = text.translate(self.table)
+        return text
+
+
 def __intersect(formatted, raw):
     """
 
@@ -67,20 +112,41 @@ def __get_indexes(formatted, raw):
 
     :return: the best indexes corresponding to the boundaries of the slice of what we are looking for
     :rtype: (int, int)
+
+    The best slice is the one closest (Levenshtein distance) to formatted among the slices
+    containing each character of formatted in the same order, the first one if there are several.
+    As formatted is a subsequence of such a slice, their distance is the difference of their lengths:
+    the best slice is the leftmost shortest window of raw containing formatted as a subsequence.
+    Each window is found by matching formatted forward (to find its end) then backward (to find its start).
     """
     forLen = len(formatted)
     rawLen = len(raw)
-    shorterDist = float("inf")
+    if not forLen:
+        return 0, 0
+
     bestStart = 0
     bestEnd = rawLen
-    for i in range(rawLen):
-        for j in range(i, rawLen + 1):
-            if forLen <= j - i + 1:
-                dist = Levenshtein.distance(formatted, raw[i:j])
-                if dist < shorterDist and __is_in_order(formatted, raw[i:j]):
-                    shorterDist = dist
-                    bestStart = i
-                    bestEnd = j
+    shorterLen = float("inf")
+    i = 0
+    while i < rawLen:
+        j = raw.find(formatted[0], i)
+        if j == -1:
+            break
+        for c in formatted[1:]:
+            j = raw.find(c, j + 1)
+            if j == -1:
+                return bestStart, bestEnd
+        end = j + 1
+
+        for c in reversed(formatted[:-1]):
+            j = raw.rfind(c, 0, j)
+        start = j
+
+        if end - start < shorterLen:
+            shorterLen = end - start
+            bestStart = start
+            bestEnd = end
+        i = start + 1
     return bestStart, bestEnd
 
 
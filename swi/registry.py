@@ -0,0 +1,117 @@
+# coding=utf-8
+import os
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from urllib.parse import urlsplit
+from .extractor import SupervisedWrapperExtractor
+
+REGISTRY_SIZE = 128  # default number of extractors kept in memory by an ExtractorRegistry
+PATTERN_CHARACTERS = "*?[/"  # a pattern with one of them is matched against the url, else it is a domain
+
+
+class ExtractorRegistry:
+    """
+    The wrappers saved for many sites, loaded on the first prediction of a site
+
+    Each domain or url pattern is mapped to the file of its wrappers (saved by SupervisedWrapperExtractor.save).
+    The least recently used extractors are dropped once there are more than size, or once the files
+    they were loaded from weigh more than max_bytes.
+    """
+    def __init__(self, size=REGISTRY_SIZE, max_bytes=None, backend="bs4"):
+        """
+
+        :param size: the maximum number of extractors kept
+        :param max_bytes: the maximum size of the files of the extractors kept, no limit by default
+        :param backend: the parser used by the extractors to predict, "bs4" or "lxml"
+        :type size: int
+        :type max_bytes: int
+        :type backend: str
+        """
+        self.size = size
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.domains = {}
+        self.patterns = []
+        self.extractors = OrderedDict()  # path -> (extractor, size of its file)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, pattern, path):
+        """
+
+        :param pattern: a domain, which also matches its subdomains ("pypi.org"),
+            or a pattern matched against the whole url with fnmatch ("https://pypi.org/project/*")
+        :param path: the file of the wrappers
+        :type pattern: str
+        :type path: str
+        """
+        if any(character in pattern for character in PATTERN_CHARACTERS):
+            self.patterns.append((pattern, path))
+        else:
+            self.domains[pattern.lower().strip(".")] = path
+
+    def get_path(self, url):
+        """
+
+        :param url: the url of a page
+        :type url: str
+
+        :return: the file of the wrappers for url, the first pattern matching url in the order they were added,
+            else the one of its domain or of its closest parent domain, None if there is none
+        :rtype: str
+        """
+        for pattern, path in self.patterns:
+            if fnmatchcase(url, pattern):
+                return path
+
+        host = urlsplit(url if "//" in url else "//" + url).hostname or ""
+        labels = host.strip(".").split(".")
+        for i in range(len(labels)):
+            path = self.domains.get(".".join(labels[i:]))
+            if path is not None:
+                return path
+        return None
+
+    def get(self, url):
+        """
+
+        :param url: the url of a page
+        :type url: str
+
+        :return: the extractor for url, loaded if it is not in memory
+        :rtype: SupervisedWrapperExtractor
+        """
+        path = self.get_path(url)
+        if path is None:
+            raise ValueError("No wrappers registered for '{}'".format(url))
+
+        if path in self.extractors:
+            self.hits += 1
+            self.extractors.move_to_end(path)
+            return self.extractors[path][0]
+
+        self.misses += 1
+        extractor = SupervisedWrapperExtractor(backend=self.backend)
+        extractor.load(path)
+        size = os.path.getsize(path)
+        self.extractors[path] = (extractor, size)
+        self.bytes += size
+        while len(self.extractors) > 1 and (len(self.extractors) > self.size or
+                                            self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, (_, size) = self.extractors.popitem(last=False)
+            self.bytes -= size
+        return extractor
+
+    def predict(self, url, page):
+        """
+
+        :param url: the url of the page
+        :param page: the page content
+        :type url: str
+        :type page: str
+
+        :return: the data extracted from the page by the extractor for url
+        :rtype: {str:[str]/str}
+        """
+        return self.get(url).predict(page)
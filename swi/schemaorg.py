@@ -1,5 +1,114 @@
 # coding=utf-8
 import warnings
+from .instrumentation import NO_INSTRUMENTATION
+
+SYNTAXES = ["microdata", "json-ld", "opengraph", "microformat", "rdfa", "dublincore"]  # in extruct.extract order
+
+
+class Metadata:
+    """
+    The meta data of a page, extracted syntax by syntax when a wrapper needs them
+
+    The page is parsed once for all the syntaxes (microformat reads the page itself)
+    """
+    def __init__(self, page, instrumentation=NO_INSTRUMENTATION):
+        """
+
+        :param page: the page content, or a Page whose content is only read to extract the meta data
+        :param instrumentation: records the time spent extracting the meta data as the "metadata" stage
+        :type page: str/bytes/Page
+        :type instrumentation: Instrumentation
+        """
+        self.page = page
+        self.instrumentation = instrumentation
+        self.tree = None
+        self.data = {}
+        self.indexes = {}
+
+    def get(self, syntaxes=None):
+        """
+
+        :param syntaxes: the syntaxes to extract (microdata, json-ld, opengraph...), all by default
+        :type syntaxes: [str]
+
+        :return: the meta data of the page for these syntaxes, same as extruct.extract(page, syntaxes=syntaxes)
+            the unknown syntaxes are ignored
+        :rtype: {str:list}
+        """
+        if syntaxes is None:
+            syntaxes = SYNTAXES
+        syntaxes = [syntax for syntax in SYNTAXES if syntax in syntaxes]
+
+        missing = [syntax for syntax in syntaxes if syntax not in self.data and syntax != "microformat"]
+        if missing:
+            import extruct  # imported with bs4 on first use, not to slow down loading the wrappers
+            from extruct.utils import parse_xmldom_html
+            with self.instrumentation.stage("metadata"):
+                if self.tree is None:
+                    self.tree = parse_xmldom_html(self.get_content(), encoding="UTF-8")
+                self.data.update(extruct.extract(self.tree, syntaxes=missing))
+        if "microformat" in syntaxes and "microformat" not in self.data:
+            from extruct.microformat import MicroformatExtractor
+            with self.instrumentation.stage("metadata"):
+                self.data["microformat"] = list(MicroformatExtractor().extract_items(self.get_content()))
+
+        return {syntax: self.data[syntax] for syntax in syntaxes}
+
+    def get_content(self):
+        """
+
+        :return: the page content
+        :rtype: str/bytes
+        """
+        if hasattr(self.page, "get_content"):  # a Page
+            return self.page.get_content()
+        return self.page
+
+    def get_index(self, syntaxes=None):
+        """
+
+        :param syntaxes: the syntaxes to index (microdata, json-ld, opengraph...), all by default
+        :type syntaxes: [str]
+
+        :return: the values of the meta data of these syntaxes by path, indexed once per syntaxes
+        :rtype: MetaIndex
+        """
+        data = self.get(syntaxes)
+        key = tuple(data.keys())
+        if key not in self.indexes:
+            self.indexes[key] = MetaIndex(data)
+        return self.indexes[key]
+
+
+class MetaIndex:
+    """
+    The values of meta data by path, found in one traversal to look them up without walking the data again
+
+    The paths are in the order of get_pathes, a path that is not the one of a value is looked up in the data
+    """
+    def __init__(self, data):
+        """
+
+        :param data: the meta data
+        :type data: {str:str/list/dict}
+        """
+        self.data = data
+        self.values = {}
+        _index_values(data, (), self.values)
+
+    def get_value(self, path):
+        """
+
+        :param path: the path where the value is suposedly located
+        :type path: [str, int]
+
+        :return: the value at path, the same as get_value(data, path)
+        :rtype: str
+        """
+        value = self.values.get(tuple(path))
+        if value is None:
+            return get_value(self.data, path)
+        return value
 
 
 def get_value(nested_dict, path):
@@ -32,39 +141,26 @@ def get_pathes(nested_dict):
         an int means an index in a list and an str means a key in a dictionary
     :rtype: [[str, int]]
     """
-    pathes = []
-    __reccursive_get_pathes(nested_dict, "", pathes)
-
-    results = []
-    for path in pathes:
-        path = path.split(',')[1:]
-        for index, item in enumerate(path):
-            if "index:" in item:
-                item = item.replace("index:", "")
-                path[index] = int(item)
-        results.append(path)
-    return results
+    return [list(path) for path in MetaIndex(nested_dict).values]
 
 
-def __reccursive_get_pathes(nested_dict, prevpath, pathes):
+def _index_values(nested_dict, path, values):
     """
 
     :param nested_dict: the dictionary where we want to find the values
-    :param prevpath: the accumulator of the path
-    :param pathes: the list of all pathes leading to all values
+    :param path: the path of nested_dict
+    :param values: the values found so far, by path
     :type nested_dict: {str:value/dict/list}
-    :type prevpath: str
-    :type pathes: [str]
+    :type path: (str, int)
+    :type values: {(str, int):str}
     """
     if type(nested_dict) == list:
         for index, item in enumerate(nested_dict):
-            path = "{},index:{}".format(prevpath, index)
-            __reccursive_get_pathes(item, path, pathes)
+            _index_values(item, path + (index,), values)
 
     elif type(nested_dict) == dict:
         for key, item in nested_dict.items():
-            path = "{},{}".format(prevpath, key)
-            __reccursive_get_pathes(item, path, pathes)
+            _index_values(item, path + (key,), values)
 
     else:
-        pathes.append(prevpath)
+        values[path] = str(nested_dict)
@@ -0,0 +1,120 @@
+# coding=utf-8
+from fuzzywuzzy import fuzz
+
+
+def get_scorer(name):
+    """
+
+    :param name: the name of the scorer, "fuzzywuzzy" or "rapidfuzz"
+    :type name: str
+
+    :return: the scorer comparing the values of the train sets with the texts of the pages
+    :rtype: FuzzywuzzyScorer/RapidfuzzScorer
+    """
+    if name == "fuzzywuzzy":
+        return FuzzywuzzyScorer()
+    if name == "rapidfuzz":
+        return RapidfuzzScorer()
+    raise ValueError("Unknown scorer '{}', should be 'fuzzywuzzy' or 'rapidfuzz'".format(name))
+
+
+class FuzzywuzzyScorer:
+    """
+    Scores the choices one at a time with fuzzywuzzy, the scores the wrappers have always been trained with
+
+    The scores are computed as they are iterated, a caller looking for the first good choice stops there.
+    """
+    name = "fuzzywuzzy"
+
+    def ratios(self, query, choices, score_cutoff=0):
+        """
+
+        :param query: the string compared with the choices
+        :param choices: the strings to score, None scores 0
+        :param score_cutoff: the scores below are 0
+        :type query: str
+        :type choices: iterable of str
+        :type score_cutoff: int
+
+        :return: the ratio of query and each choice, from 0 to 100
+        :rtype: iterable of int
+        """
+        return (0 if choice is None else _cut(fuzz.ratio(query, choice), score_cutoff) for choice in choices)
+
+    def partial_ratios(self, query, choices, score_cutoff=0):
+        """
+
+        :param query: the string compared with the choices
+        :param choices: the strings to score, None scores 0
+        :param score_cutoff: the scores below are 0
+        :type query: str
+        :type choices: iterable of str
+        :type score_cutoff: int
+
+        :return: the ratio of the shortest of query and each choice with the best part of the other, from 0 to 100
+        :rtype: iterable of int
+        """
+        return (0 if choice is None else _cut(fuzz.partial_ratio(query, choice), score_cutoff) for choice in choices)
+
+
+class RapidfuzzScorer:
+    """
+    Scores all the choices of a query in one call to rapidfuzz
+
+    rapidfuzz finds the best alignment of partial ratios where fuzzywuzzy uses a heuristic,
+    some partial ratios are higher and the wrappers trained may differ.
+    """
+    name = "rapidfuzz"
+
+    def __init__(self):
+        try:
+            from rapidfuzz import fuzz as rapidfuzz_fuzz, process
+        except ImportError:
+            raise ImportError("The rapidfuzz scorer needs rapidfuzz: pip install 'rapidfuzz>=3.0'")
+        self.fuzz = rapidfuzz_fuzz
+        self.process = process
+
+    def ratios(self, query, choices, score_cutoff=0):
+        """
+        The same as FuzzywuzzyScorer.ratios
+        """
+        return self.__score(self.fuzz.ratio, query, choices, score_cutoff)
+
+    def partial_ratios(self, query, choices, score_cutoff=0):
+        """
+        The same as FuzzywuzzyScorer.partial_ratios
+        """
+        return self.__score(self.fuzz.partial_ratio, query, choices, score_cutoff)
+
+    def __score(self, scorer, query, choices, score_cutoff):
+        """
+
+        :param scorer: the rapidfuzz function scoring two strings
+        :param query: the string compared with the choices
+        :param choices: the strings to score
+        :param score_cutoff: the scores below are 0
+        :type scorer: function
+        :type query: str
+        :type choices: iterable of str
+        :type score_cutoff: int
+
+        :return: the score of each choice, rounded as fuzzywuzzy does
+        :rtype: [int]
+        """
+        choices = [choice if isinstance(choice, str) else None for choice in choices]  # None choices are skipped
+        scores = [0] * len(choices)
+        if not query:
+            return scores
+        # no processor: before rapidfuzz 3.0, extract lowercased the strings and removed the non alphanumeric characters
+        results = self.process.extract(query, choices, scorer=scorer, processor=None, limit=None,
+                                       score_cutoff=max(score_cutoff - 0.5, 0))
+        for _, score, i in results:
+            scores[i] = _cut(int(round(score)), score_cutoff)
+        return scores
+
+
+def _cut(score, score_cutoff):
+    return score if score >= score_cutoff else 0
+
+
+DEFAULT_SCORER = FuzzywuzzyScorer()
@@ -0,0 +1,87 @@
+# coding=utf-8
+from .wrapper import WrapperCss, WrapperMeta, WrapperGroup, Wrappers
+
+FORMAT_VERSION = 1  # to increase when the format changes, load_wrappers reads all the versions up to it
+WRAPPER_TYPES = {"css": WrapperCss, "meta": WrapperMeta, "group": WrapperGroup, "wrappers": Wrappers}
+
+
+def dump_wrappers(best_wrappers):
+    """
+
+    :param best_wrappers: the wrappers associated with labels
+    :type best_wrappers: {str:Wrapper}
+
+    :return: what the wrappers extract (selectors, attributes, regex, indexes and groups),
+        in a versioned form that can be written as JSON
+    :rtype: dict
+    """
+    return {
+        "version": FORMAT_VERSION,
+        "wrappers": {label: __dump_wrapper(wrapper) for label, wrapper in best_wrappers.items()},
+    }
+
+
+def load_wrappers(data):
+    """
+
+    :param data: the wrappers returned by dump_wrappers
+    :type data: dict
+
+    :return: the wrappers associated with labels
+    :rtype: {str:Wrapper}
+    """
+    version = data.get("version") if isinstance(data, dict) else None
+    if not isinstance(version, int) or not 1 <= version <= FORMAT_VERSION:
+        raise ValueError("Unknown wrappers format version {}, should be at most {}".format(version, FORMAT_VERSION))
+    return {label: __load_wrapper(wrapper) for label, wrapper in data["wrappers"].items()}
+
+
+def __dump_wrapper(wrapper):
+    """
+
+    :param wrapper: a wrapper
+    :type wrapper: Wrapper
+
+    :return: the serializable form of the wrapper
+    :rtype: dict
+    """
+    if isinstance(wrapper, Wrappers):
+        return {"type": "wrappers", "wrappers": [__dump_wrapper(child) for child in wrapper.wrappers]}
+    if isinstance(wrapper, WrapperMeta):
+        return {"type": "meta", "selector": wrapper.selector, "regex": wrapper.regex}
+
+    data = {
+        "type": "group" if isinstance(wrapper, WrapperGroup) else "css",
+        "selector": wrapper.selector,
+        "attr": wrapper.attr,
+        "regex": wrapper.regex,
+        "index": wrapper.index,
+    }
+    if isinstance(wrapper, WrapperGroup):
+        data["wrappers"] = [__dump_wrapper(child) for child in wrapper.wrappers]
+    return data
+
+
+def __load_wrapper(data):
+    """
+
+    :param data: the serializable form of a wrapper
+    :type data: dict
+
+    :return: the wrapper
+    :rtype: Wrapper
+    """
+    if data["type"] not in WRAPPER_TYPES:
+        raise ValueError("Unknown wrapper type '{}'".format(data["type"]))
+    if data["type"] == "wrappers":
+        return Wrappers([__load_wrapper(child) for child in data["wrappers"]])
+
+    wrapper = WRAPPER_TYPES[data["type"]]()
+    wrapper.selector = data["selector"]
+    wrapper.regex = data["regex"]
+    if data["type"] != "meta":
+        wrapper.attr = data["attr"]
+        wrapper.index = data["index"]
+    if data["type"] == "group":
+        wrapper.wrappers = [__load_wrapper(child) for child in data["wrappers"]]
+    return wrapper
@@ -0,0 +1,468 @@
+# coding=utf-8
+import re
+from lxml import etree
+from .backends import CHUNK_SIZE, LxmlDocument, LxmlNode, _TreeBuilder, _rename_selector
+from .plan import SelectorResults
+from .schemaorg import Metadata
+from .wrapper import WrapperCss, WrapperGroup, WrapperMeta
+
+READ_SIZE = 65536  # size of the reads from a file object
+SNIFF_SIZE = 65536  # bytes at the start of a stream used to detect its encoding
+SIBLING_PSEUDO_CLASSES = {"first-child", "first-of-type", "nth-child", "nth-of-type"}
+START_PSEUDO_CLASSES = {"root", "link", "checked", "hover", "active", "focus", "target", "visited", "lang"}
+XML_SPACES = re.compile("[^ \t\r\n]+")
+
+
+def predict_stream(wrappers, plan, backend, stream):
+    """
+
+    :param wrappers: the best wrappers associated with labels
+    :param plan: the extraction plan of the wrappers, supported by backend
+    :param backend: the lxml backend
+    :param stream: the page content, a file object or an iterable of chunks
+    :type wrappers: {str:Wrapper}
+    :type plan: ExtractionPlan
+    :type backend: LxmlBackend
+    :type stream: file/iterable of str/bytes
+
+    :return: the extracted data from the page, the same as predict with the whole page
+    :rtype: {str:[str]/str}
+
+    The page is parsed as it is read. When every selector of the plan can be matched as soon as
+    an element starts, only the values of the selected nodes are kept and the subtrees are released
+    once parsed, except the ones whose text is extracted. Otherwise the whole tree is kept and selected
+    at the end, and the page itself is only kept for the meta wrappers.
+    """
+    stream_plan = StreamPlan(plan, wrappers.values(), backend)
+    page = [] if stream_plan.meta else None
+    encoding, pieces = _get_pieces(_read(stream, page))
+
+    builder = _StreamBuilder(stream_plan) if stream_plan.streamable else _TreeBuilder()
+    parser = etree.HTMLParser(target=builder, recover=True, encoding=encoding)
+    for piece in pieces:
+        parser.feed(piece)
+    try:
+        root = parser.close()
+    except etree.XMLSyntaxError:  # no element in the page
+        root = None
+
+    if stream_plan.streamable:
+        document = None
+        selector_results = SelectorResults(None, builder.nodes, builder.ends, builder.results)
+    else:
+        document = LxmlDocument(root, backend, builder.attributes)
+        selector_results = backend.select(plan, document)
+    data_schemaorg = Metadata(page[0][:0].join(page)) if page is not None else {}
+
+    results = {}
+    for label, wrapper in wrappers.items():
+        results[label] = wrapper.extract(document, data_schemaorg, selector_results=selector_results)
+    return results
+
+
+class StreamPlan:
+    """
+    The selectors of an extraction plan translated to XPaths testing whether an element matches them,
+    from its attributes, its ancestors and its previous siblings: all known when the element starts
+    """
+    def __init__(self, plan, wrappers, backend):
+        """
+
+        :param plan: the extraction plan of the wrappers, supported by backend
+        :param wrappers: the wrappers of the plan
+        :param backend: the lxml backend
+        :type plan: ExtractionPlan
+        :type wrappers: [Wrapper]
+        :type backend: LxmlBackend
+        """
+        self.selectors = plan.selectors
+        self.xpaths = {}
+        self.text_selectors = set()  # the selectors whose nodes text is extracted
+        self.attrs = {}  # selector -> the attributes extracted from its nodes
+        self.meta = False
+        self.streamable = True
+        self.siblings = False  # whether the previous siblings are needed to match
+        self.tags = {}
+        self.classes = {}
+        self.attributes = {}
+        self.universal = []
+
+        for wrapper in wrappers:
+            self.__add_wrapper(wrapper)
+        for selector in self.selectors:
+            self.__compile(selector, backend)
+
+    def match(self, element):
+        """
+
+        :param element: an element which just started
+        :type element: etree._Element
+
+        :return: the selectors matching element
+        :rtype: [str]
+        """
+        return [selector for selector in self.__get_candidates(element) if self.xpaths[selector](element)]
+
+    def __get_candidates(self, element):
+        """
+
+        :param element: an element of the page
+        :type element: etree._Element
+
+        :return: the selectors that may match element
+        :rtype: set
+        """
+        candidates = set(self.universal)
+        candidates.update(self.tags.get(element.tag, ()))
+        if self.classes:
+            for cls in XML_SPACES.findall(element.get("class", "")):
+                candidates.update(self.classes.get(cls, ()))
+        if self.attributes:
+            for attr in element.attrib.keys():
+                candidates.update(self.attributes.get(attr, ()))
+        return candidates
+
+    def __add_wrapper(self, wrapper, group=None):
+        """
+
+        :param wrapper: a wrapper of the plan
+        :param group: the group of the wrapper, which extracts its attribute from the nodes of the wrapper
+        :type wrapper: Wrapper
+        :type group: WrapperGroup
+
+        notes what the wrapper extracts from its nodes, or whether it extracts metadata
+        """
+        if isinstance(wrapper, WrapperMeta):
+            self.meta = True
+        elif isinstance(wrapper, WrapperCss) and wrapper.selector:
+            if group is None and not isinstance(wrapper, WrapperGroup) and wrapper.attr == "getText()":
+                self.text_selectors.add(wrapper.selector)
+            else:
+                self.attrs.setdefault(wrapper.selector, set()).add((group or wrapper).attr)
+        for child in getattr(wrapper, "wrappers", []):
+            self.__add_wrapper(child, wrapper if isinstance(wrapper, WrapperGroup) else None)
+
+    def __compile(self, selector, backend):
+        """
+
+        :param selector: a css selector of the plan
+        :param backend: the lxml backend
+        :type selector: str
+        :type backend: LxmlBackend
+
+        compiles the XPath of selector and files it under the keys of its last compound selectors
+        """
+        xpaths = []
+        keys = []
+        for parsed_selector in backend.parse_selector(selector):
+            tree = parsed_selector.parsed_tree
+            _rename_selector(tree)
+            if parsed_selector.pseudo_element or not self.__is_streamable(tree):
+                self.streamable = False
+                return
+            xpaths.append("self::" + str(_get_match_xpath(backend.translator, tree)))
+            keys.append(self.__get_key(tree))
+
+        self.xpaths[selector] = etree.XPath("boolean({})".format(" | ".join(xpaths)))
+        if None in keys:
+            self.universal.append(selector)
+            return
+        for bucket, name in keys:
+            bucket.setdefault(name, []).append(selector)
+
+    def __is_streamable(self, tree):
+        """
+
+        :param tree: a selector parsed by cssselect
+        :type tree: cssselect.parser.Tree
+
+        :return: whether the selector can be matched when an element starts,
+            notes if it needs the previous siblings
+        :rtype: bool
+        """
+        kind = type(tree).__name__
+        if kind == "CombinedSelector":
+            if tree.combinator in ("+", "~"):
+                self.siblings = True
+            elif tree.combinator not in (" ", ">"):
+                return False
+            return self.__is_streamable(tree.selector) and self.__is_streamable(tree.subselector)
+        if kind in ("Pseudo", "Function"):
+            name = (tree.ident if kind == "Pseudo" else tree.name).lower()
+            if name in SIBLING_PSEUDO_CLASSES:
+                self.siblings = True
+            elif name not in START_PSEUDO_CLASSES:
+                return False
+        elif kind == "Relation":  # :has() needs the descendants
+            return False
+
+        children = [getattr(tree, "selector", None)]
+        if kind == "Negation":
+            children.append(tree.subselector)
+        children.extend(getattr(tree, "selector_list", ()))
+        return all(self.__is_streamable(getattr(child, "parsed_tree", child)) for child in children
+                   if child is not None)
+
+    def __get_key(self, tree):
+        """
+
+        :param tree: a selector parsed by cssselect, renamed like the tree of the page
+        :type tree: cssselect.parser.Tree
+
+        :return: the bucket and the name an element must have to be matched by the selector, None if unknown
+        :rtype: (dict, str)
+        """
+        if type(tree).__name__ == "CombinedSelector":
+            tree = tree.subselector
+        keys = []
+        while tree is not None:
+            kind = type(tree).__name__
+            if kind == "Element":
+                if tree.element and not tree.namespace:
+                    return self.tags, tree.element
+                break
+            if kind == "Class":
+                keys.append((self.classes, tree.class_name))
+            elif kind == "Hash":
+                keys.append((self.attributes, "id"))
+            elif kind == "Attrib" and tree.namespace is None and tree.operator != "!=":
+                keys.append((self.attributes, tree.attrib))
+            tree = getattr(tree, "selector", None)
+        return keys[-1] if keys else None
+
+
+class StreamNode:
+    """
+    A node selected while streaming a page, with only the attributes and the text the wrappers extract
+    """
+    __slots__ = ("attrs", "text")
+
+    def __init__(self, attrs):
+        self.attrs = attrs
+        self.text = None
+
+    def get(self, attr, default=None):
+        return self.attrs.get(attr, default)
+
+    def getText(self):
+        return self.text
+
+
+class _StreamBuilder(_TreeBuilder):
+    """
+    Builds the tree of a page while matching the elements against a stream plan as they start,
+    and releases the subtrees once they end unless an open element needs their text
+    """
+    def __init__(self, plan):
+        super().__init__()
+        self.plan = plan
+        self.document = LxmlDocument(None, None, self.attributes)
+        self.nodes = []
+        self.ends = []
+        self.results = {selector: [] for selector in plan.selectors}
+        self.stack = []  # the position of the open elements (None if not selected) and if their text is needed
+        self.retained = 0  # the number of open elements whose text is needed
+
+    def start(self, tag, attrib, nsmap=None):
+        element = super().start(tag, attrib, nsmap)
+        position = None
+        retained = False
+        matched = self.plan.match(element)
+        if matched:
+            position = len(self.nodes)
+            node = LxmlNode(element, self.document)
+            attrs = {}
+            for selector in matched:
+                self.results[selector].append(position)
+                retained = retained or selector in self.plan.text_selectors
+                for attr in self.plan.attrs.get(selector, ()):
+                    value = node.get(attr)
+                    if value is not None:
+                        attrs[attr] = value
+            self.nodes.append(StreamNode(attrs))
+            self.ends.append(None)
+        self.stack.append((position, retained))
+        self.retained += retained
+        return element
+
+    def end(self, tag):
+        element = super().end(tag)
+        position, retained = self.stack.pop()
+        if position is not None:
+            self.ends[position] = len(self.nodes)
+            if retained:
+                self.nodes[position].text = LxmlNode(element, self.document).getText()
+                self.retained -= 1
+        if not self.retained:
+            self.__release(element)
+        return element
+
+    def comment(self, text):
+        return self.__release_leaf(super().comment(text))
+
+    def pi(self, target, data=None):
+        return self.__release_leaf(super().pi(target, data))
+
+    def __release(self, element):
+        """
+
+        :param element: an element which just ended, whose subtree is not needed anymore
+        :type element: etree._Element
+        """
+        if self.attributes:
+            for node in element.iter():
+                self.attributes.pop(node, None)
+        if self.plan.siblings:  # the element is kept to match its next siblings
+            del element[:]
+            element.text = None
+            return
+        parent = element.getparent()
+        if parent is not None:
+            parent.remove(element)
+
+    def __release_leaf(self, node):
+        """
+
+        :param node: a comment or processing instruction which was just added
+        :type node: etree._Element
+
+        :return: node, removed from the tree unless an open element needs the text around it
+        :rtype: etree._Element
+        """
+        parent = node.getparent()
+        if not self.retained and parent is not None:
+            parent.remove(node)
+        return node
+
+
+def _get_match_xpath(translator, tree):
+    """
+
+    :param translator: the translator of the lxml backend
+    :param tree: a selector parsed by cssselect
+    :type translator: cssselect.HTMLTranslator
+    :type tree: cssselect.parser.Tree
+
+    :return: the XPath expression of tree where the combinators look at the ancestors
+        and the previous siblings of the element instead of its descendants and next siblings
+    :rtype: cssselect.xpath.XPathExpr
+    """
+    if type(tree).__name__ != "CombinedSelector":
+        return _clear_path(translator.xpath(tree))
+    left = str(_get_match_xpath(translator, tree.selector))
+    right = _get_match_xpath(translator, tree.subselector)
+    if tree.combinator == " ":
+        return right.add_condition("ancestor::" + left)
+    if tree.combinator == ">":
+        return right.add_condition("parent::" + left)
+    if tree.combinator == "+":
+        return right.add_condition("preceding-sibling::*[1]/self::" + left)
+    return right.add_condition("preceding-sibling::" + left)
+
+
+def _clear_path(xpath):
+    """
+
+    :param xpath: the XPath expression of a compound selector
+    :type xpath: cssselect.xpath.XPathExpr
+
+    :return: xpath without the "*/" prefix cssselect adds to look at the children of the context
+    :rtype: cssselect.xpath.XPathExpr
+    """
+    if xpath.path == "*/":
+        xpath.path = ""
+    return xpath
+
+
+def read_page(stream):
+    """
+
+    :param stream: the page content, a file object or an iterable of chunks
+    :type stream: file/iterable of str/bytes
+
+    :return: the whole page content
+    :rtype: str/bytes
+    """
+    chunks = list(_read(stream))
+    return chunks[0][:0].join(chunks) if chunks else ""
+
+
+def _read(stream, page=None):
+    """
+
+    :param stream: the page content, a file object or an iterable of chunks
+    :param page: a list where to keep the chunks, None not to keep them
+    :type stream: file/iterable of str/bytes
+    :type page: list
+
+    :return: the chunks of the stream
+    :rtype: iterator of str/bytes
+    """
+    chunks = stream
+    if isinstance(stream, (str, bytes)):
+        chunks = [stream]
+    elif hasattr(stream, "read"):
+        chunks = iter(lambda: stream.read(READ_SIZE) or None, None)
+    for chunk in chunks:
+        if page is not None:
+            page.append(chunk)
+        yield chunk
+
+
+def _get_pieces(chunks):
+    """
+
+    :param chunks: the chunks of a page
+    :type chunks: iterator of str/bytes
+
+    :return: the encoding of the page (None for str) and its content in pieces of CHUNK_SIZE,
+        the pieces LxmlBackend.parse would feed to the parser for the whole page
+    :rtype: (str, iterator of str/bytes)
+    """
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= SNIFF_SIZE:
+            break
+    start = head[0][:0].join(head) if head else ""
+    if not start:
+        raise ValueError("Given page is NULL/empty")
+
+    encoding = None
+    if isinstance(start, bytes):
+        from bs4.dammit import EncodingDetector
+        detector = EncodingDetector(start, is_html=True)
+        start = detector.markup
+        encoding = next(iter(detector.encodings), None)
+    elif start[0] == "\N{BYTE ORDER MARK}":
+        start = start[1:]
+    return encoding, _split(start, chunks)
+
+
+def _split(start, chunks):
+    """
+
+    :param start: the beginning of the page
+    :param chunks: the next chunks of the page
+    :type start: str/bytes
+    :type chunks: iterator of str/bytes
+
+    :return: the page in pieces of CHUNK_SIZE, at least one
+    :rtype: iterator of str/bytes
+    """
+    buffer = start
+    fed = False
+    for chunk in chunks:
+        buffer += chunk
+        end = len(buffer) - len(buffer) % CHUNK_SIZE
+        for i in range(0, end, CHUNK_SIZE):
+            yield buffer[i:i + CHUNK_SIZE]
+            fed = True
+        buffer = buffer[end:]
+    for i in range(0, len(buffer), CHUNK_SIZE):
+        yield buffer[i:i + CHUNK_SIZE]
+        fed = True
+    if not fed:
+        yield buffer
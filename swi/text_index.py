@@ -0,0 +1,95 @@
+# coding=utf-8
+from bisect import bisect_left
+from .node_table import NodeTable
+
+
+class TextIndex:
+    """
+    Text and attribute index of a soup, built once per page
+
+    The texts of the nodes are the slices of the concatenated documents of a NodeTable,
+    see NodeTable for the documents.
+    """
+    def __init__(self, soup, node_table=None):
+        """
+
+        :param soup: a BeautifulSoup object
+        :param node_table: the table of soup, built here if not given
+        :type soup: BeautifulSoup
+        :type node_table: NodeTable
+        """
+        if node_table is None:
+            node_table = NodeTable(soup)
+        self.node_table = node_table
+        self.nodes = node_table.nodes  # the tags in document order, like soup.findChildren(recursive=True)
+        self.attributes = [list(node.attrs.items()) for node in self.nodes]  # [(attr, value)] for each node
+        self.documents = node_table.documents
+
+    def get_text(self, position):
+        """
+
+        :param position: the position of the node in the document order
+        :type position: int
+
+        :return: the text of the node, same as node.getText()
+        :rtype: str
+        """
+        return self.node_table.get_text(position)
+
+    def get_text_length(self, position):
+        """
+
+        :param position: the position of the node in the document order
+        :type position: int
+
+        :return: the length of the text of the node
+        :rtype: int
+        """
+        return self.node_table.get_text_length(position)
+
+    def count(self, position, char):
+        """
+
+        :param position: the position of the node in the document order
+        :param char: the character to count
+        :type position: int
+        :type char: str
+
+        :return: the number of occurrences of char in the text of the node
+        :rtype: int
+        """
+        node_table = self.node_table
+        return self.documents[node_table.text_documents[position]].count(char, node_table.text_starts[position],
+                                                                          node_table.text_ends[position])
+
+    def find(self, value):
+        """
+
+        :param value: the string to look for
+        :type value: str
+
+        :return: the positions of all the nodes whose text contains value
+        :rtype: set
+        """
+        if not value:
+            return set(range(len(self.nodes)))
+
+        occurrences = []
+        for document in self.documents:
+            starts = []
+            start = document.find(value)
+            while start != -1:
+                starts.append(start)
+                start = document.find(value, start + 1)
+            occurrences.append(starts)
+
+        positions = set()
+        lenValue = len(value)
+        node_table = self.node_table
+        for position, (document, start, end) in enumerate(zip(node_table.text_documents, node_table.text_starts,
+                                                              node_table.text_ends)):
+            starts = occurrences[document]
+            i = bisect_left(starts, start)
+            if i < len(starts) and starts[i] + lenValue <= end:
+                positions.add(position)
+        return positions
@@ -1,10 +1,10 @@
 # coding=utf-8
+from .regex import get_regex, CompiledRegex
+from . import schemaorg
+from .scoring import DEFAULT_SCORER
+from .instrumentation import NO_INSTRUMENTATION
 from .css_selectors import find_selector, clean_selector, fragmented_selector_to_selector
 from .css_selectors import simplify_fragmented_selector, get_tags
-from .regex import get_regex
-import re
-from . import schemaorg
-from fuzzywuzzy import fuzz
 from uuid import uuid4
 from abc import ABC, abstractmethod
 
@@ -14,11 +14,21 @@ class AbstractWrapper(ABC):
         self.value = None
         self.selector = None
         self.regex = ""
+        self.compiled_regex = None
 
     @abstractmethod
     def build(self, **kwargs):
         pass
 
+    def get_key(self):
+        """
+
+        :return: a key identifying what the wrapper extracts, the same for two wrappers that extract the same values
+        :rtype: tuple
+        """
+        selector = tuple(self.selector) if isinstance(self.selector, list) else self.selector
+        return type(self).__name__, selector, self.regex
+
     def simplify(self, value):
         """
         Apply regex to value
@@ -31,15 +41,26 @@ class AbstractWrapper(ABC):
         """
         if not value:
             return None
+        value = value.strip()
         if not self.regex:
-            return value.strip()
+            return value
 
-        match = "".join(re.findall(self.regex, value.strip().replace('\n', '\\n'))).strip()
+        match = self.get_compiled_regex().find(value.replace('\n', '\\n')).strip()
 
         if not match:
-            return value.strip()
+            return value
         return match
 
+    def get_compiled_regex(self):
+        """
+
+        :return: the regex of the wrapper, compiled again only if it changed
+        :rtype: CompiledRegex
+        """
+        if self.compiled_regex is None or self.compiled_regex.regex != self.regex:
+            self.compiled_regex = CompiledRegex(self.regex)
+        return self.compiled_regex
+
 
 class WrapperCss(AbstractWrapper):
     def __init__(self):
@@ -48,55 +69,69 @@ class WrapperCss(AbstractWrapper):
         self.attr = None
         self.index = 0
 
-    def build(self, soup, best_match, attr_best_match=None, value=''):
+    def get_key(self):
+        return super().get_key() + (self.attr, self.index)
+
+    def build(self, soup, best_match, attr_best_match=None, value='', selector_index=None, scorer=DEFAULT_SCORER):
         """
 
         :param soup: the BeautifulSoup object
         :param best_match: the match if we have already a match
         :param attr_best_match: the attribute where to look
         :param value: the value we search for
+        :param selector_index: the index of soup used to simplify the selector
+        :param scorer: scores the values selected to find the index of the value
         :type soup: BeautifulSoup
         :type best_match: BeautifulSoup
         :type attr_best_match: str
         :type value: str
+        :type selector_index: SelectorIndex
+        :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
 
         this method builds the selector for the value we search for or the match we already have
         """
         self.value = value
         self.attr = attr_best_match
+
         fragmented_selector = find_selector(child=best_match)
         fragmented_selector_cleaned = clean_selector(fragmented_selector, forbidden_keyword=value)
         self.fragmented_selector = simplify_fragmented_selector(soup=soup,
-                                                                fragmented_selector=fragmented_selector_cleaned)
+                                                                fragmented_selector=fragmented_selector_cleaned,
+                                                                selector_index=selector_index)
         self.selector = fragmented_selector_to_selector(self.fragmented_selector)
-        values = self.__get_values_from_selector(soup=soup)
+        values = self.__get_values_from_selector(soup=soup, selector_index=selector_index)
 
         # to calculate index
         if values:
             best_score = (0, 0)
             lenValue = len(value)
-            for i, value_i in enumerate(values):
-                if value_i and lenValue <= len(value_i):
-                    score = fuzz.partial_ratio(value, value_i)
-                    if best_score[0] < score:
-                        best_score = (score, i)
+            indexes = [i for i, value_i in enumerate(values) if value_i and lenValue <= len(value_i)]
+            for i, score in zip(indexes, scorer.partial_ratios(value, [values[i] for i in indexes])):
+                if best_score[0] < score:
+                    best_score = (score, i)
 
             self.index = best_score[1]
             raw = values[self.index]
             self.regex = get_regex(formatted=self.value, raw=raw)
 
-    def extract(self, soup, data_schemaorg):
+    def extract(self, soup, data_schemaorg, selector_results=None, instrumentation=NO_INSTRUMENTATION):
         """
         :param soup: the soup object where to find the values
         :param data_schemaorg: the meta data of the page
+        :param selector_results: the nodes already selected in soup by an extraction plan
+        :param instrumentation: records the time spent applying the regex as the "regex" stage
         :type soup: BeautifulSoup
         :type data_schemaorg: dict/list
+        :type selector_results: SelectorResults
+        :type instrumentation: Instrumentation
 
 
         :return: the list of values found with the selector and then formated with the regex
         :rtype: [str]/str
         """
-        extracted = [self.simplify(value) for value in self.__get_values_from_selector(soup=soup) if value]
+        values = self.__get_values_from_selector(soup=soup, selector_results=selector_results)
+        with instrumentation.stage("regex"):
+            extracted = [self.simplify(value) for value in values if value]
 
         if not extracted:
             return extracted
@@ -106,11 +141,15 @@ class WrapperCss(AbstractWrapper):
             else:
                 return extracted[0]
 
-    def __get_values_from_selector(self, soup):
+    def __get_values_from_selector(self, soup, selector_results=None, selector_index=None):
         """
 
         :param soup: the soup object where to find the values
+        :param selector_results: the nodes already selected in soup by an extraction plan
+        :param selector_index: the index of soup, to select the nodes while training
         :type soup: BeautifulSoup
+        :type selector_results: SelectorResults
+        :type selector_index: SelectorIndex
 
         :return: the list of all values found with the selector
         :rtype: [str]
@@ -119,7 +158,13 @@ class WrapperCss(AbstractWrapper):
         if not self.selector:
             return values
 
-        selections = soup.select(self.selector)
+        if selector_results is not None:
+            selections = selector_results.select(self.selector)
+        elif selector_index is not None:
+            selections = [selector_index.nodes[position]
+                          for position in selector_index.find_all(self.fragmented_selector, self.selector)]
+        else:
+            selections = soup.select(self.selector)
         for selection in selections:
             if self.attr == "getText()":
                 values.append(selection.getText())
@@ -156,14 +201,16 @@ class WrapperMeta(AbstractWrapper):
 
         self.regex = regex
 
-    def extract(self, soup, data_schemaorg):
-        return self.simplify(self.__get_values_from_selector(data_schemaorg=data_schemaorg)[0])
+    def extract(self, soup, data_schemaorg, selector_results=None, instrumentation=NO_INSTRUMENTATION):
+        value = self.__get_values_from_selector(data_schemaorg=data_schemaorg)[0]
+        with instrumentation.stage("regex"):
+            return self.simplify(value)
 
     def __get_values_from_selector(self, data_schemaorg):
         """
 
-        :param data_schemaorg: the value we found with the selector
-        :type data_schemaorg: {str:str/list/dict}
+        :param data_schemaorg: the meta data of the page, extracted and indexed only for the syntax of the selector if lazy
+        :type data_schemaorg: {str:str/list/dict}/Metadata/MetaIndex
 
         :return: the list of all values found with the selector
         :rtype: [str]
@@ -171,6 +218,10 @@ class WrapperMeta(AbstractWrapper):
         if not self.selector:
             return []
 
+        if isinstance(data_schemaorg, schemaorg.Metadata):
+            data_schemaorg = data_schemaorg.get_index(syntaxes=self.selector[:1])
+        if isinstance(data_schemaorg, schemaorg.MetaIndex):
+            return [data_schemaorg.get_value(self.selector)]
         return [schemaorg.get_value(data_schemaorg, self.selector)]
 
 
@@ -181,6 +232,9 @@ class WrapperGroup(WrapperCss):  # Wrapper group does not support meta selectors
         self.tags = tags
         self.id_ = str(uuid4())
 
+    def get_key(self):
+        return super().get_key() + tuple(wrapper.get_key() for wrapper in self.wrappers)
+
     def add_wrapper(self, wrapper):
         """
         :param wrapper: the selector to add to the group
@@ -188,13 +242,17 @@ class WrapperGroup(WrapperCss):  # Wrapper group does not support meta selectors
         """
         self.wrappers.append(wrapper)
 
-    def extract(self, soup, data_schemaorg):
+    def extract(self, soup, data_schemaorg, selector_results=None, instrumentation=NO_INSTRUMENTATION):
         """
-        :return: the list of values found with the selector and then formated with the regex
+        :return: the list of values found with the selector and then formated with the regex,
+            the nodes of the group are found in the "group" stage
         :rtype: [str]/str
         """
-        return [self.simplify(value) for value in
-                self.__get_values_from_selector(soup=soup, data_schemaorg=data_schemaorg) if value]
+        with instrumentation.stage("group"):
+            values = self.__get_values_from_selector(soup=soup, data_schemaorg=data_schemaorg,
+                                                     selector_results=selector_results)
+        with instrumentation.stage("regex"):
+            return [self.simplify(value) for value in values if value]
 
     def belongs_to_group(self, wrapper):
         """
@@ -214,33 +272,40 @@ class WrapperGroup(WrapperCss):  # Wrapper group does not support meta selectors
                 return False
         return True
 
-    def fill_common_parent(self, soup):
+    def fill_common_parent(self, soup, selector_index=None, scorer=DEFAULT_SCORER):
         """
 
         :param soup: A soup
+        :param selector_index: the index of soup used to simplify the selector
+        :param scorer: scores the values found under the nodes selected by the wrappers
         :type soup: BeautifulSoup
+        :type selector_index: SelectorIndex
+        :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
 
         creates a wrapper to the common parent found
         """
         if len(self.wrappers) > 1:
-            common_parent = self.__find_common_parent(soup)
+            common_parent = self.__find_common_parent(soup, selector_index=selector_index, scorer=scorer)
         else:
             wrap = self.wrappers[0]
             if soup and wrap.selector:
-                common_parent = soup.select_one(wrap.selector)
+                common_parent = self.__select_one(soup, wrap, selector_index)
             else:
                 common_parent = None
 
-        self.build(soup, best_match=common_parent, attr_best_match=self.wrappers[0].attr)
+        self.build(soup, best_match=common_parent, attr_best_match=self.wrappers[0].attr,
+                   selector_index=selector_index, scorer=scorer)
         self.regex = self.wrappers[0].regex
 
-    def __get_values_from_selector(self, soup, data_schemaorg):
+    def __get_values_from_selector(self, soup, data_schemaorg, selector_results=None):
         """
 
         :param soup: the soup object where to find the values
         :param data_schemaorg: the value we found with the selector
+        :param selector_results: the nodes already selected in soup by an extraction plan
         :type soup: BeautifulSoup
         :type data_schemaorg: {str:str/list/dict}
+        :type selector_results: SelectorResults
 
         :return: the list of all values found with the selector
         :rtype: [str]
@@ -250,66 +315,177 @@ class WrapperGroup(WrapperCss):  # Wrapper group does not support meta selectors
             return values
 
         selectors = [wrapper.selector for wrapper in self.wrappers]
-        selections = soup.select(self.selector)
+        if selector_results is None:
+            selections = soup.select(self.selector)
+        else:
+            selections = selector_results.select(self.selector)
         children = []
         children.extend(selections)
 
         for selection in selections:
             for selector in selectors:
-                children.extend(selection.select(selector))
+                if selector_results is None:
+                    children.extend(selection.select(selector))
+                else:
+                    children.extend(selector_results.select_within(selection, selector))
 
+        seen = set()
         for child in children:
             value = child.get(self.attr)
-            if value not in values:
+            key = tuple(value) if isinstance(value, list) else value  # multi-valued attributes like class
+            if key not in seen:
+                seen.add(key)
                 values.append(value)
 
         return values
 
-    def __find_common_parent(self, soup):
+    @staticmethod
+    def __select_one(soup, wrap, selector_index=None):
         """
 
         :param soup: A soup
+        :param wrap: a wrapper of the group
+        :param selector_index: the index of soup used to select the nodes of wrap
         :type soup: BeautifulSoup
+        :type wrap: WrapperCss
+        :type selector_index: SelectorIndex
 
-        :return: the common parent found
+        :return: the first node selected by wrap, like soup.select_one
         :rtype: BeautifulSoup
         """
+        if selector_index is None:
+            return soup.select_one(wrap.selector)
+        positions = selector_index.find_all(wrap.fragmented_selector, wrap.selector)
+        return selector_index.nodes[positions[0]] if positions else None
+
+    def __find_common_parent(self, soup, selector_index=None, scorer=DEFAULT_SCORER):
+        """
+
+        :param soup: A soup
+        :param selector_index: the index of soup used to select the nodes of the wrappers
+        :param scorer: scores the values found under the nodes selected by the wrappers
+        :type soup: BeautifulSoup
+        :type selector_index: SelectorIndex
+        :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
+
+        :return: the lowest ancestor of the first node selected by the first wrapper from which
+            the values of all the wrappers can be found
+        :rtype: BeautifulSoup
+
+        With an index, the nodes are positions in its node table and the soup is -1.
+        """
         wrap = self.wrappers[0]
         if not wrap.selector:
             return None
-        soup = soup.select_one(wrap.selector)
-        while not self.__is_common_parent(soup):
-            if not soup.parent:
+        node = self.__select_one(soup, wrap, selector_index)
+        if node is None:
+            return None
+
+        if selector_index is not None:
+            node_table = selector_index.node_table
+            position = node_table.positions[id(node)]
+            parents = [self.__get_indexed_parents(wrap, node_table, selector_index, scorer) for wrap in self.wrappers]
+            while not all(position in wrap_parents for wrap_parents in parents):
+                if position == -1:
+                    return None
+                position = node_table.parents[position]
+            return soup if position == -1 else node_table.nodes[position]
+
+        parents = [self.__get_parents(soup, wrap, scorer) for wrap in self.wrappers]
+        while not all(id(node) in wrap_parents for wrap_parents in parents):
+            if not node.parent:
                 return None
-            soup = soup.parent
-        return soup
+            node = node.parent
+        return node
 
-    def __is_common_parent(self, soup):
+    @staticmethod
+    def __get_parents(soup, wrap, scorer=DEFAULT_SCORER):
         """
 
         :param soup: A soup
+        :param wrap: a wrapper of the group
+        :param scorer: scores the attributes of the nodes under the selected ones
         :type soup: BeautifulSoup
+        :type wrap: WrapperCss
+        :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
 
-        :return: whether we can find all values pointed to by wrappers from the current soup object
-        :rtype: bool
+        :return: the ids of the nodes from which the value of wrap can be found, the strict ancestors
+            of the nodes selected by wrap that contain a node whose attribute matches its value
+        :rtype: {int}
         """
-        # for each wrapper check that we find its value in soup's children
-        for wrap in self.wrappers:
-            roots = soup.select(wrap.selector)
-            val = ""
-
-            children = roots
-            for root in roots:
-                children.extend(root.findChildren(recursive=True))
-
-            for child in children:
-                tmp = child.get(wrap.attr)
-                if fuzz.partial_ratio(wrap.value, tmp) >= 98:
-                    val = tmp
-                    break
-            if not val:
-                return False
-        return True
+        roots = soup.select(wrap.selector)
+        root_ids = {id(root) for root in roots}
+        scanned = set()
+        parents = set()
+        for root in roots:
+            if id(root) in scanned:  # inside a root already scanned
+                continue
+            children = [root] + root.find_all(True)
+            scores = scorer.partial_ratios(wrap.value, [child.get(wrap.attr) for child in children], score_cutoff=98)
+            for child, score in zip(children, scores):
+                scanned.add(id(child))
+                if score < 98:
+                    continue
+                # climbs to the selected nodes above the match, their ancestors are parents
+                node, below_root = child, False
+                while node is not None:
+                    if below_root:
+                        if id(node) in parents:  # and so are its ancestors
+                            break
+                        parents.add(id(node))
+                    elif id(node) in root_ids:
+                        below_root = True
+                    node = node.parent
+        return parents
+
+    @staticmethod
+    def __get_indexed_parents(wrap, node_table, selector_index, scorer=DEFAULT_SCORER):
+        """
+
+        :param wrap: a wrapper of the group
+        :param node_table: the node table of the index
+        :param selector_index: the index of the soup used to select the nodes of wrap
+        :param scorer: scores the attributes of the nodes under the selected ones
+        :type wrap: WrapperCss
+        :type node_table: NodeTable
+        :type selector_index: SelectorIndex
+        :type scorer: FuzzywuzzyScorer/RapidfuzzScorer
+
+        :return: the positions of the nodes from which the value of wrap can be found, like __get_parents,
+            -1 for the soup
+        :rtype: {int}
+
+        The selected nodes come in document order, a node is inside the nodes already scanned
+        if it is before the end of their intervals.
+        """
+        roots = selector_index.find_all(wrap.fragmented_selector, wrap.selector)
+        root_positions = set(roots)
+        nodes = node_table.nodes
+        scanned_end = 0
+        parents = set()
+        for root in roots:
+            if root < scanned_end:  # inside a root already scanned
+                continue
+            children = node_table.get_descendants(root)
+            scanned_end = children.stop
+            scores = scorer.partial_ratios(wrap.value, [nodes[child].get(wrap.attr) for child in children],
+                                           score_cutoff=98)
+            for child, score in zip(children, scores):
+                if score < 98:
+                    continue
+                # climbs to the selected nodes above the match, their ancestors are parents
+                position, below_root = child, False
+                while True:
+                    if below_root:
+                        if position in parents:  # and so are its ancestors
+                            break
+                        parents.add(position)
+                    elif position in root_positions:
+                        below_root = True
+                    if position == -1:
+                        break
+                    position = node_table.parents[position]
+        return parents
 
 
 class Wrappers:
@@ -319,13 +495,17 @@ class Wrappers:
     def build(self, **kwargs):
         raise Exception("build method unavailable for 'Wrappers' class")
 
-    def extract(self, soup, data_schemaorg):
+    def get_key(self):
+        return (type(self).__name__,) + tuple(wrapper.get_key() for wrapper in self.wrappers)
+
+    def extract(self, soup, data_schemaorg, selector_results=None, instrumentation=NO_INSTRUMENTATION):
         """
         :return: the list of values found with the wrappers and then formated with the regex
         :rtype: [str]
         """
         results = []
         for wrapper in self.wrappers:
-            results.extend(wrapper.extract(soup=soup, data_schemaorg=data_schemaorg))
+            results.extend(wrapper.extract(soup=soup, data_schemaorg=data_schemaorg, selector_results=selector_results,
+                                           instrumentation=instrumentation))
 
         return results
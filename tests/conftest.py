@@ -0,0 +1,18 @@
+# coding=utf-8
+import os
+from swi.wrapper import WrapperCss
+
+
+class CrashingPage:
+    """
+    A page killing the worker process that reads it
+    """
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+def get_wrapper(selector, attr="getText()", cls=WrapperCss):
+    wrapper = cls()
+    wrapper.selector = selector
+    wrapper.attr = attr
+    return wrapper
@@ -0,0 +1,104 @@
+# coding=utf-8
+import asyncio
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from conftest import CrashingPage
+from swi import Extractor, AsyncExtractor, Instrumentation
+
+TRAIN_SET = {"title": "Only in town for three days", "location": "Cumberland Valley, MD", 'age': '25',
+             "images": ["https://cdn.escortfish.ch/images/7b0fbd_thumb_lg.jpg",
+                        "https://cdn.escortfish.ch/images/z7oLbt.jpg"]}
+
+
+def get_extractor_and_pages():
+    pages = []
+    for i in (1, 2):
+        with open("tests/samples/escortfish_{}.html".format(i), 'r') as f:
+            pages.append(f.read())
+    extractor = Extractor()
+    extractor.add_train_page(pages[0], TRAIN_SET)
+    return extractor, pages
+
+
+async def collect(iterator):
+    return [result async for result in iterator]
+
+
+class TestAsyncExtractor(object):
+    def test_apredict(self):
+        extractor, pages = get_extractor_and_pages()
+
+        assert asyncio.run(extractor.apredict(pages[1])) == extractor.predict(pages[1])
+
+    @pytest.mark.parametrize("processes", [False, True])
+    def test_predict_many(self, processes):
+        extractor, pages = get_extractor_and_pages()
+        pages = pages * 3 + [""]
+
+        async def predict():
+            async with AsyncExtractor(extractor, workers=2, processes=processes, queue_size=3) as service:
+                data = await service.predict(pages[1])
+                ordered = await collect(service.predict_many(pages))
+                unordered = await collect(service.predict_many(iter(pages), ordered=False))
+            return data, ordered, unordered
+
+        data, ordered, unordered = asyncio.run(predict())
+        assert data == extractor.predict(pages[1])
+        assert [index for index, _, _ in ordered] == list(range(len(pages)))
+        assert [data for _, data, _ in ordered[:-1]] == [extractor.predict(page) for page in pages[:-1]]
+        assert isinstance(ordered[-1][2], ValueError)
+        assert sorted(unordered, key=lambda result: result[0])[:-1] == ordered[:-1]
+
+    def test_cancel(self):
+        extractor, pages = get_extractor_and_pages()
+
+        async def pages_forever():
+            while True:
+                yield pages[1]
+                await asyncio.sleep(0)
+
+        async def predict(service):
+            async for _ in service.predict_many(pages_forever()):
+                pass
+
+        async def cancel():
+            async with AsyncExtractor(extractor, workers=1, queue_size=2) as service:
+                task = asyncio.ensure_future(predict(service))
+                await asyncio.sleep(0.2)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                return await service.predict(pages[1])
+
+        assert asyncio.run(cancel()) == extractor.predict(pages[1])
+
+    def test_crashed_worker(self):
+        extractor, pages = get_extractor_and_pages()
+        pages = [pages[1], CrashingPage(), pages[1]]
+
+        async def predict():
+            async with AsyncExtractor(extractor, workers=1, processes=True) as service:
+                results = await collect(service.predict_many(pages))
+                with pytest.raises(BrokenProcessPool):
+                    await service.predict(CrashingPage())
+                return results, await service.predict(pages[0])
+
+        results, data = asyncio.run(predict())
+        assert [index for index, _, _ in results] == [0, 1, 2]
+        assert isinstance(results[1][2], BrokenProcessPool)
+        assert data == extractor.predict(pages[0])
+
+    def test_instrumentation(self):
+        _, pages = get_extractor_and_pages()
+        records = []
+        extractor = Extractor(instrumentation=Instrumentation(callback=records.append))
+        extractor.add_train_page(pages[0], TRAIN_SET)
+        extractor.get_best_wrappers()
+        del records[:]
+
+        async def predict():
+            async with AsyncExtractor(extractor, workers=1) as service:
+                return await service.predict(pages[1])
+
+        assert asyncio.run(predict()) == extractor.predict(pages[1])
+        assert [record["operation"] for record in records] == ["predict", "predict"]
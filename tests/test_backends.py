@@ -0,0 +1,71 @@
+# coding=utf-8
+import pytest
+from bs4 import BeautifulSoup
+from conftest import get_wrapper
+from swi import Extractor
+from swi.backends import get_backend
+from swi.plan import ExtractionPlan
+
+pytest.importorskip("cssselect")
+
+
+class TestLxmlBackend(object):
+    @pytest.mark.parametrize("sample", ["booking_1", "pypi_1", "escortsexe_1", "tunisimmo_1"])
+    @pytest.mark.parametrize("mode", ["r", "rb"])
+    def test_parse(self, sample, mode):
+        with open("tests/samples/{}.html".format(sample), mode) as f:
+            html = f.read()
+        nodes = BeautifulSoup(html, "lxml").find_all(True)
+        document = get_backend("lxml").parse(html)
+
+        assert [node.name for node in document.nodes] == [node.name for node in nodes]
+        assert [node.attrs for node in document.nodes] == [node.attrs for node in nodes]
+        assert [node.getText() for node in document.nodes] == [node.getText() for node in nodes]
+
+    def test_invalid_names(self):
+        html = '<html xmlns:og="http://ogp.me/ns#"><body><fb:like v-on:click="go">Like</fb:like></body></html>'
+        document = get_backend("lxml").parse(html)
+        node = document.select(r"html[xmlns\:og] fb\:like")[0]
+
+        assert node.name == "fb:like" and node.get("v-on:click") == "go" and node.getText() == "Like"
+        assert document.select(r"[v-on\:click]") == [node]
+
+    @pytest.mark.parametrize("sample, selectors", [
+        ("pypi_1", [".package-header__name", ".vertical-tabs__tabs .sidebar-section", ".vertical-tabs__tabs [alt]"]),
+        ("escortfish_1", ["p", "h1", "[data-img-count] [src]", ".breadcrumb li", "div, a", ":not(div)"]),
+    ])
+    def test_select(self, sample, selectors):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            html = f.read()
+        soup = BeautifulSoup(html, "lxml")
+        backend = get_backend("lxml")
+        plan = ExtractionPlan([get_wrapper(selector) for selector in selectors])
+        selector_results = backend.select(plan, backend.parse(html))
+
+        assert backend.supports(plan)
+        for selector in selectors:
+            assert [node.getText() for node in selector_results.select(selector)] == \
+                [node.getText() for node in soup.select(selector)]
+
+    def test_supports(self):
+        plan = ExtractionPlan([get_wrapper(".--checkin-field")])
+        assert get_backend("bs4").supports(plan) and not get_backend("lxml").supports(plan)
+
+    def test_predict(self):
+        train_set_pypi = {"name": "pip 19.2.1", "maintainers": ["cjerdonek", "dstufft"]}
+        extractor = Extractor()
+        with open("tests/samples/pypi_1.html", 'r') as f:
+            html1 = f.read()
+        with open("tests/samples/pypi_2.html", 'rb') as f:
+            html2 = f.read()
+        extractor.add_train_page(html1, train_set_pypi)
+        extractor.predict(html1)
+
+        extractor_lxml = Extractor(backend="lxml")
+        extractor_lxml.best_wrappers = extractor.best_wrappers
+        assert extractor_lxml.predict(html1) == extractor.predict(html1)
+        assert extractor_lxml.predict(html2) == extractor.predict(html2)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            Extractor(backend="html5lib")
@@ -0,0 +1,43 @@
+# coding=utf-8
+import pytest
+from bs4 import BeautifulSoup
+from fuzzywuzzy import fuzz
+from swi.best_match import find_best_matches
+from swi.schemaorg import Metadata
+from swi.text_index import TextIndex
+
+
+def get_all_best_matches(text_index, meta_index, value):
+    """
+    Scores every text and meta data value, the best matches find_best_matches should return
+    """
+    scored = []
+    for position, node in enumerate(text_index.nodes):
+        text = text_index.get_text(position)
+        if len(text) >= len(value):
+            scored.append(((fuzz.partial_ratio(value, text), -len(text)), (position, "getText()")))
+        if node.name == "meta":
+            continue
+        for attr, text in text_index.attributes[position]:
+            if type(text) is not list and len(text) >= len(value):
+                scored.append(((fuzz.partial_ratio(value, text), -len(text)), (position, attr)))
+    for path, text in meta_index.values.items():
+        if len(text) >= len(value):
+            scored.append(((fuzz.ratio(value, text), -len(text)), list(path)))
+    best = max(score for score, _ in scored)
+    return [match for score, match in scored if score == best]
+
+
+class TestBestMatch(object):
+    @pytest.mark.parametrize("value", ["Monastir", "Monastyr", "monastir", "290 DN", "Coquet stdio", "moncef!",
+                                       "2", "zzz", "Studio composé d'un salon, cuisine à l'amricaine"])
+    def test_pruning(self, value):
+        with open("tests/samples/tunisimmo_1.html", 'r') as f:
+            html = f.read()
+        soup = BeautifulSoup(html, "lxml")
+        text_index = TextIndex(soup)
+        metadata = Metadata(html)
+
+        matches = find_best_matches(soup, metadata, value, text_index=text_index)
+        assert [(match.position, match.attr) if match.is_css else match.meta_selector for match in matches] == \
+            get_all_best_matches(text_index, metadata.get_index(), value)
@@ -0,0 +1,35 @@
+# coding=utf-8
+from bs4 import BeautifulSoup
+from conftest import get_wrapper
+from swi.cache import ExtractionCache
+from swi.wrapper import WrapperGroup, Wrappers
+
+
+class TestExtractionCache(object):
+    def test_extract(self):
+        with open("tests/samples/escortfish_1.html", 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        cache = ExtractionCache(size=2)
+
+        assert cache.extract(get_wrapper("h1"), 0, soup, {}) == get_wrapper("h1").extract(soup, {})
+        cache.extract(get_wrapper("h1"), 0, soup, {})
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        cache.extract(get_wrapper("h1"), 1, soup, {})
+        cache.extract(get_wrapper("h1", attr="class"), 0, soup, {})
+        cache.extract(get_wrapper("h1"), 0, soup, {})  # dropped, the least recently used
+        assert (cache.hits, cache.misses) == (1, 4)
+        assert len(cache.extractions) == 2
+
+    def test_extract_wrappers(self):
+        with open("tests/samples/pypi_1.html", 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        groups = []
+        for _ in range(2):
+            group = get_wrapper(".vertical-tabs__tabs .sidebar-section", attr="alt", cls=WrapperGroup)
+            group.add_wrapper(get_wrapper(".vertical-tabs__tabs [alt]", attr="alt"))
+            groups.append(group)
+        cache = ExtractionCache()
+
+        assert cache.extract(Wrappers(groups), 0, soup, {}) == Wrappers(groups).extract(soup, {})
+        assert (cache.hits, cache.misses) == (1, 1)
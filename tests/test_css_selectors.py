@@ -0,0 +1,56 @@
+# coding=utf-8
+import copy
+import pytest
+from bs4 import BeautifulSoup
+from swi import css_selectors
+from swi.css_selectors import SelectorIndex, find_selector, clean_selector, simplify_fragmented_selector
+
+
+def get_positions(soup, nodes):
+    positions = {id(node): position for position, node in enumerate(soup.find_all(True))}
+    return sum(1 << positions[id(node)] for node in nodes)
+
+
+class TestSelectorIndex(object):
+    @pytest.mark.parametrize("sample, fragmented_selector", [
+        ("pypi_1", [["div", ".vertical-tabs__tabs"], [".sidebar-section"]]),
+        ("escortfish_1", [["body"], ["div"], ["p"]]),
+        ("escortsexe_1", [['[id="gallery"]'], ["[data-title]"]]),
+        ("bookaflat_1", [["html"], ["span", "[class]"]]),
+        ("lodgis_1", [["li"]]),
+    ])
+    def test_select(self, sample, fragmented_selector):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        selector = css_selectors.fragmented_selector_to_selector(fragmented_selector)
+
+        assert SelectorIndex(soup).select(fragmented_selector) == get_positions(soup, soup.select(selector))
+
+    @pytest.mark.parametrize("sample, fragmented_selector", [
+        ("pypi_1", [["div", ".vertical-tabs__tabs"], [".sidebar-section"]]),
+        ("lodgis_1", [["li"]]),
+        ("lodgis_1", []),
+    ])
+    def test_find_all(self, sample, fragmented_selector):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        selector = css_selectors.fragmented_selector_to_selector(fragmented_selector) or "li > a"  # selected in soup
+        selector_index = SelectorIndex(soup)
+
+        assert [selector_index.nodes[i] for i in selector_index.find_all(fragmented_selector, selector)] == \
+            soup.select(selector)
+
+    @pytest.mark.parametrize("sample", ["lodgis_1", "pypi_1"])
+    def test_simplify(self, sample):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        simplify = getattr(css_selectors, "__simplify_fragmented_selector_attributes")
+        selector_index = SelectorIndex(soup)
+
+        for node in soup.find_all(True)[::200]:
+            fragmented_selector = clean_selector(find_selector(node), None)
+            expected = copy.deepcopy(fragmented_selector)
+            result = soup.select(css_selectors.fragmented_selector_to_selector(expected))
+            expected = simplify(soup, expected, result)
+
+            assert simplify_fragmented_selector(soup, fragmented_selector, selector_index) == expected
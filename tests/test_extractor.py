@@ -1,6 +1,42 @@
 # coding=utf-8
 import pytest
+from concurrent.futures.process import BrokenProcessPool
+from conftest import CrashingPage
 from swi import Extractor
+from swi.serialization import dump_wrappers
+
+
+TUNISIMMO_TRAIN_SETS = [{"prix": "290DN", "contact": "moncef", "localisation": "Monastir",
+                         "images": ["https://www.tunisimmo.com/images/2018/11/15/5122/thumb_coquet-studio_1.jpg",
+                                    "https://www.tunisimmo.com/images/2018/11/15/5122/thumb_coquet-studio_3.jpg"]},
+                        {"prix": "900DN", "contact": "SAMI", "localisation": "Ariana"},
+                        {"prix": "400DN", "localisation": "Nabeul"}]
+
+
+def train_tunisimmo(**kwargs):
+    """
+
+    :param kwargs: the arguments of the extractor to test
+
+    :return: the extractor built with kwargs, predicting after each train page, an extractor trained on the same
+        pages at once, and the page they predict
+    :rtype: (Extractor, Extractor, str)
+    """
+    pages = []
+    for i in range(1, 5):
+        with open("tests/samples/tunisimmo_{}.html".format(i), 'r') as f:
+            pages.append(f.read())
+
+    extractor = Extractor(**kwargs)
+    reference = Extractor()
+    for page, train_set in zip(pages, TUNISIMMO_TRAIN_SETS):
+        extractor.add_train_page(page, train_set)
+        extractor.predict(pages[3])
+        reference.add_train_page(page, train_set)
+
+    assert extractor.predict(pages[3]) == reference.predict(pages[3])
+    assert extractor.efficiencies == reference.efficiencies
+    return extractor, reference, pages[3]
 
 
 class TestExtractor(object):
@@ -148,3 +184,62 @@ class TestExtractor(object):
         print(extractor_weheartit.best_wrappers["hearts"].selector)
 
         assert pred1 == res1 and pred2 == res2
+
+    def test_predict_many(self):
+        train_set_escortfish = {"title": "Only in town for three days", "location": "Cumberland Valley, MD", 'age': '25'}
+        with open("tests/samples/escortfish_1.html", 'r') as f:
+            html1 = f.read()
+        with open("tests/samples/escortfish_2.html", 'r') as f:
+            html2 = f.read()
+        extractor_escortfish = Extractor()
+        extractor_escortfish.add_train_page(html1, train_set_escortfish)
+        pages = [html1, "", html2, html1]
+
+        results = list(extractor_escortfish.predict_many(pages, workers=2))
+        assert [index for index, _, _ in results] == [0, 1, 2, 3]
+        assert [data for _, data, _ in results] == [extractor_escortfish.predict(html1), None,
+                                                    extractor_escortfish.predict(html2),
+                                                    extractor_escortfish.predict(html1)]
+        assert isinstance(results[1][2], ValueError)
+
+        unordered = list(extractor_escortfish.predict_many(pages, workers=2, chunksize=3, ordered=False))
+        assert sorted(unordered, key=lambda result: result[0])[2][1] == results[2][1]
+        assert list(extractor_escortfish.predict_many(pages, workers=1))[3][1] == results[3][1]
+
+    def test_predict_many_crashed_worker(self):
+        with open("tests/samples/escortfish_1.html", 'r') as f:
+            html = f.read()
+        extractor_escortfish = Extractor()
+        extractor_escortfish.add_train_page(html, {"title": "Only in town for three days"})
+        pages = [html, CrashingPage()] + [html] * 10
+
+        results = list(extractor_escortfish.predict_many(pages, workers=2))
+        assert [index for index, _, _ in results] == list(range(len(pages)))
+        assert isinstance(results[1][2], BrokenProcessPool)
+        expected = extractor_escortfish.predict(html)
+        assert results[2] == (2, expected, None)
+        assert results[3] == (3, expected, None)
+        assert all(result == (index, expected, None) for index, result in enumerate(results) if index != 1)
+
+    def test_incremental_training(self):
+        extractor, _, _ = train_tunisimmo()
+        assert extractor.scored_pages == 3
+
+    def test_lean_training(self):
+        extractor_lean, extractor, page = train_tunisimmo(lean=True)
+        assert all(page.soup is None for page in extractor_lean.extracted_pages)
+
+        extractor_lean.finalize()
+        assert extractor_lean.extracted_pages == [] and extractor_lean.efficiencies == {}
+        assert extractor_lean.predict(page) == extractor.predict(page)
+        with pytest.raises(ValueError):
+            extractor_lean.add_train_page(page, TUNISIMMO_TRAIN_SETS[0])
+
+    def test_parallel_training(self):
+        extractor_parallel, extractor, _ = train_tunisimmo(train_workers=2)
+        train_tunisimmo(train_workers=2, lean=True)
+
+        for page_parallel, page in zip(extractor_parallel.extracted_pages, extractor.extracted_pages):
+            for label, wrappers in page.wrappers_dict.items():
+                assert [dump_wrappers({label: wrapper}) for wrapper in page_parallel.wrappers_dict[label]] == \
+                       [dump_wrappers({label: wrapper}) for wrapper in wrappers]
@@ -0,0 +1,83 @@
+# coding=utf-8
+import threading
+import time
+from swi import Extractor, Instrumentation
+
+
+class TestInstrumentation(object):
+    def test_records(self):
+        train_set = {"title": "Only in town for three days", "location": "Cumberland Valley, MD", 'age': '25'}
+        with open("tests/samples/escortfish_1.html", 'r') as f:
+            html1 = f.read()
+        with open("tests/samples/escortfish_2.html", 'r') as f:
+            html2 = f.read()
+        records = []
+        instrumentation = Instrumentation(callback=records.append)
+        extractor = Extractor(instrumentation=instrumentation)
+        extractor.add_train_page(html1, train_set)
+        reference = Extractor()
+        reference.add_train_page(html1, train_set)
+
+        assert extractor.predict(html2) == reference.predict(html2)
+        extractor.predict(html2)
+
+        assert [record["operation"] for record in records] == ["train_page", "train", "predict", "predict"]
+        train_page, train, predict = records[:3]
+        assert {"parse", "metadata", "index", "match", "build"} <= set(train_page["stages"])
+        assert set(train_page["labels"]) == set(train_set) and train_page["counters"]["nodes"] > 0
+        assert set(train["stages"]) == {"score"} and train["counters"]["efficiencies"] > 0
+        assert {"parse", "select", "extract", "regex"} <= set(predict["stages"])
+        assert sum(predict["stages"].values()) <= predict["seconds"]
+        assert set(predict["labels"]) == set(train_set)
+        assert predict["counters"]["selects"] == len(extractor.extraction_plan.selectors)
+        assert predict["seconds"] >= train["seconds"]  # predict trained the wrappers first
+
+        totals = instrumentation.to_dict()
+        assert totals["predict"]["calls"] == 2
+        assert totals["predict"]["counters"]["nodes"] == 2 * predict["counters"]["nodes"]
+        instrumentation.reset()
+        assert instrumentation.to_dict() == {}
+
+    def test_nested_stages(self):
+        records = []
+        instrumentation = Instrumentation(callback=records.append)
+        with instrumentation.operation("predict"):
+            with instrumentation.stage("extract"):
+                with instrumentation.stage("regex"):
+                    time.sleep(0.02)
+
+        stages = records[0]["stages"]
+        assert stages["regex"] >= 0.02 and stages["extract"] < 0.02
+        assert stages["regex"] + stages["extract"] <= records[0]["seconds"]
+
+    def test_threads(self):
+        records = []
+        instrumentation = Instrumentation(callback=records.append)
+        barrier = threading.Barrier(2)
+
+        def run(name):
+            with instrumentation.operation(name):
+                barrier.wait()  # both operations are running
+                with instrumentation.stage(name):
+                    instrumentation.count(name)
+                    barrier.wait()
+
+        threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(record["operation"] for record in records) == ["a", "b"]
+        assert all(list(record["stages"]) == [record["operation"]] for record in records)
+        assert all(record["counters"] == {record["operation"]: 1} for record in records)
+        assert instrumentation.to_dict()["a"]["calls"] == 1
+
+    def test_disabled(self):
+        with open("tests/samples/escortfish_1.html", 'r') as f:
+            html = f.read()
+        extractor = Extractor()
+        extractor.add_train_page(html, {"title": "Only in town for three days"})
+        extractor.predict(html)
+
+        assert extractor.instrumentation.to_dict() == {}
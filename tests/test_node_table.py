@@ -0,0 +1,44 @@
+# coding=utf-8
+import pytest
+from bs4 import BeautifulSoup
+from swi.node_table import NodeTable
+
+
+class TestNodeTable(object):
+    @pytest.mark.parametrize("sample", ["booking_1", "lodgis_1", "pypi_1"])
+    def test_tree(self, sample):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        node_table = NodeTable(soup)
+        nodes = soup.find_all(True)
+
+        assert node_table.nodes == nodes
+        for position, node in enumerate(nodes):
+            parent = node_table.parents[position]
+            assert (soup if parent == -1 else nodes[parent]) is node.parent
+            assert [nodes[i] for i in node_table.get_descendants(position)] == [node] + node.find_all(True)
+            assert node_table.get_name(position) == node.name
+            assert node_table.get_attribute_names(position) == list(node.attrs.keys())
+            assert node_table.get_classes(position) == list(node.get("class", []))
+            assert node_table.get_text(position) == node.getText()
+
+    def test_is_ancestor(self):
+        soup = BeautifulSoup("<div><p>Hello <b>wor</b>ld</p><p>!</p></div>", "lxml")
+        node_table = NodeTable(soup)
+        nodes = soup.find_all(True)
+        names = [node.name for node in nodes]
+        div, b, p = names.index("div"), names.index("b"), names.index("p")
+
+        assert node_table.is_ancestor(div, b) and node_table.is_ancestor(p, b) and node_table.is_ancestor(-1, b)
+        assert not node_table.is_ancestor(b, p) and not node_table.is_ancestor(b, b)
+        assert not node_table.is_ancestor(p, len(nodes) - 1)  # the second p is a sibling
+
+    def test_interning(self):
+        soup = BeautifulSoup('<div class="a b"><p class="b" id="x">1</p><p class="a">2</p></div>', "lxml")
+        node_table = NodeTable(soup)
+
+        assert node_table.names == ["html", "body", "div", "p"]
+        assert list(node_table.tags) == [0, 1, 2, 3, 3]
+        assert node_table.classes == ["a", "b"]
+        assert list(node_table.class_ids) == [0, 1, 1, 0]
+        assert node_table.attribute_names == ["class", "id"]
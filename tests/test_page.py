@@ -0,0 +1,53 @@
+# coding=utf-8
+import extruct
+import lxml.html
+import pytest
+from bs4 import BeautifulSoup
+from swi import Extractor, Page
+from swi.backends import Bs4Backend, LxmlBackend
+
+TRAIN_SET = {"title": "Only in town for three days", "location": "Cumberland Valley, MD", 'age': '25',
+             "images": ["https://cdn.escortfish.ch/images/7b0fbd_thumb_lg.jpg",
+                        "https://cdn.escortfish.ch/images/z7oLbt.jpg"]}
+
+
+def read_sample(sample):
+    with open("tests/samples/{}.html".format(sample), 'r') as f:
+        return f.read()
+
+
+class TestPage(object):
+    @pytest.mark.parametrize("backend", ["bs4", "lxml"])
+    def test_predict_document(self, backend):
+        html1, html2 = read_sample("escortfish_1"), read_sample("escortfish_2")
+        extractor = Extractor(backend=backend)
+        extractor.add_train_page(BeautifulSoup(html1, "lxml"), TRAIN_SET)
+        expected = extractor.predict(html2)
+
+        assert extractor.predict(BeautifulSoup(html2, "lxml")) == expected
+        assert extractor.predict(lxml.html.fromstring(html2)) == expected
+        assert extractor.predict(html2, metadata=extruct.extract(html2)) == expected
+
+    def test_parse_once(self):
+        html1, html2 = read_sample("escortfish_1"), read_sample("escortfish_2")
+        extractors = [Extractor(), Extractor(backend="lxml"), Extractor()]
+        for extractor in extractors:
+            extractor.add_train_page(html1, TRAIN_SET)
+        page = Page(html2)
+        results = [extractor.predict(page) for extractor in extractors]
+
+        assert results[0] == results[1] == results[2] == extractors[0].predict(html2)
+        assert sorted(page.documents.keys()) == ["bs4", "lxml"]
+        assert page.get_document(Bs4Backend()) is page.documents["bs4"]
+        assert page.get_metadata() is page.metadata
+
+    def test_get_content(self):
+        html = read_sample("escortfish_1")
+        soup = BeautifulSoup(html, "lxml")
+        page = Page(document=soup)
+
+        assert page.get_document(Bs4Backend()) is soup
+        assert page.get_content() == str(soup)
+        assert len(page.get_document(LxmlBackend()).nodes) == len(soup.find_all(True))
+        with pytest.raises(ValueError):
+            Page()
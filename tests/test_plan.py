@@ -0,0 +1,34 @@
+# coding=utf-8
+import pytest
+from bs4 import BeautifulSoup
+from conftest import get_wrapper
+from swi.plan import ExtractionPlan
+from swi.wrapper import WrapperGroup, Wrappers
+
+
+class TestExtractionPlan(object):
+    @pytest.mark.parametrize("sample, selectors", [
+        ("pypi_1", [".package-header__name", ".vertical-tabs__tabs .sidebar-section", ".vertical-tabs__tabs [alt]"]),
+        ("escortfish_1", ["p", "h1", "[data-img-count] [src]", ".breadcrumb li", "div, a", ":not(div)"]),
+        ("escortsexe_1", ['[id="gallery"]', "[data-title]", "span span [onclick]", ".info[style] span"]),
+    ])
+    def test_select(self, sample, selectors):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        selector_results = ExtractionPlan([get_wrapper(selector) for selector in selectors]).select(soup)
+
+        for selector in selectors:
+            assert selector_results.select(selector) == soup.select(selector)
+            for root in soup.select(selectors[0]):
+                assert selector_results.select_within(root, selector) == root.select(selector)
+
+    def test_extract_group(self):
+        with open("tests/samples/pypi_1.html", 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        group = get_wrapper(".vertical-tabs__tabs .sidebar-section", attr="alt", cls=WrapperGroup)
+        group.add_wrapper(get_wrapper(".vertical-tabs__tabs [alt]", attr="alt"))
+        wrapper = Wrappers([group])
+        selector_results = ExtractionPlan([wrapper]).select(soup)
+
+        assert wrapper.extract(soup, {}, selector_results=selector_results) == wrapper.extract(soup, {})
+        assert len(wrapper.extract(soup, {})) == 4
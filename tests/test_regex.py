@@ -0,0 +1,90 @@
+# coding=utf-8
+import re
+import pytest
+import Levenshtein
+from bs4 import BeautifulSoup
+from swi import regex
+from swi.best_match import find_best_matches
+from swi.regex import get_regex, CompiledRegex
+
+get_indexes = getattr(regex, "__get_indexes")
+is_in_order = getattr(regex, "__is_in_order")
+
+
+def get_indexes_brute_force(formatted, raw):
+    """
+    The former implementation of regex.__get_indexes: every slice of raw is compared to formatted
+    """
+    shorterDist = float("inf")
+    bestStart = 0
+    bestEnd = len(raw)
+    for i in range(len(raw)):
+        for j in range(i, len(raw) + 1):
+            if len(formatted) <= j - i + 1:
+                dist = Levenshtein.distance(formatted, raw[i:j])
+                if dist < shorterDist and is_in_order(formatted, raw[i:j]):
+                    shorterDist = dist
+                    bestStart = i
+                    bestEnd = j
+    return bestStart, bestEnd
+
+
+class TestRegex(object):
+    @pytest.mark.parametrize("formatted, raw, expected", [
+        ("178", "4 Bedroom - 178 M2", r"(?<=.{12})(.+)(?=.{3})"),
+        ("25", "Age: 25", r"(?<=.{5})(.+)(?=.{0})"),
+        ("Montpellier - 34000", " Ville de base: Montpellier - 34000\t\t\t\n                        ",
+         r"(?<=.{15})(.+)(?=.{0})"),
+        ("moncef", "Contact:\n    moncef", r"(?<=.{13})(.+)(?=.{0})"),
+        ("Coquet studio - 290DN", "Coquet studio  - 290DN", r"(?<=.{0})(.+)(?=.{0})"),
+        ("", "https://cdn.escortfish.ch/images/7b0fbd.jpg", r"(?<=.{0})(.+)(?=.{43})"),
+        ("13000", "13 000 € / month", r"(?<=.{0})([^\ ]+)(?=.{10})"),
+        ("abc", "xyz", None),
+    ])
+    def test_get_regex(self, formatted, raw, expected):
+        assert get_regex(formatted=formatted, raw=raw) == expected
+
+    @pytest.mark.parametrize("formatted, raw", [
+        ("ab", "aXb ab"),
+        ("aab", "abaab"),
+        ("ba", "bbbaa"),
+        ("", "abc"),
+        ("", ""),
+        ("abc", "cba"),
+        ("aa", "a a a a"),
+    ])
+    def test_get_indexes(self, formatted, raw):
+        assert get_indexes(formatted, raw) == get_indexes_brute_force(formatted, raw)
+
+    @pytest.mark.parametrize("sample, value", [
+        ("tunisimmo_3", "appartement s+3 avec place de parking . résidente gardé avec deux ascenseurs.salon + 3 "
+                        "chambre + salle d'eau + salle de bain . avec 4 climatisseurset 3 balcons.4 ieme etages"),
+        ("escortfish_1", "25_38dd Italian Candy looking for someone to enjoy my short stay with. Not many open "
+                         "appointments left. Sexy clean discreet fun. Fetishes okay. Two girls available upon request. "
+                         "No law enforcement. Serious inquiries ONLY"),
+    ])
+    def test_get_indexes_descriptions(self, sample, value):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        raw = find_best_matches(soup, {}, value)[0].soup.getText().strip()
+
+        assert get_indexes(value, raw) == get_indexes_brute_force(value, raw)
+
+    @pytest.mark.parametrize("regex, fast", [
+        (r"(?<=.{12})(.+)(?=.{3})", True),
+        (r"(?<=.{0})([^\ ]+)(?=.{10})", True),
+        (get_regex("ab", "x\n-a]^b\\é y"), True),
+        (r"(?<=.{0})([^\d]+)(?=.{0})", False),
+        (".*", False),
+        (r"(?<=.{0})([^a-z]+)(?=.{0})", False),
+        (r"(?<=.{1})([^0-9]+)(?=.{1})", False),
+        (r"(?<=.{0})([^^a]+)(?=.{0})", False),
+        (r"(?<=.{0})([^\-\ ]+)(?=.{0})", True),
+    ])
+    def test_compiled_regex(self, regex, fast):
+        compiled_regex = CompiledRegex(regex)
+
+        assert (compiled_regex.pattern is None) == fast
+        for text in ["", "a", "4 Bedroom - 178 M2", "13 000 € / month", "x\\n-a]^b\\é y", "12 34", "bc-xy 123 Q",
+                     "abc-xyz 123 Q"]:
+            assert compiled_regex.find(text) == "".join(re.findall(regex, text))
@@ -0,0 +1,50 @@
+# coding=utf-8
+import pytest
+from swi import Extractor, ExtractorRegistry
+
+
+def save_wrappers(tmp_path, name, dictionary):
+    extractor = Extractor()
+    extractor.fill_best_wrappers_from_dictionary(dictionary)
+    path = str(tmp_path / "{}.json".format(name))
+    extractor.save(path)
+    return path
+
+
+class TestExtractorRegistry(object):
+    def test_get_path(self):
+        registry = ExtractorRegistry()
+        registry.add("pypi.org", "pypi.json")
+        registry.add("https://pypi.org/project/pip/*", "pip.json")
+
+        assert registry.get_path("https://pypi.org/project/pip/19.2.1/") == "pip.json"
+        assert registry.get_path("https://test.PyPI.org:443/project/swi/") == "pypi.json"
+        assert registry.get_path("pypi.org/search/") == "pypi.json"
+        assert registry.get_path("https://python.org/") is None
+
+    def test_predict(self, tmp_path):
+        registry = ExtractorRegistry(size=2)
+        registry.add("pypi.org", save_wrappers(tmp_path, "pypi", {"name": [".package-header__name", "getText()", ".*", 0]}))
+        registry.add("escortfish.ch", save_wrappers(tmp_path, "escortfish", {"title": ["h1", "getText()", ".*", 0]}))
+        registry.add("lodgis.com", save_wrappers(tmp_path, "lodgis", {"title": ["h1", "getText()", ".*", 0]}))
+        with open("tests/samples/pypi_1.html", 'r') as f:
+            html = f.read()
+
+        assert registry.predict("https://pypi.org/project/pip/", html) == {"name": "pip 19.2.1"}
+        registry.predict("https://pypi.org/project/swi/", html)
+        registry.get("https://escortfish.ch/")
+        registry.get("https://lodgis.com/")  # pypi is dropped, the least recently used
+        assert (registry.hits, registry.misses) == (1, 3)
+        assert len(registry.extractors) == 2
+        with pytest.raises(ValueError):
+            registry.predict("https://python.org/", html)
+
+    def test_max_bytes(self, tmp_path):
+        path = save_wrappers(tmp_path, "pypi", {"name": [".package-header__name", "getText()", ".*", 0]})
+        registry = ExtractorRegistry(max_bytes=1)
+        registry.add("pypi.org", path)
+        registry.add("pypi.io", save_wrappers(tmp_path, "pypi_io", {"name": ["h1", "getText()", ".*", 0]}))
+
+        registry.get("https://pypi.org/")
+        registry.get("https://pypi.io/")
+        assert list(registry.extractors) == [str(tmp_path / "pypi_io.json")]
@@ -0,0 +1,52 @@
+# coding=utf-8
+import pytest
+import extruct
+from swi.schemaorg import Metadata, MetaIndex, get_pathes, get_value
+from swi.wrapper import WrapperMeta
+
+
+class TestMetadata(object):
+    @pytest.mark.parametrize("sample", ["booking_1", "weheartit_1"])
+    def test_get(self, sample):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            html = f.read()
+        metadata = Metadata(html)
+
+        assert metadata.get(["json-ld", "unknown"]) == extruct.extract(html, syntaxes=["json-ld"])
+        assert list(metadata.data.keys()) == ["json-ld"]
+
+        data = metadata.get()
+        assert list(data.keys()) == list(extruct.extract(html).keys())
+        assert data["opengraph"] == extruct.extract(html, syntaxes=["opengraph"])["opengraph"]
+
+    def test_extract_meta(self):
+        with open("tests/samples/lodgis_1.html", 'r') as f:
+            html = f.read()
+        wrapper = WrapperMeta()
+        wrapper.selector, wrapper.regex = ["json-ld", 0, "name"], ".*"
+        metadata = Metadata(html)
+
+        assert wrapper.extract(None, metadata) == wrapper.extract(None, extruct.extract(html))
+        assert list(metadata.data.keys()) == ["json-ld"]
+
+    @pytest.mark.parametrize("sample", ["booking_1", "lodgis_1"])
+    def test_get_index(self, sample):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            html = f.read()
+        metadata = Metadata(html)
+        data = metadata.get()
+        index = metadata.get_index()
+
+        assert index is metadata.get_index()
+        assert [list(path) for path in index.values] == get_pathes(data)
+        assert all(index.get_value(path) == get_value(data, path) for path in get_pathes(data))
+        assert index.get_value(["json-ld", 0]) == get_value(data, ["json-ld", 0])
+        assert metadata.get_index(["json-ld"]).values == {path: value for path, value in index.values.items()
+                                                          if path[0] == "json-ld"}
+
+    def test_get_pathes(self):
+        data = {"json-ld": [{"name": "a, b", "offers": {"price": 3, "tags": ["x", "y"]}, "empty": []}]}
+
+        assert get_pathes(data) == [["json-ld", 0, "name"], ["json-ld", 0, "offers", "price"],
+                                    ["json-ld", 0, "offers", "tags", 0], ["json-ld", 0, "offers", "tags", 1]]
+        assert MetaIndex(data).get_value(["json-ld", 0, "offers", "price"]) == "3"
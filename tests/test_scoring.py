@@ -0,0 +1,44 @@
+# coding=utf-8
+import pytest
+from fuzzywuzzy import fuzz
+from swi import Extractor
+from swi.scoring import get_scorer
+
+QUERY = "Monastir"
+CHOICES = ["Monastir", "Localisation : Monastir", "Monastyr", "Sousse", "", None, "monastir, Tunisie"]
+
+
+class TestScoring(object):
+    def test_fuzzywuzzy(self):
+        scorer = get_scorer("fuzzywuzzy")
+
+        assert list(scorer.ratios(QUERY, CHOICES)) == [fuzz.ratio(QUERY, choice) for choice in CHOICES]
+        assert list(scorer.partial_ratios(QUERY, CHOICES)) == [fuzz.partial_ratio(QUERY, choice) for choice in CHOICES]
+        assert list(scorer.partial_ratios(QUERY, CHOICES, score_cutoff=100)) == [100, 100, 0, 0, 0, 0, 0]
+        with pytest.raises(ValueError):
+            get_scorer("difflib")
+
+    def test_rapidfuzz(self):
+        pytest.importorskip("rapidfuzz", minversion="3.0")
+        scorer = get_scorer("rapidfuzz")
+
+        assert scorer.ratios(QUERY, CHOICES) == [fuzz.ratio(QUERY, choice) if choice else 0 for choice in CHOICES]
+        assert scorer.partial_ratios(QUERY, CHOICES, score_cutoff=100) == [100, 100, 0, 0, 0, 0, 0]
+        assert scorer.partial_ratios("", CHOICES) == [0] * len(CHOICES)
+
+    def test_train_rapidfuzz(self):
+        pytest.importorskip("rapidfuzz", minversion="3.0")
+        train_set = {"prix": "290DN", "contact": "moncef", "localisation": "Monastir",
+                     "images": ["https://www.tunisimmo.com/images/2018/11/15/5122/thumb_coquet-studio_1.jpg",
+                                "https://www.tunisimmo.com/images/2018/11/15/5122/thumb_coquet-studio_3.jpg"]}
+        with open("tests/samples/tunisimmo_1.html", 'r') as f:
+            html1 = f.read()
+        with open("tests/samples/tunisimmo_2.html", 'r') as f:
+            html2 = f.read()
+
+        extractor_rapidfuzz = Extractor(scorer="rapidfuzz")
+        extractor = Extractor()
+        extractor_rapidfuzz.add_train_page(html1, train_set)
+        extractor.add_train_page(html1, train_set)
+
+        assert extractor_rapidfuzz.predict(html2) == extractor.predict(html2)
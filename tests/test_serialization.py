@@ -0,0 +1,45 @@
+# coding=utf-8
+import json
+import subprocess
+import sys
+import pytest
+from swi import Extractor
+from swi.serialization import dump_wrappers, load_wrappers
+
+
+class TestSerialization(object):
+    def test_save_load(self, tmp_path):
+        train_set_pypi = {"name": "pip 19.2.1", "maintainers": ["cjerdonek", "dstufft"]}
+        extractor = Extractor()
+        with open("tests/samples/pypi_1.html", 'r') as f:
+            extractor.add_train_page(f.read(), train_set_pypi)
+        with open("tests/samples/pypi_2.html", 'r') as f:
+            html = f.read()
+        extractor.predict(html)
+        extractor.fill_best_wrappers_from_dictionary({"w3": [["json-ld", 0, "name"], ".*", None]})
+        path = str(tmp_path / "wrappers.json")
+        extractor.save(path)
+
+        loaded = Extractor()
+        loaded.load(path)
+        assert {label: wrapper.get_key() for label, wrapper in loaded.best_wrappers.items()} == \
+            {label: wrapper.get_key() for label, wrapper in extractor.best_wrappers.items()}
+        assert loaded.predict(html) == extractor.predict(html)
+        assert "w3" in loaded.best_wrappers
+
+    def test_load_without_bs4(self, tmp_path):
+        extractor = Extractor()
+        extractor.fill_best_wrappers_from_dictionary({"name": [".package-header__name", "getText()", ".*", 0]})
+        path = str(tmp_path / "wrappers.json")
+        extractor.save(path)
+        code = "import sys, swi; swi.Extractor().load({!r}); print('bs4' in sys.modules)".format(path)
+
+        assert subprocess.check_output([sys.executable, "-c", code]).strip() == b"False"
+
+    def test_version(self):
+        data = json.loads(json.dumps(dump_wrappers({})))
+        assert load_wrappers(data) == {}
+
+        data["version"] += 1
+        with pytest.raises(ValueError):
+            load_wrappers(data)
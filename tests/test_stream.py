@@ -0,0 +1,74 @@
+# coding=utf-8
+import pytest
+from lxml import etree
+from conftest import get_wrapper
+from swi import Extractor
+from swi.backends import get_backend
+from swi.plan import ExtractionPlan
+from swi.stream import StreamPlan, _StreamBuilder
+from swi.wrapper import WrapperGroup, Wrappers
+
+pytest.importorskip("cssselect")
+
+
+def get_chunks(page, size):
+    return [page[start:start + size] for start in range(0, len(page), size)]
+
+
+class TestPredictStream(object):
+    def test_predict_stream(self):
+        train_set_pypi = {"name": "pip 19.2.1", "maintainers": ["cjerdonek", "dstufft"]}
+        extractor = Extractor()
+        with open("tests/samples/pypi_1.html", 'r') as f:
+            extractor.add_train_page(f.read(), train_set_pypi)
+        with open("tests/samples/pypi_2.html", 'rb') as f:
+            html = f.read()
+
+        assert extractor.predict_stream(get_chunks(html, 1000)) == extractor.predict(html)
+        with open("tests/samples/pypi_2.html", 'rb') as f:
+            assert extractor.predict_stream(f) == extractor.predict(html)
+        with pytest.raises(ValueError):
+            extractor.predict_stream(iter([]))
+
+    @pytest.mark.parametrize("selectors", [
+        [".breadcrumb li", "[data-img-count] [src]", "h1"],
+        ["li + li", "p:first-child", "div > p"],
+        ["li:last-child", "p"],
+    ])
+    def test_selectors(self, selectors):
+        with open("tests/samples/escortfish_1.html", 'r') as f:
+            html = f.read()
+        extractor = Extractor(backend="lxml")
+        extractor.best_wrappers = {selector: get_wrapper(selector) for selector in selectors}
+        group = get_wrapper("ul", attr="href", cls=WrapperGroup)
+        group.add_wrapper(get_wrapper("li a", attr="href"))
+        extractor.best_wrappers["group"] = Wrappers([group])
+
+        assert extractor.predict_stream(get_chunks(html, 100)) == extractor.predict(html)
+
+
+class TestStreamPlan(object):
+    @pytest.mark.parametrize("selector, streamable, siblings", [
+        (".vertical-tabs__tabs [alt]", True, False),
+        ("div > span, :not(a)", True, False),
+        ("li ~ li", True, True),
+        ("tr:nth-child(2n) td", True, True),
+        ("li:last-child", False, False),
+        ("p:empty", False, False),
+    ])
+    def test_streamable(self, selector, streamable, siblings):
+        wrappers = [get_wrapper(selector)]
+        plan = StreamPlan(ExtractionPlan(wrappers), wrappers, get_backend("lxml"))
+
+        assert (plan.streamable, plan.siblings) == (streamable, siblings)
+
+    def test_release(self):
+        wrappers = [get_wrapper(".item"), get_wrapper("a", attr="href")]
+        plan = StreamPlan(ExtractionPlan(wrappers), wrappers, get_backend("lxml"))
+        builder = _StreamBuilder(plan)
+        parser = etree.HTMLParser(target=builder)
+        parser.feed('<ul><li class="item"><a href="/1">One</a></li><li><a href="/2">Two</a><!-- x --></li></ul>')
+        root = parser.close()
+        assert [node.getText() for node in builder.nodes if node.text] == ["One"]
+        assert [node.get("href") for node in builder.nodes] == [None, "/1", "/2"]
+        assert len(root) == 0  # every subtree was released
@@ -0,0 +1,30 @@
+# coding=utf-8
+import pytest
+from bs4 import BeautifulSoup
+from swi.text_index import TextIndex
+
+
+class TestTextIndex(object):
+    @pytest.mark.parametrize("sample", ["booking_1", "escortsexe_1", "lodgis_1", "tumblrgallery_1"])
+    def test_get_text(self, sample):
+        with open("tests/samples/{}.html".format(sample), 'r') as f:
+            soup = BeautifulSoup(f.read(), "lxml")
+        text_index = TextIndex(soup)
+        nodes = soup.findChildren(recursive=True)
+
+        assert text_index.nodes == nodes
+        assert all(text_index.get_text(i) == node.getText() for i, node in enumerate(nodes))
+
+    def test_find(self):
+        soup = BeautifulSoup("<div><p>Hello <b>wor</b>ld</p><script>var world</script></div>", "lxml")
+        text_index = TextIndex(soup)
+
+        assert [text_index.nodes[i].name for i in sorted(text_index.find("world"))] == ["html", "body", "div", "p",
+                                                                                          "script"]
+
+    def test_count(self):
+        soup = BeautifulSoup("<div><p>Hello <b>wor</b>ld</p><script>var world</script></div>", "lxml")
+        text_index = TextIndex(soup)
+
+        assert all(text_index.count(i, char) == text_index.get_text(i).count(char)
+                   for i in range(len(text_index.nodes)) for char in "lowr")
@@ -0,0 +1,35 @@
+# coding=utf-8
+from bs4 import BeautifulSoup
+from swi.css_selectors import SelectorIndex
+from swi.wrapper import WrapperCss, WrapperGroup
+
+GALLERY = "<html><body><div class='gallery'>{}</div><img src='http://x/logo.jpg'></body></html>".format("".join(
+    "<div class='row'><span><img class='photo' src='http://x/{}.jpg'></span></div>".format(i % 50)
+    for i in range(100)))
+
+
+def get_group(soup, values, selector_index=None):
+    group = WrapperGroup()
+    for value in values:
+        wrapper = WrapperCss()
+        wrapper.build(soup=soup, value=value, best_match=soup.find("img", src=value), attr_best_match="src",
+                      selector_index=selector_index)
+        group.add_wrapper(wrapper)
+    group.fill_common_parent(soup, selector_index=selector_index)
+    return group
+
+
+class TestWrapperGroup(object):
+    def test_common_parent(self):
+        soup = BeautifulSoup(GALLERY, "lxml")
+        group = get_group(soup, ["http://x/3.jpg", "http://x/40.jpg"])
+        indexed_group = get_group(soup, ["http://x/3.jpg", "http://x/40.jpg"], selector_index=SelectorIndex(soup))
+
+        assert soup.select_one(group.selector).get("class") == ["gallery"]
+        assert indexed_group.selector == group.selector
+
+    def test_extract_unique_values(self):
+        soup = BeautifulSoup(GALLERY, "lxml")
+        group = get_group(soup, ["http://x/3.jpg", "http://x/40.jpg"], selector_index=SelectorIndex(soup))
+
+        assert group.extract(soup, {}) == ["http://x/{}.jpg".format(i) for i in range(50)]